@@ -0,0 +1,188 @@
+"""End-to-end throughput benchmark without rendering.
+
+    python -m core.benchmark --out bench.json
+    python -m core.benchmark --out bench.json --compare baseline.json
+
+Each scale builds a seeded world with the given number of fish (plankton,
+crustaceans and algae scaled in proportion to the stock settings) in a fresh
+process, so peak RSS is measured per scale.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SCALES = (50, 500, 5000)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_world(num_fish, seed, world_size=None):
+    from core.headless import create_headless_simulation
+    from core.settings import (
+        INITIAL_ALGAE,
+        INITIAL_CRUSTACEANS,
+        INITIAL_PLANKTON,
+        NUM_FISH,
+    )
+    from entities.algae import Algae
+    from entities.fish import Fish
+    from entities.simple_organisms import Crustacean, Plankton
+
+    sim = create_headless_simulation(seed=seed, generate=False, world_size=world_size)
+    world = sim.world
+    factor = num_fish / NUM_FISH
+
+    sim.algae_list = []
+    for _ in range(max(1, round(INITIAL_ALGAE * factor))):
+        algae = Algae(random.randint(0, world.width), world.height, sim)
+        sim.algae_list.append(algae)
+        sim.add_segment_to_grid(algae.segments[0][0], algae.segments[0][1], algae)
+        for _ in range(random.randint(10, 40)):
+            algae.growth_timer = 0
+            algae.grow()
+
+    sim.plankton_list, sim.crustacean_list = [], []
+    for _ in range(round(INITIAL_PLANKTON * factor)):
+        sim.add_plankton(Plankton(random.randint(0, world.width), random.randint(0, int(world.height / 1.5))))
+    for _ in range(round(INITIAL_CRUSTACEANS * factor)):
+        sim.add_crustacean(Crustacean(random.randint(0, world.width),
+                                      random.randint(int(world.height / 3), world.height)))
+    for _ in range(num_fish):
+        sim.add_fish(Fish(random.randint(0, world.width), random.randint(0, world.line_level - random.randint(0, 20)),
+                          sim, random.randint(40, 60)))
+
+    sim.update_oxygen_grid()
+    sim.update_temperature_grid()
+    sim.paused = False
+    return sim
+
+
+def run_scale(num_fish, seed, ticks, warmup, max_seconds, world_size=None):
+    sim = build_world(num_fish, seed, world_size)
+    build_rss = peak_rss_mb()
+
+    for _ in range(warmup):
+        if not sim.step():
+            break
+
+    durations = []
+    started = time.perf_counter()
+    for _ in range(ticks):
+        tick_start = time.perf_counter()
+        alive = sim.step()
+        durations.append(time.perf_counter() - tick_start)
+        if not alive or time.perf_counter() - started > max_seconds:
+            break
+    elapsed = time.perf_counter() - started
+    sim.close()
+
+    durations.sort()
+    return {
+        "fish": num_fish,
+        "ticks": len(durations),
+        "ticks_per_second": round(len(durations) / elapsed, 3) if elapsed else 0.0,
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3) if durations else 0.0,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "build_rss_mb": build_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "final_fish": len([f for f in sim.fish_population if not f.is_dead]),
+        "phases_ms": {phase: round(value, 3) for phase, value in sim.timer.totals_ms().items()},
+    }
+
+
+def benchmark(scales, seed, ticks, warmup, max_seconds, world_size=None):
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for num_fish in scales:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_scale, num_fish, seed, ticks, warmup, max_seconds, world_size).result()
+        results[str(num_fish)] = result
+        print(f"{num_fish:>6} fish: {result['ticks_per_second']:>9.2f} ticks/s  "
+              f"p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+              f"peak RSS {result['peak_rss_mb']} MB  ({result['ticks']} ticks)")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+            "ticks": ticks,
+            "warmup": warmup,
+            "world": list(world_size) if world_size else None,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    print(f"\n{'fish':>6} {'metric':>16} {'baseline':>12} {'current':>12} {'change':>9}")
+    for scale, result in current["results"].items():
+        base = baseline["results"].get(scale)
+        if base is None:
+            continue
+        for metric, higher_is_better in (("ticks_per_second", True), ("p50_ms", False),
+                                         ("p99_ms", False), ("peak_rss_mb", False)):
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            print(f"{scale:>6} {metric:>16} {old:>12.3f} {new:>12.3f} {change:>+8.1%}")
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append((scale, metric, change))
+    for scale, metric, change in regressions:
+        print(f"REGRESSION: {metric} at {scale} fish changed by {change:+.1%}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation throughput at several population scales")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="fish counts to benchmark")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=200, help="measured ticks per scale")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured ticks before timing starts")
+    parser.add_argument("--max-seconds", type=float, default=120.0, help="time budget per scale")
+    parser.add_argument("--world", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        help="world size in pixels (default: the window size)")
+    parser.add_argument("--out", default="benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression (default 10%%)")
+    args = parser.parse_args()
+
+    current = benchmark(args.scales, args.seed, args.ticks, args.warmup, args.max_seconds, args.world)
+    with open(args.out, "w") as f:
+        json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(current, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
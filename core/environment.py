@@ -1,8 +1,131 @@
 import math
+import os
 import random
+from bisect import bisect_left
 import noise
+import numpy as np
 
-from core.settings import MAX_TEMP, MIN_TEMP
+from core.settings import CACHE_DIR, LAYER_INDEX_TOLERANCE, MAX_TEMP, MIN_TEMP, NOISE_TABLE_STEP, SEASON_LENGTH
+
+
+class NoiseTable:
+    # Noise behind the current targets only depends on time, which wraps every four seasons,
+    # so it is sampled once per NOISE_TABLE_STEP ticks over that period and interpolated
+    def __init__(self, layers, cols, period, step):
+        self.step = step
+        self.samples = math.ceil(period / step) + 1
+        path = os.path.join(CACHE_DIR, f"current-noise-{layers}x{cols}-{period}-{step}.npz") if CACHE_DIR else None
+        if path and os.path.exists(path):
+            with np.load(path) as tables:
+                self.strength, self.direction, self.boundary = \
+                    tables["strength"], tables["direction"], tables["boundary"]
+            return
+
+        times = [i * step for i in range(self.samples)]
+        self.strength = np.array([[noise.pnoise1(t * 0.005 + layer, octaves=4) for layer in range(layers)]
+                                  for t in times])
+        self.direction = np.array([[noise.pnoise1(t * 0.01 + layer + 10, octaves=4) for layer in range(layers)]
+                                   for t in times])
+        self.boundary = np.array([[[noise.pnoise2(col * 0.1, t * 0.02 + layer, octaves=4) for col in range(cols)]
+                                   for layer in range(layers + 1)] for t in times])
+        if path:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Per-process temporary name, sweep workers may build the same table at once
+            temp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(temp_path, strength=self.strength, direction=self.direction, boundary=self.boundary)
+            os.replace(temp_path, path)
+
+    def lookup(self, time):
+        position = min(max(time / self.step, 0), self.samples - 1)
+        index = min(int(position), self.samples - 2)
+        t = position - index
+        return tuple(table[index] * (1 - t) + table[index + 1] * t
+                     for table in (self.strength, self.direction, self.boundary))
+
+
+class AlgaeDensityRaster:
+    # Algae segment counts per cell, kept in step with Simulation.algae_grid. Counts are kept in
+    # square chunks that exist only while they hold a segment
+    def __init__(self, width, height, resolution, chunk_size):
+        self.resolution = resolution
+        self.cols = math.ceil(width / resolution)
+        self.rows = math.ceil(height / resolution)
+        self.chunk = max(1, chunk_size // resolution)
+        self.chunks = {}
+        self.chunk_versions = {}
+        self.summed = {}
+        self.version = 0
+
+    def cell(self, x, y):
+        col = min(max(int(x // self.resolution), 0), self.cols - 1)
+        row = min(max(int(y // self.resolution), 0), self.rows - 1)
+        return row, col
+
+    def add(self, x, y):
+        row, col = self.cell(x, y)
+        size = self.chunk
+        key = (row // size, col // size)
+        counts = self.chunks.get(key)
+        if counts is None:
+            counts = self.chunks[key] = np.zeros((size, size), dtype=np.int32)
+        counts[row % size, col % size] += 1
+        self.version += 1
+        self.chunk_versions[key] = self.version
+
+    def remove(self, x, y):
+        row, col = self.cell(x, y)
+        size = self.chunk
+        key = (row // size, col // size)
+        counts = self.chunks[key]
+        counts[row % size, col % size] -= 1
+        self.version += 1
+        if counts.any():
+            self.chunk_versions[key] = self.version
+        else:
+            del self.chunks[key], self.chunk_versions[key]
+            self.summed.pop(key, None)
+
+    def summed_chunk(self, key):
+        version, summed = self.summed.get(key, (None, None))
+        if version != self.chunk_versions[key]:
+            size = self.chunk
+            table = np.zeros((size + 1, size + 1), dtype=np.int64)
+            table[1:, 1:] = self.chunks[key].cumsum(0).cumsum(1)
+            summed = table.tolist()
+            self.summed[key] = (self.chunk_versions[key], summed)
+        return summed
+
+    def any_within(self, x, y, radius):
+        # Conservative box test: False means there is certainly no segment within radius
+        row0, col0 = self.cell(x - radius, y - radius)
+        row1, col1 = self.cell(x + radius, y + radius)
+        size = self.chunk
+        chunks = self.chunks
+        for chunk_row in range(row0 // size, row1 // size + 1):
+            for chunk_col in range(col0 // size, col1 // size + 1):
+                key = (chunk_row, chunk_col)
+                if key not in chunks:
+                    continue
+                summed = self.summed_chunk(key)
+                r0, r1 = max(row0 - chunk_row * size, 0), min(row1 - chunk_row * size, size - 1)
+                c0, c1 = max(col0 - chunk_col * size, 0), min(col1 - chunk_col * size, size - 1)
+                if summed[r1 + 1][c1 + 1] - summed[r0][c1 + 1] - summed[r1 + 1][c0] + summed[r0][c0] > 0:
+                    return True
+        return False
+
+    def occupied(self):
+        # Row, column and count of every non-empty cell
+        rows, cols, counts = [], [], []
+        size = self.chunk
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            r, c = np.nonzero(chunk)
+            rows.append(r + chunk_row * size)
+            cols.append(c + chunk_col * size)
+            counts.append(chunk[r, c])
+        if not rows:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, empty
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(counts)
 
 
 class CurrentGrid:
@@ -14,18 +137,24 @@ class CurrentGrid:
         self.cols = width // grid_size + 1
         self.rows = height // grid_size + 1
         self.layers = layers
-        self.grid = {}
+        self.col_range = (0, self.cols)
         
         self.base_strengths = self.generate_base_strengths()
         self.target_base_strengths = self.base_strengths.copy()
         self.base_directions = self.generate_base_directions()
+        self.initial_directions = self.generate_base_directions()
         self.target_base_directions = self.base_directions.copy()
         self.layer_boundaries = self.generate_layer_boundaries()
         self.target_layer_boundaries = [boundary[:] for boundary in self.layer_boundaries]
         
-        self.base_layer_boundaries = self.generate_layer_boundaries()  # лише один раз
-        self.target_layer_boundaries = [b[:] for b in self.base_layer_boundaries]
-        self.layer_boundaries = [b[:] for b in self.base_layer_boundaries]
+        self.base_layer_boundaries = np.array(self.generate_layer_boundaries())  # лише один раз
+        self.target_layer_boundaries = self.base_layer_boundaries.copy()
+        self.layer_boundaries = self.base_layer_boundaries.copy()
+        self.indexed_boundaries = None
+        self.refresh_layer_index()
+        self.noise = NoiseTable(layers, self.cols, SEASON_LENGTH * 4, NOISE_TABLE_STEP)
+        self.damping_version = None
+        self.damping = None
 
         self.initialize_grid()
 
@@ -87,56 +216,109 @@ class CurrentGrid:
         
         return boundaries
 
+    def refresh_layer_index(self):
+        # Boundaries drift slowly, so the index is only rebuilt once one has moved far enough
+        bounds = self.layer_boundaries
+        if (self.indexed_boundaries is not None and
+                np.abs(bounds - self.indexed_boundaries).max() <= LAYER_INDEX_TOLERANCE):
+            return
+        self.indexed_boundaries = bounds.copy()
+
+        # A point is in the first layer whose lower boundary is at or below it, which is a
+        # sorted search over the running maximum of the boundaries in each column
+        ceilings = np.maximum.accumulate(bounds[1:], axis=0)
+        self.layer_ceilings = ceilings.T.tolist()
+        # Columns are laid end to end with a gap wider than the tank so one searchsorted covers them all
+        self.layer_span = self.height + 4
+        self.layer_keys = (ceilings.T + np.arange(self.cols)[:, None] * self.layer_span).ravel()
+
+        xs, ys = np.meshgrid(np.arange(self.cols) * self.grid_size, np.arange(self.rows) * self.grid_size)
+        self.layer_index = self.layers_at(xs.ravel(), ys.ravel()).reshape(self.rows, self.cols)
+
+    def layers_at(self, xs, ys):
+        cols = (np.asarray(xs) // self.grid_size).astype(np.intp)
+        # Negative columns index from the right, as the list lookup this replaced did
+        cols = np.where(cols < 0, cols % self.cols, np.minimum(cols, self.cols - 1))
+        ys = np.clip(ys, -1, self.height + 1)
+        index = np.searchsorted(self.layer_keys, ys + cols * self.layer_span) - cols * self.layers
+        return np.minimum(index, self.layers - 1)
+
     def get_layer_at(self, x, y):
         col = int(x // self.grid_size)
         if col >= self.cols:
             col = self.cols - 1
-        for layer in range(self.layers):
-            if y <= self.layer_boundaries[layer + 1][col]:
-                return layer
-        return self.layers - 1
+        return min(bisect_left(self.layer_ceilings[col], y), self.layers - 1)
 
     def initialize_grid(self):
-        for row in range(self.rows):
-            y = row * self.grid_size
-            for col in range(self.cols):
-                x = col * self.grid_size
-                layer = self.get_layer_at(x, y)
-                base_direction = self.base_directions[layer] + random.uniform(-math.pi/4, math.pi/4)
-                strength = self.base_strengths[layer] * (1 + random.uniform(-0.15, 0.15))
-                self.grid[(col, row)] = {"strength": strength, "direction": base_direction}
+        rng = self.simulation.rng
+        shape = (self.rows, self.cols)
+        self.direction = np.array(self.base_directions)[self.layer_index] + rng.uniforms(-math.pi/4, math.pi/4, shape)
+        self.strength = np.array(self.base_strengths)[self.layer_index] * (1 + rng.uniforms(-0.15, 0.15, shape))
+        self.refresh_velocity()
 
     def update(self, simulation):
         season = simulation.seasons[simulation.current_season_index]
         season_modifier = {"Spring": 0.8, "Summer": 1.0, "Autumn": 0.9, "Winter": 0.7}[season]
         self.update_targets(season)
+        damping = self.algae_damping(simulation.algae_density)
         for i in range(self.layers):
             self.base_strengths[i] += (self.target_base_strengths[i] - self.base_strengths[i]) * 0.01
             angle_diff = (self.target_base_directions[i] - self.base_directions[i] + math.pi) % (2 * math.pi) - math.pi
             self.base_directions[i] = (self.base_directions[i] + angle_diff * 0.05) % (2 * math.pi)
-        for layer in range(self.layers + 1):
-            for col in range(self.cols):
-                self.layer_boundaries[layer][col] += (self.target_layer_boundaries[layer][col] - self.layer_boundaries[layer][col]) * 0.005
-        for row in range(self.rows):
-            y = row * self.grid_size
-            for col in range(self.cols):
-                x = col * self.grid_size
-                layer = self.get_layer_at(x, y)
-                current = self.grid[(col, row)]
-                temp = simulation.get_temperature(x, y)
-                temp_factor = (temp - MIN_TEMP) / (MAX_TEMP - MIN_TEMP)
-                target_direction = (self.base_directions[layer] +
-                                math.sin(simulation.time * 0.01 + col * 0.1) * math.pi/8 +
-                                random.uniform(-math.pi/8, math.pi/8))
-                target_strength = self.base_strengths[layer] * season_modifier * (1 + temp_factor * 0.3) * (1 + random.uniform(-0.1, 0.1))
-                nearby_segments = simulation.get_nearby_segments(x, y)
-                for seg_x, seg_y, _ in nearby_segments:
-                    distance = math.hypot(seg_x - x, seg_y - y)
-                    if distance < self.grid_size * 2:
-                        current["strength"] *= (1 - 0.3 * (1 - distance / (self.grid_size * 2)))
-                current["strength"] += (target_strength - current["strength"]) * 0.02
-                angle_diff = (target_direction - current["direction"] + math.pi) % (2 * math.pi) - math.pi
-                current["direction"] += angle_diff * 0.05
+        self.layer_boundaries += (self.target_layer_boundaries - self.layer_boundaries) * 0.005
+        self.refresh_layer_index()
+
+        # All cells of the owned columns at once
+        c0, c1 = self.col_range
+        layer = self.layer_index[:, c0:c1]
+        shape = layer.shape
+        rng = simulation.rng
+        xs, ys = np.meshgrid(np.arange(c0, c1) * self.grid_size, np.arange(self.rows) * self.grid_size)
+        temp = simulation.temperature_grid.values_at(xs, ys)
+        temp_factor = (temp - MIN_TEMP) / (MAX_TEMP - MIN_TEMP)
+        target_direction = (np.array(self.base_directions)[layer] +
+                            np.sin(simulation.time * 0.01 + np.arange(c0, c1) * 0.1) * math.pi/8 +
+                            rng.uniforms(-math.pi/8, math.pi/8, shape))
+        target_strength = (np.array(self.base_strengths)[layer] * season_modifier * (1 + temp_factor * 0.3) *
+                           (1 + rng.uniforms(-0.1, 0.1, shape)))
+
+        strength = self.strength[:, c0:c1] * damping[:, c0:c1]
+        strength += (target_strength - strength) * 0.02
+        self.strength[:, c0:c1] = strength
+        direction = self.direction[:, c0:c1]
+        angle_diff = (target_direction - direction + math.pi) % (2 * math.pi) - math.pi
+        self.direction[:, c0:c1] = direction + angle_diff * 0.05
+        self.refresh_velocity()
+
+    def algae_damping(self, raster):
+        # Every segment within two cells of a current cell weakens it by up to 30%. The product of
+        # those factors is the exp of a log-kernel convolution over the density raster, and the
+        # window matches the 3x3 algae grid cells that get_nearby_segments used to look at.
+        # Only occupied raster cells are visited: each one falls in the windows of the 3x3
+        # current cells around it
+        if self.damping_version == raster.version:
+            return self.damping
+        radius = self.grid_size * 2
+        step = self.grid_size // raster.resolution
+        offsets = (np.arange(-step, 2 * step) + 0.5) * raster.resolution
+        distance = np.hypot(offsets[:, None], offsets[None, :])
+        kernel = np.where(distance < radius, np.log(1 - 0.3 * (1 - np.minimum(distance, radius) / radius)), 0.0)
+
+        log_damping = np.zeros((self.rows, self.cols))
+        rows, cols, counts = raster.occupied()
+        inside = (rows < self.rows * step) & (cols < self.cols * step)
+        rows, cols, counts = rows[inside], cols[inside], counts[inside]
+        for row_shift in (-1, 0, 1):
+            i = rows // step + row_shift
+            for col_shift in (-1, 0, 1):
+                j = cols // step + col_shift
+                valid = (i >= 0) & (i < self.rows) & (j >= 0) & (j < self.cols)
+                weights = counts[valid] * kernel[step + rows[valid] - i[valid] * step,
+                                                 step + cols[valid] - j[valid] * step]
+                np.add.at(log_damping, (i[valid], j[valid]), weights)
+        self.damping = np.exp(log_damping)
+        self.damping_version = raster.version
+        return self.damping
 
     def update_targets(self, season):
         season_effects = {
@@ -147,36 +329,75 @@ class CurrentGrid:
         }
         
         effect = season_effects[season]
-        
+        strength_noise, direction_noise, boundary_noise = self.noise.lookup(self.simulation.time)
+
         for layer in range(self.layers):
             t = layer / (self.layers - 1) if self.layers > 1 else 0
-            strength_noise = noise.pnoise1(self.simulation.time * 0.005 + layer, octaves=4) * 0.2
-            direction_noise = noise.pnoise1(self.simulation.time * 0.01 + layer + 10, octaves=4) * math.pi / 4
-            
-            self.target_base_strengths[layer] = effect["strength"] * (1 - t * 0.3) + strength_noise
-            self.target_base_directions[layer] = (self.generate_base_directions()[layer] + 
-                                                effect["direction_shift"] + direction_noise) % (2 * math.pi)
-        
-        for layer in range(self.layers + 1):
-            for col in range(self.cols):
-                base_height = self.base_layer_boundaries[layer][col] + effect["boundary_shift"]
-                noise_value = noise.pnoise2(col * 0.1, self.simulation.time * 0.02 + layer, octaves=4) * self.height * 0.2
-                target = max(0, min(self.height, base_height + noise_value))
-                self.target_layer_boundaries[layer][col] += (target - self.target_layer_boundaries[layer][col]) * 0.02
-        
+            self.target_base_strengths[layer] = effect["strength"] * (1 - t * 0.3) + strength_noise[layer] * 0.2
+            self.target_base_directions[layer] = (self.initial_directions[layer] + effect["direction_shift"] +
+                                                  direction_noise[layer] * math.pi / 4) % (2 * math.pi)
+
+        target = np.clip(self.base_layer_boundaries + effect["boundary_shift"] + boundary_noise * self.height * 0.2,
+                         0, self.height)
+        targets = self.target_layer_boundaries
+        targets += (target - targets) * 0.02
+
         min_gap = self.height * 0.02
-        for col in range(self.cols):
-            for layer in range(1, self.layers):
-                below = self.target_layer_boundaries[layer + 1][col]
-                above = self.target_layer_boundaries[layer][col]
-                if above > below - min_gap:
-                    mid = (above + below) / 2
-                    self.target_layer_boundaries[layer][col] = mid - min_gap / 2
-                    self.target_layer_boundaries[layer + 1][col] = mid + min_gap / 2
-
-    def get_current_at(self, x, y):
-        col = int(x // self.grid_size)
-        row = int(y // self.grid_size)
-        if (col, row) in self.grid:
-            return self.grid[(col, row)]["strength"], self.grid[(col, row)]["direction"]
-        return 0.3, 0.0
\ No newline at end of file
+        for layer in range(1, self.layers):
+            above, below = targets[layer], targets[layer + 1]
+            squeezed = above > below - min_gap
+            mid = (above + below) / 2
+            targets[layer] = np.where(squeezed, mid - min_gap / 2, above)
+            targets[layer + 1] = np.where(squeezed, mid + min_gap / 2, below)
+
+    def refresh_velocity(self):
+        # Velocity components at cell centres, sampled bilinearly by velocity_at and sample
+        self.u = self.strength * np.cos(self.direction)
+        self.v = self.strength * np.sin(self.direction)
+        self.u_rows = self.u.tolist()
+        self.v_rows = self.v.tolist()
+
+    def velocity_at(self, x, y):
+        size = self.grid_size
+        if not 0 <= y < self.rows * size:
+            return 0.3, 0.0
+        # The world wraps along x, so columns do too: the last one blends into the first
+        fx = x % self.width / size - 0.5
+        fy = y / size - 0.5
+        c0 = math.floor(fx)
+        r0 = math.floor(fy)
+        tx = fx - c0
+        ty = fy - r0
+        c1 = (c0 + 1) % self.cols
+        r1 = min(r0 + 1, self.rows - 1)
+        c0 %= self.cols
+        r0 = max(r0, 0)
+        u0, u1 = self.u_rows[r0], self.u_rows[r1]
+        v0, v1 = self.v_rows[r0], self.v_rows[r1]
+        u = (u0[c0] * (1 - tx) + u0[c1] * tx) * (1 - ty) + (u1[c0] * (1 - tx) + u1[c1] * tx) * ty
+        v = (v0[c0] * (1 - tx) + v0[c1] * tx) * (1 - ty) + (v1[c0] * (1 - tx) + v1[c1] * tx) * ty
+        return u, v
+
+    def sample(self, xs, ys):
+        size = self.grid_size
+        fx = xs % self.width / size - 0.5
+        fy = ys / size - 0.5
+        c0 = np.floor(fx)
+        r0 = np.floor(fy)
+        tx = fx - c0
+        ty = fy - r0
+        c0 = c0.astype(np.intp)
+        r0 = r0.astype(np.intp)
+        c1 = (c0 + 1) % self.cols
+        r1 = np.clip(r0 + 1, 0, self.rows - 1)
+        c0 %= self.cols
+        r0 = np.clip(r0, 0, self.rows - 1)
+
+        def interpolate(field):
+            top = field[r0, c0] * (1 - tx) + field[r0, c1] * tx
+            bottom = field[r1, c0] * (1 - tx) + field[r1, c1] * tx
+            return top * (1 - ty) + bottom * ty
+
+        # Above or below the grid the current falls back to a weak flow along x
+        inside = (ys >= 0) & (ys < self.rows * size)
+        return np.where(inside, interpolate(self.u), 0.3), np.where(inside, interpolate(self.v), 0.0)
@@ -1,10 +1,10 @@
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pygame
 
 from entities.simple_organisms import Crustacean, Plankton
-from ui.fish_windows import FishCreationWindow, FishDetailsWindow
-from core.settings import MOUSE_CLICK
+from core.settings import CREATIVE_AREA_COUNT, CREATIVE_BRUSH_COUNT, MOUSE_CLICK
 
 if TYPE_CHECKING:
     from core.simulation import Simulation
@@ -19,23 +19,31 @@ class EventHandler:
                 self.simulation.running = False
                 
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
+                mouse_x, mouse_y = self.simulation.camera.to_world(*pygame.mouse.get_pos())
 
                 if 'Creative' in self.simulation.modes.active_modes:
                     if not MOUSE_CLICK:
                         if event.button != 1:
                             break
-                        
-                    if 'Plankton' in self.simulation.modes.active_modes \
+
+                    if 'Brush' in self.simulation.modes.active_modes:
+                        if event.button == 1:
+                            # Shift+click fills or clears the whole area at once
+                            area = pygame.key.get_mods() & pygame.KMOD_SHIFT
+                            self.brush(mouse_x, mouse_y, CREATIVE_AREA_COUNT if area else CREATIVE_BRUSH_COUNT)
+
+                    elif 'Plankton' in self.simulation.modes.active_modes \
                                 and 'Deleting' not in self.simulation.modes.active_modes \
                                     and event.button == 1:
-                        self.simulation.plankton_list.append(Plankton(mouse_x, mouse_y))
+                        self.simulation.add_plankton(Plankton(mouse_x, mouse_y))
                     elif 'Crustacean' in self.simulation.modes.active_modes \
                                 and 'Deleting' not in self.simulation.modes.active_modes:
-                        self.simulation.crustacean_list.append(Crustacean(mouse_x, mouse_y))
+                        self.simulation.add_crustacean(Crustacean(mouse_x, mouse_y))
                     elif 'Fish' in self.simulation.modes.active_modes \
                                 and 'Deleting' not in self.simulation.modes.active_modes \
                                     and event.button == 1:
+                        # Tk is only loaded once a window is opened
+                        from ui.fish_windows import FishCreationWindow
                         FishCreationWindow(self.simulation, mouse_x, mouse_y)
                     
                     elif 'Deleting' in self.simulation.modes.active_modes:
@@ -44,7 +52,7 @@ class EventHandler:
                                 dist_sq = (fish.x - mouse_x) ** 2 + (fish.y - mouse_y) ** 2
                                 threshold_sq = (fish.size + 5) ** 2
                                 if dist_sq < threshold_sq:
-                                    self.simulation.fish_population.remove(fish)
+                                    self.simulation.remove_fish(fish)
                                     break
                         
                         elif 'Plankton' in self.simulation.modes.active_modes:
@@ -53,6 +61,7 @@ class EventHandler:
                                 threshold_sq = 4
                                 if dist_sq < threshold_sq:
                                     self.simulation.plankton_list.remove(plankton)
+                                    self.simulation.entities_changed("plankton")
                                     break
                         
                         elif 'Crustacean' in self.simulation.modes.active_modes:
@@ -61,6 +70,7 @@ class EventHandler:
                                 threshold_sq = 9
                                 if dist_sq < threshold_sq:
                                     self.simulation.crustacean_list.remove(crustacean)
+                                    self.simulation.entities_changed("crustacean")
                                     break
 
                 else:
@@ -71,9 +81,19 @@ class EventHandler:
                         dist_sq = (fish.x - mouse_x) ** 2 + (fish.y - mouse_y) ** 2
                         threshold_sq = (fish.size + 5) ** 2
                         if dist_sq < threshold_sq:
+                            from ui.fish_windows import FishDetailsWindow
                             FishDetailsWindow(self.simulation, fish)
                             break
                 
+            elif event.type == pygame.MOUSEMOTION:
+                # Dragging with the brush keeps painting
+                if 'Brush' in self.simulation.modes.active_modes and event.buttons[0]:
+                    self.brush(*self.simulation.camera.to_world(*event.pos), CREATIVE_BRUSH_COUNT)
+
+            elif event.type == pygame.MOUSEWHEEL:
+                if 'Brush' in self.simulation.modes.active_modes:
+                    self.simulation.modes.resize_brush(event.y)
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.simulation.paused = not self.simulation.paused
@@ -109,6 +129,9 @@ class EventHandler:
                     elif event.key == pygame.K_d or event.unicode.lower() == "в":
                         self.simulation.modes.toggle_mode('cre_del', "Deleting")
 
+                    elif event.key == pygame.K_b or event.unicode.lower() == "и":
+                        self.simulation.modes.toggle_mode('cre_brush', "Brush")
+
                 else:
                     if event.key == pygame.K_z or event.unicode.lower() == "я":
                         self.simulation.modes.toggle_mode('show_oxygen_map', "Oxy Map")
@@ -117,4 +140,26 @@ class EventHandler:
                         self.simulation.modes.toggle_mode('show_temp_map', "Temp Map")
                     
                     elif event.key == pygame.K_c or event.unicode.lower() == "с":
-                        self.simulation.modes.toggle_mode('show_targets', "Targets")
\ No newline at end of file
+                        self.simulation.modes.toggle_mode('show_targets', "Targets")
+
+        # Arrow keys scroll worlds larger than the window
+        pressed = pygame.key.get_pressed()
+        self.simulation.camera.pan(pressed[pygame.K_LEFT], pressed[pygame.K_RIGHT],
+                                   pressed[pygame.K_UP], pressed[pygame.K_DOWN])
+
+    def brush(self, x, y, count):
+        # Spawns count entities of the selected kind spread over the brush circle, or deletes all of them in it
+        sim = self.simulation
+        modes = sim.modes
+        kind = ("plankton" if modes.cre_plankton else "crustacean" if modes.cre_crustacean else
+                "fish" if modes.cre_fish else None)
+        if kind is None:
+            return
+        radius = modes.brush_radius
+        if modes.cre_del:
+            sim.delete_within(kind, x, y, radius)
+            return
+        # Square root of the uniform keeps the density even across the disc
+        distance = radius * np.sqrt(sim.rng.uniforms(size=count))
+        angle = sim.rng.uniforms(0, 2 * np.pi, count)
+        sim.spawn_many(kind, np.column_stack((x + distance * np.cos(angle), y + distance * np.sin(angle))))
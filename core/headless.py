@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+
+import core.settings as settings
+
+PACKAGES = ("core", "entities", "plots", "ui")
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+def apply_settings_overrides(overrides):
+    # Modules pull settings in with `from core.settings import *`, so the new value
+    # has to be written into every already imported module that holds a copy.
+    previous = {}
+    for name, value in overrides.items():
+        if not hasattr(settings, name) or not name.isupper():
+            raise KeyError(f"Unknown setting: {name}")
+        old_value = getattr(settings, name)
+        if isinstance(old_value, tuple) and isinstance(value, list):
+            value = tuple(value)
+        previous[name] = old_value
+        for module_name, module in list(sys.modules.items()):
+            if module is None or module_name.split(".")[0] not in PACKAGES:
+                continue
+            if getattr(module, name, None) is old_value:
+                setattr(module, name, value)
+        setattr(settings, name, value)
+    return previous
+
+
+def create_headless_simulation(seed=None, overrides=None, generate=True, world_size=None):
+    if overrides:
+        apply_settings_overrides(overrides)
+
+    import pygame
+
+    from core.simulation import Simulation
+    from core.world import World
+
+    size = world_size or settings.WORLD_SIZE or (settings.WIDTH, settings.HEIGHT)
+    world = World(*size, settings.WORLD_CHUNK_SIZE)
+    pygame.init()
+    screen = pygame.display.set_mode(world.window_size())
+
+    if seed is not None:
+        random.seed(seed)
+
+    sim = Simulation(screen, pygame.time.Clock(), world)
+    sim.headless = True
+    if generate:
+        sim.start_generation()
+        while sim.is_generating:
+            sim.update_generation()
+    return sim
@@ -0,0 +1,91 @@
+from collections import deque
+
+from core.settings import HISTORY_FACTOR, HISTORY_RECENT, HISTORY_TIER_SIZE, HISTORY_TIERS
+
+
+class Bucket:
+    __slots__ = ("start", "end", "count", "mins", "sums", "maxs")
+
+    def __init__(self, start, end, count, mins, sums, maxs):
+        self.start = start
+        self.end = end
+        self.count = count
+        self.mins = mins
+        self.sums = sums
+        self.maxs = maxs
+
+    @classmethod
+    def of_samples(cls, samples):
+        columns = list(zip(*(values for _, values in samples)))
+        return cls(samples[0][0], samples[-1][0], len(samples),
+                   [min(c) for c in columns], [sum(c) for c in columns], [max(c) for c in columns])
+
+    @classmethod
+    def merged(cls, buckets):
+        return cls(buckets[0].start, buckets[-1].end, sum(b.count for b in buckets),
+                   [min(v) for v in zip(*(b.mins for b in buckets))],
+                   [sum(v) for v in zip(*(b.sums for b in buckets))],
+                   [max(v) for v in zip(*(b.maxs for b in buckets))])
+
+
+class TieredSeries:
+    # Per-tick samples of a few columns with bounded memory. The newest `recent` samples are kept
+    # as they are. Older ones are folded into min/sum/max buckets of `factor` samples, and every
+    # following tier merges `factor` buckets of the one before. The last tier halves itself when
+    # full, so the whole run stays covered by at most recent + tiers * tier_size points.
+    def __init__(self, columns, recent=HISTORY_RECENT, factor=HISTORY_FACTOR, tier_size=HISTORY_TIER_SIZE,
+                 tiers=HISTORY_TIERS):
+        self.columns = tuple(columns)
+        self.recent_size = recent
+        self.factor = factor
+        self.tier_size = tier_size
+        self.recent = deque()
+        self.tiers = [deque() for _ in range(max(1, tiers))]
+
+    def append(self, tick, values):
+        self.recent.append((tick, tuple(values)))
+        if len(self.recent) >= self.recent_size + self.factor:
+            samples = [self.recent.popleft() for _ in range(self.factor)]
+            self.push(0, Bucket.of_samples(samples))
+
+    def push(self, level, bucket):
+        tier = self.tiers[level]
+        tier.append(bucket)
+        if len(tier) <= self.tier_size:
+            return
+        if level + 1 < len(self.tiers):
+            self.push(level + 1, Bucket.merged([tier.popleft() for _ in range(self.factor)]))
+        else:
+            buckets = list(tier)
+            tier.clear()
+            tier.extend(Bucket.merged(buckets[i:i + 2]) for i in range(0, len(buckets), 2))
+
+    def __len__(self):
+        return len(self.recent) + sum(len(tier) for tier in self.tiers)
+
+    @property
+    def downsampled(self):
+        return any(self.tiers)
+
+    def envelope(self):
+        # Tick positions plus (mins, means, maxs) per column, oldest first
+        ticks = []
+        columns = [([], [], []) for _ in self.columns]
+        for tier in reversed(self.tiers):
+            for bucket in tier:
+                ticks.append((bucket.start + bucket.end) / 2)
+                for (mins, means, maxs), low, total, high in zip(columns, bucket.mins, bucket.sums, bucket.maxs):
+                    mins.append(low)
+                    means.append(total / bucket.count)
+                    maxs.append(high)
+        for tick, values in self.recent:
+            ticks.append(tick)
+            for (mins, means, maxs), value in zip(columns, values):
+                mins.append(value)
+                means.append(value)
+                maxs.append(value)
+        return ticks, columns
+
+    def column(self, name):
+        ticks, columns = self.envelope()
+        return ticks, columns[self.columns.index(name)][1]
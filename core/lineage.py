@@ -0,0 +1,221 @@
+"""Append-only lineage log of every fish, stored as fixed-width records in a memory-mapped file.
+
+    python -m core.lineage lineage.bin [--ancestors ID] [--descendants ID] [--depth N]
+
+Every fish that enters the population gets one record: id, mother and father ids (-1 for
+fish without parents), birth tick, species, sex and its genome. Death tick and cause are
+filled in place when it dies. Queries go through a NumPy view of the file, sorted once per
+query batch, so ancestor and descendant lookups stay fast with millions of records.
+"""
+import argparse
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"FISHLIN1"
+HEADER = struct.Struct("<8sq")
+GENES = ("speed", "size", "vision", "metabolism", "digestion", "reproduction", "defense", "color",
+         "preferred_depth", "predator", "reproduction_strategy")
+CAUSES = ("alive", "starved", "old_age", "eaten", "removed")
+
+RECORD = struct.Struct(f"<qqqqqBBBH{2 * len(GENES)}f")
+DIED_OFFSET = 32  # died is the fifth q, cause follows the species and sex bytes
+CAUSE_OFFSET = DIED_OFFSET + 8 + 2
+RECORD_DTYPE = np.dtype([("id", "<i8"), ("mother", "<i8"), ("father", "<i8"), ("born", "<i8"), ("died", "<i8"),
+                         ("predator", "u1"), ("male", "u1"), ("cause", "u1"), ("dominance", "<u2"),
+                         ("alleles", "<f4", (len(GENES), 2))])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+class LineageLog:
+    def __init__(self, path, grow_records=65536, readonly=False):
+        self.path = path
+        self.grow_records = grow_records
+        self.readonly = readonly
+        if readonly:
+            self.file = open(path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a lineage file")
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(path, "w+b")
+            self.count = 0
+            self.map = None
+            self.grow()
+        self.capacity = (len(self.map) - HEADER.size) // RECORD.size
+        self.index = None
+
+    def grow(self):
+        # mmap objects cannot be resized everywhere, so the file is extended and mapped again.
+        # Arrays from records() must not be held across a grow
+        self.index = None
+        capacity = (self.capacity if self.map is not None else 0) + self.grow_records
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(HEADER.size + capacity * RECORD.size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        HEADER.pack_into(self.map, 0, MAGIC, self.count)
+        self.capacity = capacity
+
+    def record_birth(self, fish, tick):
+        if self.count >= self.capacity:
+            self.grow()
+        genome = fish.genome
+        alleles = []
+        dominance = 0
+        for bit, gene in enumerate(GENES):
+            alleles.extend(genome[gene]["alleles"])
+            dominance |= genome[gene]["dominance"] << bit
+        mother, father = fish.parents
+        row = self.count
+        RECORD.pack_into(self.map, HEADER.size + row * RECORD.size, fish.id, mother, father, tick, -1,
+                         fish.is_predator, fish.is_male, 0, dominance, *alleles)
+        self.count += 1
+        HEADER.pack_into(self.map, 0, MAGIC, self.count)
+        return row
+
+    def record_death(self, row, tick, cause):
+        offset = HEADER.size + row * RECORD.size
+        struct.pack_into("<q", self.map, offset + DIED_OFFSET, tick)
+        struct.pack_into("<B", self.map, offset + CAUSE_OFFSET, CAUSES.index(cause))
+
+    def records(self):
+        return np.frombuffer(self.map, dtype=RECORD_DTYPE, count=self.count, offset=HEADER.size)
+
+    def get_index(self):
+        if self.index is None or self.index.count != self.count:
+            self.index = LineageIndex(self.records())
+        return self.index
+
+    def ancestors(self, fish_id, depth=None):
+        return self.get_index().ancestors(fish_id, depth)
+
+    def descendants(self, fish_id, depth=None):
+        return self.get_index().descendants(fish_id, depth)
+
+    def flush(self):
+        if self.map is not None and not self.readonly:
+            self.map.flush()
+
+    def close(self):
+        if self.map is None:
+            return
+        self.index = None
+        if not self.readonly:
+            self.map.flush()
+            self.map.close()
+            # Trailing capacity that was never written is dropped
+            self.file.truncate(HEADER.size + self.count * RECORD.size)
+        else:
+            self.map.close()
+        self.file.close()
+        self.map = None
+
+
+class LineageIndex:
+    # Sorted views over one snapshot of the records: by id for parent lookups and by
+    # mother/father for children, each answered with searchsorted
+    def __init__(self, records):
+        self.records = records
+        self.count = len(records)
+        self.by_id = np.argsort(records["id"], kind="stable")
+        self.ids = records["id"][self.by_id]
+        self.by_mother = np.argsort(records["mother"], kind="stable")
+        self.mothers = records["mother"][self.by_mother]
+        self.by_father = np.argsort(records["father"], kind="stable")
+        self.fathers = records["father"][self.by_father]
+
+    def rows_of(self, fish_ids):
+        fish_ids = np.asarray(fish_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(0, dtype=np.intp)
+        positions = np.minimum(np.searchsorted(self.ids, fish_ids), len(self.ids) - 1)
+        return self.by_id[positions[self.ids[positions] == fish_ids]]
+
+    def children_rows(self, fish_ids):
+        fish_ids = np.asarray(fish_ids, dtype=np.int64)
+        rows = []
+        for order, parents in ((self.by_mother, self.mothers), (self.by_father, self.fathers)):
+            starts = np.searchsorted(parents, fish_ids, side="left")
+            ends = np.searchsorted(parents, fish_ids, side="right")
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                rows.append(order[start:end])
+        return np.unique(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.intp)
+
+    def record(self, fish_id):
+        rows = self.rows_of([fish_id])
+        return self.records[rows[0]] if len(rows) else None
+
+    def ancestors(self, fish_id, depth=None):
+        # Generation by generation; returns the ancestor ids, nearest first
+        found = []
+        seen = set()
+        current = [fish_id]
+        generation = 0
+        while current and (depth is None or generation < depth):
+            rows = self.rows_of(current)
+            parents = np.concatenate((self.records["mother"][rows], self.records["father"][rows]))
+            parents = [p for p in np.unique(parents[parents >= 0]).tolist() if p not in seen]
+            seen.update(parents)
+            found.extend(parents)
+            current = parents
+            generation += 1
+        return found
+
+    def descendants(self, fish_id, depth=None):
+        found = []
+        seen = set()
+        current = [fish_id]
+        generation = 0
+        while current and (depth is None or generation < depth):
+            children = [c for c in self.records["id"][self.children_rows(current)].tolist() if c not in seen]
+            seen.update(children)
+            found.extend(children)
+            current = children
+            generation += 1
+        return found
+
+
+def describe(index, fish_id):
+    record = index.record(fish_id)
+    if record is None:
+        return f"{fish_id}: not in the log"
+    died = f"died {record['died']} ({CAUSES[record['cause']]})" if record["died"] >= 0 else "alive"
+    return (f"{fish_id}: {'predator' if record['predator'] else 'prey'} {'male' if record['male'] else 'female'}, "
+            f"born {record['born']}, {died}, parents {record['mother']}/{record['father']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a lineage log written by the simulation")
+    parser.add_argument("path")
+    parser.add_argument("--ancestors", type=int, metavar="ID")
+    parser.add_argument("--descendants", type=int, metavar="ID")
+    parser.add_argument("--depth", type=int, help="generations to follow (default: all)")
+    args = parser.parse_args()
+
+    log = LineageLog(args.path, readonly=True)
+    records = log.records()
+    print(f"{log.count} fish, {int((records['died'] >= 0).sum())} dead")
+    for code, cause in enumerate(CAUSES[1:], start=1):
+        print(f"  {cause}: {int((records['cause'] == code).sum())}")
+    index = log.get_index()
+    if args.ancestors is not None:
+        print(describe(index, args.ancestors))
+        for fish_id in index.ancestors(args.ancestors, args.depth):
+            print("  " + describe(index, fish_id))
+    if args.descendants is not None:
+        print(describe(index, args.descendants))
+        for fish_id in index.descendants(args.descendants, args.depth):
+            print("  " + describe(index, fish_id))
+    del records, index
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
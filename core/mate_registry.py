@@ -0,0 +1,88 @@
+from core.settings import SPATIAL_CELL_SIZE, SPATIAL_MARGIN
+
+
+class MateRegistry:
+    # Fish with ready_to_mate set, bucketed by (is_predator, is_male). Dicts keep insertion
+    # order, so candidates come out in a stable order between seeded runs.
+    # Each bucket is also filed by grid cell, so a partner search only looks at the cells within
+    # mate vision. Cells are brought up to date with the fish positions once per tick, and a
+    # search reaches SPATIAL_MARGIN further to cover fish that moved since.
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE, margin=SPATIAL_MARGIN):
+        self.buckets = {(predator, male): {} for predator in (False, True) for male in (False, True)}
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cells = {key: {} for key in self.buckets}  # bucket key -> {(col, row): {fish: None}}
+        self.placed = {}  # fish -> cell it is filed under
+        self.tick = None
+
+    def cell(self, fish):
+        return int(fish.x // self.cell_size), int(fish.y // self.cell_size)
+
+    def place(self, key, fish):
+        cell = self.placed[fish] = self.cell(fish)
+        self.cells[key].setdefault(cell, {})[fish] = None
+
+    def unplace(self, key, fish):
+        cell = self.placed.pop(fish, None)
+        if cell is None:
+            return
+        members = self.cells[key][cell]
+        del members[fish]
+        if not members:
+            del self.cells[key][cell]
+
+    def update(self, fish):
+        key = (fish.is_predator, fish.is_male)
+        bucket = self.buckets[key]
+        if fish.ready_to_mate:
+            if fish not in bucket:
+                bucket[fish] = None
+                self.place(key, fish)
+        elif bucket.pop(fish, False) is None:
+            self.unplace(key, fish)
+
+    def discard(self, fish):
+        key = (fish.is_predator, fish.is_male)
+        if self.buckets[key].pop(fish, False) is None:
+            self.unplace(key, fish)
+
+    def refresh(self, tick):
+        if tick == self.tick:
+            return
+        self.tick = tick
+        for key, bucket in self.buckets.items():
+            for fish in bucket:
+                if self.cell(fish) != self.placed[fish]:
+                    self.unplace(key, fish)
+                    self.place(key, fish)
+
+    def partners_for(self, fish):
+        return self.buckets[(fish.is_predator, not fish.is_male)]
+
+    def partners_near(self, fish, radius, tick):
+        # Ready fish of the other sex in the cells around fish; the caller measures the exact distance
+        self.refresh(tick)
+        cells = self.cells[(fish.is_predator, not fish.is_male)]
+        reach = radius + self.margin
+        size = self.cell_size
+        col0, col1 = int((fish.x - reach) // size), int((fish.x + reach) // size)
+        row0, row1 = int((fish.y - reach) // size), int((fish.y + reach) // size)
+        if (col1 - col0 + 1) * (row1 - row0 + 1) > len(cells):
+            # Fewer occupied cells than cells in range: walk the occupied ones instead
+            return [f for (col, row), members in cells.items()
+                    if col0 <= col <= col1 and row0 <= row <= row1 for f in members]
+        partners = []
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                members = cells.get((col, row))
+                if members:
+                    partners.extend(members)
+        return partners
+
+    def clear(self):
+        for bucket in self.buckets.values():
+            bucket.clear()
+        for cells in self.cells.values():
+            cells.clear()
+        self.placed.clear()
+        self.tick = None
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import math
+import os
+import queue
+import threading
+from collections import deque
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+
+from core.lineage import GENES
+from core.settings import MAX_SPEED
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, memory is then read from /proc only
+    resource = None
+
+CONTROL_COMMANDS = ("pause", "resume", "speed", "checkpoint")
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def memory_bytes():
+    # Resident set size of the process, read at scrape time on the server thread
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+class SnapshotBuilder:
+    # Runs on the simulation thread. Everything it reads is already maintained by the simulation
+    # (tick timer, plot totals, population stats), so a snapshot costs O(phases + genes).
+    def __init__(self, rate_window=50):
+        self.marks = deque(maxlen=rate_window)
+
+    def build(self, sim):
+        now = sim.scheduler.now
+        if not self.marks or self.marks[-1][1] != now:
+            self.marks.append((perf_counter(), now))
+        (first_time, first_tick), (last_time, last_tick) = self.marks[0], self.marks[-1]
+        tick_rate = (last_tick - first_tick) / (last_time - first_time) if last_time > first_time else 0.0
+
+        stats = sim.stats
+        latest = sim.plot.latest
+        counts = stats.counts
+        predators, egglayers, males = stats.fractions()
+        return {
+            "tick": now,
+            "time": sim.time,
+            "season": sim.seasons[sim.current_season_index],
+            "paused": sim.paused,
+            "speed": sim.speed,
+            "last_checkpoint": sim.last_checkpoint,
+            "tick_rate": tick_rate,
+            "timings_ms": sim.timer.averages_ms(),
+            "population": {
+                "alive": stats.alive,
+                "dead_floating": len(sim.fish_population) - stats.alive,
+                "predator_male": counts[(True, True)], "predator_female": counts[(True, False)],
+                "prey_male": counts[(False, True)], "prey_female": counts[(False, False)],
+                "predator_fraction": predators, "egglayer_fraction": egglayers, "male_fraction": males,
+                "avg_energy_predators": latest.get("avg_energy_predators", 0),
+                "avg_energy_prey": latest.get("avg_energy_prey", 0),
+            },
+            "genetics": {gene: {"mean": mean, "variance": variance}
+                         for gene, mean, variance in zip(GENES, stats.means(), stats.variances())},
+            "entities": {
+                "algae": len(sim.algae_list), "algae_parts": latest.get("algae_parts", 0),
+                "plankton": len(sim.plankton_list), "crustaceans": len(sim.crustacean_list),
+                "dead_parts": len(sim.dead_algae_parts), "eggs": len(sim.egg_list),
+                "fish": len(sim.fish_population),
+            },
+        }
+
+
+def prometheus_text(snapshot, memory):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP ocean_{name} {help_text}")
+        lines.append(f"# TYPE ocean_{name} {kind}")
+        for labels, value in samples:
+            label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+            lines.append(f"ocean_{name}{label_text} {float(value):.6g}")
+
+    population = snapshot["population"]
+    metric("ticks_total", "counter", "Simulation ticks since start", [({}, snapshot["tick"])])
+    metric("tick_rate", "gauge", "Ticks per second over the last few frames", [({}, snapshot["tick_rate"])])
+    metric("paused", "gauge", "1 while the simulation is paused", [({}, snapshot["paused"])])
+    metric("speed", "gauge", "Simulation speed multiplier", [({}, snapshot["speed"])])
+    metric("phase_ms", "gauge", "Rolling average time per tick spent in each phase",
+           [({"phase": phase}, ms) for phase, ms in snapshot["timings_ms"].items()])
+    metric("fish", "gauge", "Living fish by species and sex",
+           [({"species": key.split("_")[0], "sex": key.split("_")[1]}, population[key])
+            for key in ("predator_male", "predator_female", "prey_male", "prey_female")])
+    metric("fish_fraction", "gauge", "Share of the living fish",
+           [({"group": group}, population[f"{group}_fraction"]) for group in ("predator", "egglayer", "male")])
+    metric("entities", "gauge", "Entities in the world by kind",
+           [({"kind": kind}, count) for kind, count in snapshot["entities"].items()])
+    metric("allele_mean", "gauge", "Mean allele value per gene",
+           [({"gene": gene}, values["mean"]) for gene, values in snapshot["genetics"].items()])
+    metric("allele_variance", "gauge", "Allele variance per gene",
+           [({"gene": gene}, values["variance"]) for gene, values in snapshot["genetics"].items()])
+    metric("memory_rss_bytes", "gauge", "Resident memory of the simulation process", [({}, memory)])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    # Small HTTP server on its own thread and asyncio loop. It never touches the simulation:
+    # the simulation publishes a snapshot dict once per frame (a single reference swap) and
+    # drains the queued control commands on its own thread.
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self.snapshot = None
+        self.commands = queue.SimpleQueue()
+        self.builder = SnapshotBuilder()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="metrics-server", daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, self.host, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+        except OSError as error:
+            print(f"Metrics server could not listen on {self.host}:{self.port}: {error}")
+            self.ready.set()
+            self.loop.close()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def publish(self, simulation):
+        self.snapshot = self.builder.build(simulation)
+
+    def pending_commands(self):
+        while True:
+            try:
+                yield self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value.strip() or 0)
+            if length:
+                await reader.readexactly(length)
+            parts = request.decode("latin-1").split()
+            status, content_type, body = self.respond(*parts[:2]) if len(parts) >= 2 else \
+                (400, "text/plain", "bad request\n")
+            payload = body.encode()
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, method, target):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        snapshot = self.snapshot
+
+        if path.startswith("/control/"):
+            if method != "POST":
+                return 405, "text/plain", "control commands are POST only\n"
+            command = path[len("/control/"):]
+            if command not in CONTROL_COMMANDS:
+                return 404, "text/plain", f"unknown command {command}\n"
+            value = None
+            if command == "speed":
+                try:
+                    value = float(parse_qs(url.query)["value"][0])
+                except (KeyError, ValueError):
+                    return 400, "text/plain", "speed needs ?value=<multiplier>\n"
+                if not math.isfinite(value) or value <= 0:
+                    return 400, "text/plain", "speed must be a positive number\n"
+                value = min(value, MAX_SPEED)
+            self.commands.put((command, value))
+            return 202, "application/json", json.dumps({"queued": command, "value": value}) + "\n"
+
+        if method != "GET":
+            return 405, "text/plain", "only GET is supported here\n"
+        if snapshot is None:
+            return 404, "text/plain", "no snapshot published yet\n"
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", prometheus_text(snapshot, memory_bytes())
+        if path == "/snapshot":
+            return 200, "application/json", json.dumps({**snapshot, "memory_rss_bytes": memory_bytes()}) + "\n"
+        if path.startswith("/snapshot/") and path[len("/snapshot/"):] in snapshot:
+            return 200, "application/json", json.dumps(snapshot[path[len("/snapshot/"):]]) + "\n"
+        return 404, "text/plain", "try /metrics, /snapshot, /snapshot/<section> or POST /control/<command>\n"
+
+    def stop(self):
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5)
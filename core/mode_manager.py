@@ -1,3 +1,6 @@
+from core.settings import CREATIVE_BRUSH_RADIUS
+
+
 class ModeManager:
     def __init__(self):
         self.show_vision = False
@@ -12,6 +15,8 @@ class ModeManager:
         self.cre_crustacean = False
         self.cre_fish = False
         self.cre_del = False
+        self.cre_brush = False
+        self.brush_radius = CREATIVE_BRUSH_RADIUS
 
         self.active_modes = []
     
@@ -82,4 +87,11 @@ class ModeManager:
             
             if 'Creative' not in self.active_modes and 'Deleting' in self.active_modes:
                 self.active_modes.remove('Deleting')
-                self.cre_del = False
\ No newline at end of file
+                self.cre_del = False
+
+            if 'Creative' not in self.active_modes and 'Brush' in self.active_modes:
+                self.active_modes.remove('Brush')
+                self.cre_brush = False
+
+    def resize_brush(self, steps):
+        self.brush_radius = min(300, max(5, self.brush_radius + steps * 5))
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+
+from core.settings import CURRENT_MOVEMENT_FACTOR
+
+
+def gather(entities, *attributes):
+    count = len(entities)
+    return [np.fromiter((getattr(e, name) for e in entities), float, count) for name in attributes]
+
+
+def scatter(entities, name, values):
+    for entity, value in zip(entities, values.tolist()):
+        setattr(entity, name, value)
+
+
+def keep_only(entities, keep):
+    # In place, so lists shared with the rest of the simulation stay the same objects.
+    # Returns True when something was dropped.
+    if keep.all():
+        return False
+    entities[:] = [e for e, k in zip(entities, keep.tolist()) if k]
+    return True
+
+
+class ParticleSystem:
+    # Passive particles (crustaceans, dead algae parts, eggs and dead fish) are updated
+    # in batches: positions are gathered into arrays, moved by vectorised kernels and
+    # written back. The entity lists stay the source of truth for everything else.
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.rng = simulation.rng
+
+    def update(self):
+        sim = self.simulation
+        if sim.dead_algae_parts:
+            self.update_dead_parts(sim.dead_algae_parts)
+        if sim.crustacean_list:
+            self.update_crustaceans(sim.crustacean_list)
+        if sim.egg_list:
+            self.update_eggs(sim.egg_list)
+
+    def update_dead_parts(self, parts):
+        xs, ys, float_speed = gather(parts, "x", "y", "float_speed")
+        current_x, current_y = self.simulation.current_grid.sample(xs, ys)
+        xs += current_x * CURRENT_MOVEMENT_FACTOR
+        ys += current_y * CURRENT_MOVEMENT_FACTOR - (float_speed * 1.2 - 0.02) - float_speed
+        scatter(parts, "x", xs)
+        scatter(parts, "y", ys)
+        if keep_only(parts, ys > 0):
+            self.simulation.entities_changed("dead_part")
+
+    def update_crustaceans(self, crustaceans):
+        xs, ys, speed, direction = gather(crustaceans, "x", "y", "speed", "direction")
+        world = self.simulation.world
+        third = world.height // 3
+        # Above the top third they sink and wander, below it they swim straight and bounce
+        upper = ys < third
+        xs = np.where(upper, xs + self.rng.uniforms(-speed, speed), xs + np.cos(direction) * speed)
+        ys = np.where(upper, ys + speed / 2, ys + np.sin(direction) * speed)
+
+        direction = np.where((xs < 0) | (xs > world.width), np.pi - direction, direction)
+        flip = (ys < third) | (ys > world.height - 10)
+        direction = np.where(flip, np.arctan2(-np.sin(direction), np.cos(direction)), direction)
+
+        scatter(crustaceans, "x", xs)
+        scatter(crustaceans, "y", ys)
+        scatter(crustaceans, "direction", direction)
+
+    def update_eggs(self, eggs):
+        xs, ys, float_speed, survival = gather(eggs, "x", "y", "float_speed", "survival_chance")
+        current_x, current_y = self.simulation.current_grid.sample(xs, ys)
+        xs += current_x * 0.5
+        ys += current_y * 0.5 - float_speed
+        scatter(eggs, "x", xs)
+        scatter(eggs, "y", ys)
+        if keep_only(eggs, (ys > 0) & (ys < self.simulation.world.height) & (self.rng.uniforms(size=len(eggs)) <= survival)):
+            self.simulation.entities_changed("egg")
+
+    def update_dead_fish(self, dead_fish):
+        # Returns the fish that floated to the surface and should be removed
+        xs, ys, float_speed, size = gather(dead_fish, "x", "y", "float_speed", "size")
+        current_x, current_y = self.simulation.current_grid.sample(xs, ys)
+        xs += current_x * CURRENT_MOVEMENT_FACTOR
+        ys += current_y * CURRENT_MOVEMENT_FACTOR - (float_speed * 1.2 - size * 0.02)
+        scatter(dead_fish, "x", xs)
+        scatter(dead_fish, "y", ys)
+        return [fish for fish, y in zip(dead_fish, ys.tolist()) if y <= 0]
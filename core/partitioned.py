@@ -0,0 +1,325 @@
+"""Spatially partitioned multi-process engine.
+
+    python -m core.partitioned --strips 4 --world 2200 650 --ticks 5000 [--compare]
+
+The world is cut into vertical strips along x (which wraps at the world width). Every strip
+is simulated by its own worker process. After each tick the workers hand fish,
+plankton, crustaceans, dead algae parts and eggs that crossed a strip edge over
+to the neighbour, and publish read-only halo copies of fish and food within
+PARTITION_HALO pixels of an edge so neighbours can see, chase and avoid them.
+Algae never move and stay with the strip they were rooted in; their segments near
+an edge are shared for the oxygen grid. Each worker only updates the current columns
+of its own strip and sends those near an edge to the neighbour, which pastes them
+over its stale copy before the next tick.
+"""
+import argparse
+import itertools
+import multiprocessing
+import random
+
+import numpy as np
+
+import core.settings as settings
+from core.settings import PARTITION_HALO
+
+FOOD_KINDS = (("plankton_list", "plankton"), ("crustacean_list", "crustacean"),
+              ("dead_algae_parts", "dead_part"), ("egg_list", "egg"))
+
+
+def strip_bounds(strips, world_width):
+    width = world_width / strips
+    return [(round(i * width), round((i + 1) * width)) for i in range(strips)]
+
+
+def strip_of(x, bounds, world_width):
+    x %= world_width
+    for index, (x0, x1) in enumerate(bounds):
+        if x < x1:
+            return index
+    return len(bounds) - 1
+
+
+def max_strips(world_width):
+    # A halo reaches PARTITION_HALO into the neighbour, so narrower strips would need a second ring of neighbours
+    return max(1, int(world_width // (2 * PARTITION_HALO)))
+
+
+def worker_main(conn, index, strips, seed, next_fish_id, world_size=None):
+    from core.headless import apply_settings_overrides, create_headless_simulation
+    from core.random_source import BlockRandom
+    from entities.fish import HaloFish, HaloFood
+
+    # Workers report to the coordinator; per-worker files would collide
+    apply_settings_overrides({"TELEMETRY_DIR": None, "TICK_TIMER_CSV": None, "LINEAGE_PATH": None,
+                              "RECORD_DIR": None})
+
+    # Same seed as the coordinator so every worker builds an identical current field
+    sim = create_headless_simulation(seed=seed, generate=False, world_size=world_size)
+    random.seed(seed * 1000 + index + 1)
+    # sim.rng was drawn from the shared seed, so every strip would otherwise get the same stream
+    sim.rng = sim.particles.rng = BlockRandom(sim.rng.block_size)
+
+    world_width = sim.world.width
+    bounds = strip_bounds(strips, world_width)
+    x0, x1 = bounds[index]
+    sim.spawn_x_range = (x0, x1 - 1)
+    sim.area_share = (x1 - x0) / world_width
+    sim.stop_on_extinction = False
+    sim.fish_ids = itertools.count(next_fish_id + index, strips)
+    grid = sim.current_grid
+    grid.col_range = (int(x0 // grid.grid_size), min(grid.cols, int(x1 // grid.grid_size) + 1))
+    col_xs = np.arange(grid.cols) * grid.grid_size
+    own_cols = np.arange(*grid.col_range)
+    sim.algae_list, sim.plankton_list, sim.crustacean_list, sim.fish_population = [], [], [], []
+    sim.paused = False
+
+    def attach(entities):
+        for name, items in entities.items():
+            for item in items:
+                if hasattr(item, "simulation"):
+                    item.simulation = sim
+                getattr(sim, name).append(item)
+                # Due ticks are absolute and the workers step in lockstep, so they carry over as is
+                if getattr(item, "expires_at", None) is not None:
+                    sim.schedule_expiry(item)
+                elif name == "fish_population" and item.is_pregnant:
+                    sim.schedule_birth(item)
+                if name == "fish_population" and item.ready_to_mate:
+                    sim.mates.update(item)
+                if name == "fish_population" and not item.is_dead:
+                    sim.stats.add(item)
+                if name == "algae_list":
+                    for seg_x, seg_y in item.segments:
+                        sim.add_segment_to_grid(seg_x, seg_y, item)
+        for kind in sim.entity_versions:
+            sim.entities_changed(kind)
+
+    def detach():
+        # Entities that left the strip, grouped by destination worker
+        outgoing = {}
+        for name in ("fish_population",) + tuple(name for name, _ in FOOD_KINDS):
+            kept = []
+            for item in getattr(sim, name):
+                target = strip_of(item.x, bounds, world_width)
+                if target == index:
+                    kept.append(item)
+                else:
+                    if name == "fish_population":
+                        item.x %= world_width
+                        sim.mates.discard(item)
+                        sim.stats.discard(item)
+                    outgoing.setdefault(target, {}).setdefault(name, []).append(item)
+            setattr(sim, name, kept)
+        for kind in sim.entity_versions:
+            sim.entities_changed(kind)
+        return outgoing
+
+    def halos():
+        if strips == 1:
+            return {}
+        left, right = (index - 1) % strips, (index + 1) % strips
+        # Copies sent across the wrap seam are shifted so distances stay continuous
+        left_shift = world_width if index == 0 else 0
+        right_shift = -world_width if index == strips - 1 else 0
+        out = {left: ([], [], [], []), right: ([], [], [], [])}
+        for fish in sim.fish_population:
+            if fish.x - x0 < PARTITION_HALO:
+                out[left][0].append(HaloFish(fish, left_shift))
+            if x1 - fish.x < PARTITION_HALO:
+                out[right][0].append(HaloFish(fish, right_shift))
+        for name, kind in FOOD_KINDS:
+            for item in getattr(sim, name):
+                if item.x - x0 < PARTITION_HALO:
+                    out[left][1].append(HaloFood(item, kind, left_shift))
+                if x1 - item.x < PARTITION_HALO:
+                    out[right][1].append(HaloFood(item, kind, right_shift))
+        for algae in sim.algae_list:
+            for seg_x, seg_y in algae.segments:
+                if seg_x - x0 < PARTITION_HALO:
+                    out[left][2].append((seg_x + left_shift, seg_y))
+                if x1 - seg_x < PARTITION_HALO:
+                    out[right][2].append((seg_x + right_shift, seg_y))
+        # Column indices are absolute, so current columns need no shift across the seam
+        for target, near in ((left, col_xs[own_cols] - x0 < PARTITION_HALO),
+                             (right, x1 - col_xs[own_cols] < PARTITION_HALO)):
+            cols = own_cols[near]
+            out[target][3].append((cols, grid.strength[:, cols], grid.direction[:, cols]))
+        return out
+
+    def paste_currents(columns):
+        c0, c1 = grid.col_range
+        for cols, strength, direction in columns:
+            foreign = (cols < c0) | (cols >= c1)
+            grid.strength[:, cols[foreign]] = strength[:, foreign]
+            grid.direction[:, cols[foreign]] = direction[:, foreign]
+
+    while True:
+        command, payload = conn.recv()
+        if command == "stop":
+            sim.close()
+            conn.close()
+            return
+
+        if command == "load":
+            attach(payload)
+            conn.send((detach(), halos(), counts(sim)))
+        elif command == "step":
+            incoming, halo_fish, halo_food, halo_segments, halo_currents = payload
+            for entities in incoming:
+                attach(entities)
+            sim.halo_fish = halo_fish
+            sim.halo_food = halo_food
+            sim.halo_segments = halo_segments
+            paste_currents(halo_currents)
+            sim.step()
+            conn.send((detach(), halos(), counts(sim)))
+
+
+def counts(sim):
+    alive = [f for f in sim.fish_population if not f.is_dead]
+    predators = sum(1 for f in alive if f.is_predator)
+    return {
+        "fish": len(alive),
+        "predators": predators,
+        "prey": len(alive) - predators,
+        "plankton": len(sim.plankton_list),
+        "crustaceans": len(sim.crustacean_list),
+        "dead_parts": len(sim.dead_algae_parts),
+        "eggs": len(sim.egg_list),
+        "algae": len(sim.algae_list),
+        "algae_parts": sum(len(a.segments) for a in sim.algae_list),
+    }
+
+
+class PartitionedSimulation:
+    def __init__(self, strips, seed=0, world_size=None):
+        from core.headless import create_headless_simulation
+
+        self.strips = strips
+        self.tick = 0
+
+        # The initial world is generated once and dealt out to the strips
+        world = create_headless_simulation(seed=seed, world_size=world_size)
+        width = world.world.width
+        self.bounds = strip_bounds(strips, width)
+        initial = [{} for _ in range(strips)]
+        for algae in world.algae_list:
+            initial[strip_of(algae.root_x, self.bounds, width)].setdefault("algae_list", []).append(algae)
+        for name in ("fish_population", "plankton_list", "crustacean_list", "dead_algae_parts", "egg_list"):
+            for item in getattr(world, name):
+                initial[strip_of(item.x, self.bounds, width)].setdefault(name, []).append(item)
+        next_fish_id = next(world.fish_ids)
+        world.close()
+
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for index in range(strips):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=worker_main,
+                                      args=(child_conn, index, strips, seed, next_fish_id, world_size), daemon=True)
+            process.start()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+        for conn, entities in zip(self.connections, initial):
+            conn.send(("load", entities))
+        self.collect()
+
+    def collect(self):
+        self.incoming = [[] for _ in range(self.strips)]
+        self.halo_fish = [[] for _ in range(self.strips)]
+        self.halo_food = [[] for _ in range(self.strips)]
+        self.halo_segments = [[] for _ in range(self.strips)]
+        self.halo_currents = [[] for _ in range(self.strips)]
+        self.counts = []
+        for conn in self.connections:
+            outgoing, halos, counts = conn.recv()
+            for target, entities in outgoing.items():
+                self.incoming[target].append(entities)
+            for target, (fish, food, segments, currents) in halos.items():
+                self.halo_fish[target].extend(fish)
+                self.halo_food[target].extend(food)
+                self.halo_segments[target].extend(segments)
+                self.halo_currents[target].extend(currents)
+            self.counts.append(counts)
+
+    def step(self):
+        for index, conn in enumerate(self.connections):
+            conn.send(("step", (self.incoming[index], self.halo_fish[index], self.halo_food[index],
+                                self.halo_segments[index], self.halo_currents[index])))
+        self.collect()
+        self.tick += 1
+        return self.totals()["fish"] > 0
+
+    def totals(self):
+        totals = {}
+        for counts in self.counts:
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(("stop", None))
+        for process in self.processes:
+            process.join()
+
+
+def run_single_process(seed, ticks, report_every, world_size=None):
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=seed, world_size=world_size)
+    sim.stop_on_extinction = False
+    curve = []
+    for tick in range(1, ticks + 1):
+        sim.step()
+        if tick % report_every == 0:
+            curve.append((tick, counts(sim)))
+    sim.close()
+    return curve
+
+
+def summarize(label, curve):
+    keys = ("fish", "predators", "prey", "plankton", "crustaceans", "algae_parts")
+    means = {key: sum(c[key] for _, c in curve) / len(curve) for key in keys}
+    print(f"{label:>16}: " + "  ".join(f"{key} {value:.1f}" for key, value in means.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the strip-partitioned multi-process engine headless")
+    parser.add_argument("--strips", type=int,
+                        help="worker processes (default: the CPU count, capped so strips are 2 * PARTITION_HALO wide)")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=int, default=100)
+    parser.add_argument("--world", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        help="world size in pixels (default: the window size)")
+    parser.add_argument("--compare", action="store_true", help="also run the single-process engine and compare means")
+    args = parser.parse_args()
+    world_width = args.world[0] if args.world else (settings.WORLD_SIZE or (settings.WIDTH, settings.HEIGHT))[0]
+    if args.strips is None:
+        args.strips = min(multiprocessing.cpu_count(), max_strips(world_width))
+    elif not 1 <= args.strips <= max_strips(world_width):
+        parser.error(f"a {world_width} px wide world takes 1 to {max_strips(world_width)} strips "
+                     f"of at least 2 * PARTITION_HALO = {2 * PARTITION_HALO} px")
+
+    engine = PartitionedSimulation(args.strips, args.seed, args.world)
+    curve = []
+    try:
+        for tick in range(1, args.ticks + 1):
+            engine.step()
+            if tick % args.report_every == 0:
+                totals = engine.totals()
+                curve.append((tick, totals))
+                print(f"tick {tick}: " + "  ".join(f"{key} {value}" for key, value in totals.items()))
+    finally:
+        engine.close()
+
+    if args.compare and curve:
+        summarize(f"{args.strips} strips", curve)
+        summarize("single process", run_single_process(args.seed, args.ticks, args.report_every, args.world))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from core.lineage import GENES
+
+
+class PopulationStats:
+    # Running totals over the living fish, kept up to date on births and deaths so reading them
+    # never walks the population. Every allele of every fish counts once, so a gene's mean and
+    # variance are taken over 2 * alive values.
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.members = set()
+        self.counts = {(is_predator, is_male): 0 for is_predator in (False, True) for is_male in (False, True)}
+        self.egglayers = 0
+        self.sums = [0.0] * len(GENES)
+        self.squares = [0.0] * len(GENES)
+
+    def add(self, fish):
+        if fish in self.members:
+            return
+        self.members.add(fish)
+        self.apply(fish, 1)
+
+    def discard(self, fish):
+        if fish not in self.members:
+            return
+        self.members.discard(fish)
+        self.apply(fish, -1)
+
+    def apply(self, fish, sign):
+        self.counts[(fish.is_predator, fish.is_male)] += sign
+        self.egglayers += sign if fish.is_egglayer else 0
+        genome = fish.genome
+        sums, squares = self.sums, self.squares
+        for i, gene in enumerate(GENES):
+            a, b = genome[gene]["alleles"]
+            sums[i] += sign * (a + b)
+            squares[i] += sign * (a * a + b * b)
+
+    @property
+    def alive(self):
+        return len(self.members)
+
+    @property
+    def predators(self):
+        return self.counts[(True, False)] + self.counts[(True, True)]
+
+    @property
+    def prey(self):
+        return self.counts[(False, False)] + self.counts[(False, True)]
+
+    @property
+    def males(self):
+        return self.counts[(False, True)] + self.counts[(True, True)]
+
+    def fraction(self, count):
+        return count / self.alive if self.members else 0
+
+    def fractions(self):
+        # Predator, egg-layer and male share of the living fish
+        return self.fraction(self.predators), self.fraction(self.egglayers), self.fraction(self.males)
+
+    def means(self):
+        values = 2 * self.alive
+        if not values:
+            return [0.0] * len(GENES)
+        return [total / values for total in self.sums]
+
+    def variances(self):
+        values = 2 * self.alive
+        if not values:
+            return [0.0] * len(GENES)
+        # Removals leave rounding residue in the sums, so tiny negative results are clipped
+        return [max(0.0, square / values - (total / values) ** 2) for total, square in zip(self.sums, self.squares)]
@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+
+
+class BlockRandom:
+    # Uniforms and normals are drawn from NumPy in blocks and handed out one by one to scalar
+    # callers; batched code takes whole arrays straight from the generator
+    def __init__(self, block_size=4096, seed=None):
+        self.generator = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        self.block_size = block_size
+        self.uniform_block = []
+        self.uniform_index = 0
+        self.normal_block = []
+        self.normal_index = 0
+
+    def random(self):
+        index = self.uniform_index
+        if index >= len(self.uniform_block):
+            self.uniform_block = self.generator.random(self.block_size).tolist()
+            index = 0
+        self.uniform_index = index + 1
+        return self.uniform_block[index]
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
+
+    def randint(self, low, high):
+        # Both ends included, like random.randint
+        return low + int(self.random() * (high - low + 1))
+
+    def choice(self, sequence):
+        return sequence[int(self.random() * len(sequence))]
+
+    def normal(self, mean=0.0, sigma=1.0):
+        index = self.normal_index
+        if index >= len(self.normal_block):
+            self.normal_block = self.generator.standard_normal(self.block_size).tolist()
+            index = 0
+        self.normal_index = index + 1
+        return mean + sigma * self.normal_block[index]
+
+    def uniforms(self, low=0.0, high=1.0, size=None):
+        return self.generator.uniform(low, high, size)
+
+    def normals(self, mean=0.0, sigma=1.0, size=None):
+        return self.generator.normal(mean, sigma, size)
+
+    def choices(self, options, size):
+        return np.asarray(options)[self.generator.integers(0, len(options), size)]
@@ -0,0 +1,195 @@
+"""Record frames of a run without slowing it down, and turn recordings into images or video.
+
+    python -m core.recorder recordings/run-20250101-120000 --png frames/
+    python -m core.recorder recordings/run-20250101-120000 --video run.mp4 [--fps 25]
+
+The simulation only copies the composed frame into a bounded queue; worker threads compress
+it and write it out. In "raw" format every worker appends zlib-compressed frames to its own
+chunk files (a header per frame, see FRAME), which this converter merges back in tick order.
+Video output pipes the frames into ffmpeg, which has to be on the PATH.
+"""
+import argparse
+import glob
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import zlib
+
+import numpy as np
+import pygame
+
+FRAME = struct.Struct("<qIII")  # tick, width, height, compressed length
+STOP = object()
+
+
+class FrameRecorder:
+    def __init__(self, directory, every=1, fmt="raw", queue_size=64, workers=2, chunk_frames=250):
+        if fmt not in ("raw", "png"):
+            raise ValueError(f"Unknown recording format: {fmt}")
+        self.directory = os.path.join(directory, time.strftime("run-%Y%m%d-%H%M%S"))
+        os.makedirs(self.directory, exist_ok=True)
+        self.every = max(1, every)
+        self.format = fmt
+        self.chunk_frames = chunk_frames
+        self.next_tick = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.size = None
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = [threading.Thread(target=self.work, args=(i,), name=f"frame-recorder-{i}", daemon=True)
+                        for i in range(max(1, workers))]
+        for worker in self.workers:
+            worker.start()
+
+    def due(self, tick):
+        return tick >= self.next_tick
+
+    def capture(self, surface, tick):
+        if tick < self.next_tick:
+            return
+        self.next_tick = tick + self.every
+        if self.size is None:
+            self.size = surface.get_size()
+        # A 32-bit surface is copied as packed pixels (one memcpy); unpacking to RGB is left to the workers
+        if surface.get_bytesize() == 4:
+            pixels = pygame.surfarray.pixels2d(surface)
+            frame = (pixels.copy(order="K"), surface.get_shifts()[:3])
+            del pixels
+        else:
+            frame = (pygame.surfarray.array3d(surface), None)
+        # The simulation never waits on the encoders; frames are dropped when they fall behind
+        try:
+            self.queue.put_nowait((tick, frame))
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def work(self, index):
+        chunk = None
+        chunk_path = None
+        chunk_count = 0
+        written = 0
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                break
+            tick, (pixels, shifts) = item
+            rgb = to_rgb(pixels, shifts)
+            height, width = rgb.shape[:2]
+            if self.format == "png":
+                path = os.path.join(self.directory, f"frame-{tick:09d}.png")
+                pygame.image.save(pygame.image.frombuffer(rgb.tobytes(), (width, height), "RGB"), path)
+                continue
+
+            if chunk is None:
+                chunk_count += 1
+                chunk_path = os.path.join(self.directory, f"chunk-{index:02d}-{chunk_count:06d}.bin")
+                chunk = open(chunk_path + ".part", "wb")
+            data = zlib.compress(rgb.tobytes(), 3)
+            chunk.write(FRAME.pack(tick, width, height, len(data)))
+            chunk.write(data)
+            written += 1
+            if written >= self.chunk_frames:
+                # Renamed when full, so the converter only picks up complete chunks
+                chunk.close()
+                os.replace(chunk_path + ".part", chunk_path)
+                chunk = None
+                written = 0
+        if chunk is not None:
+            chunk.close()
+            os.replace(chunk_path + ".part", chunk_path)
+
+    def write_manifest(self):
+        manifest = {"format": self.format, "every": self.every, "size": self.size,
+                    "recorded": self.recorded, "dropped": self.dropped}
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        if not any(worker.is_alive() for worker in self.workers):
+            return
+        for _ in self.workers:
+            self.queue.put(STOP)
+        for worker in self.workers:
+            worker.join()
+        self.write_manifest()
+
+
+def to_rgb(pixels, shifts):
+    # Packed (width, height) pixels or an (width, height, 3) array into (height, width, 3) bytes
+    if shifts is None:
+        return np.ascontiguousarray(pixels.transpose(1, 0, 2))
+    packed = pixels.T
+    rgb = np.empty(packed.shape + (3,), dtype=np.uint8)
+    for channel, shift in enumerate(shifts):
+        rgb[..., channel] = packed >> shift
+    return rgb
+
+
+def read_frames(directory):
+    # Every recorded frame as (tick, rgb array), oldest first
+    index = []
+    for path in glob.glob(os.path.join(directory, "chunk-*.bin")):
+        with open(path, "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    break
+                tick, width, height, length = FRAME.unpack(header)
+                index.append((tick, path, offset + FRAME.size, width, height, length))
+                offset += FRAME.size + length
+                f.seek(offset)
+    index.sort()
+    for tick, path, offset, width, height, length in index:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = zlib.decompress(f.read(length))
+        yield tick, np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a raw frame recording to PNG images or a video")
+    parser.add_argument("recording", help="run directory written by the recorder")
+    parser.add_argument("--png", metavar="DIR", help="write one PNG per frame into DIR")
+    parser.add_argument("--video", metavar="FILE", help="encode the frames with ffmpeg, e.g. run.mp4")
+    parser.add_argument("--fps", type=int, default=25)
+    args = parser.parse_args()
+
+    if not args.png and not args.video:
+        parser.error("nothing to do, pass --png and/or --video")
+    if args.video and shutil.which("ffmpeg") is None:
+        parser.error("ffmpeg was not found on the PATH, use --png instead")
+    if args.png:
+        os.makedirs(args.png, exist_ok=True)
+
+    ffmpeg = None
+    frames = 0
+    for tick, rgb in read_frames(args.recording):
+        height, width = rgb.shape[:2]
+        if args.png:
+            surface = pygame.image.frombuffer(rgb.tobytes(), (width, height), "RGB")
+            pygame.image.save(surface, os.path.join(args.png, f"frame-{tick:09d}.png"))
+        if args.video:
+            if ffmpeg is None:
+                ffmpeg = subprocess.Popen(["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo",
+                                           "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(args.fps),
+                                           "-i", "-", "-pix_fmt", "yuv420p", args.video], stdin=subprocess.PIPE)
+            ffmpeg.stdin.write(rgb.tobytes())
+        frames += 1
+    if ffmpeg is not None:
+        ffmpeg.stdin.close()
+        ffmpeg.wait()
+    print(f"{frames} frames converted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import pygame
+
+from core.settings import DIRTY_ALGAE_PATCH_LIMIT, DIRTY_REFRESH_EVERY, DIRTY_RENDERING
+
+EMPTY = pygame.Rect(0, 0, 0, 0)
+
+
+class DirtyRenderer:
+    # The screen keeps last frame's pixels, so only the areas sprites were drawn on need the
+    # background back. Every entity is still drawn each frame (a restored rect may cut through a
+    # sprite that did not move), but only last frame's and this frame's rects go to the display.
+    # Full-screen overlays, camera moves and the periodic refresh take the full path instead.
+    # Algae barely change between frames, so they live in a layer over the background that is
+    # patched only where a plant grew, was eaten or died; the screen is restored from that layer.
+    def __init__(self, simulation, enabled=DIRTY_RENDERING, refresh_every=DIRTY_REFRESH_EVERY,
+                 patch_limit=DIRTY_ALGAE_PATCH_LIMIT):
+        self.simulation = simulation
+        self.enabled = enabled
+        self.refresh_every = max(1, refresh_every)
+        self.patch_limit = patch_limit
+        self.rects = []
+        self.previous = []
+        self.patched = []
+        self.full = True
+        self.invalid = True
+        self.offset = None
+        self.frames = 0
+
+        self.layer = None
+        self.layer_offset = None
+        self.drawn = {}  # algae -> (version, rect) as currently drawn on the layer
+
+    def invalidate(self):
+        self.invalid = True
+        self.full = True
+
+    def overlay_active(self):
+        modes = self.simulation.modes
+        return (modes.show_vision or modes.show_targets or modes.show_current or
+                modes.show_temp_map or modes.show_oxygen_map)
+
+    def begin(self):
+        sim = self.simulation
+        screen, camera = sim.screen, sim.camera
+        if not self.enabled:
+            self.full = True
+            screen.blit(sim.background, (0, 0), (0, camera.y, *screen.get_size()))
+            self.rects = []
+            return
+
+        overlay = self.overlay_active()
+        rebuilt = self.update_layer()
+        self.full = (rebuilt or self.invalid or overlay or camera.offset != self.offset or
+                     self.frames % self.refresh_every == 0)
+        # Overlays leave pixels nothing keeps track of, so the frame after one is full as well
+        self.invalid = overlay
+        if self.full:
+            screen.blit(self.layer, (0, 0))
+        else:
+            layer = self.layer
+            for rect in self.previous + self.patched:
+                screen.blit(layer, rect, rect)
+        self.offset = camera.offset
+        self.rects = []
+
+    def update_layer(self):
+        # Returns True when the whole layer was redrawn, otherwise leaves the patched areas in self.patched
+        sim = self.simulation
+        screen, camera = sim.screen, sim.camera
+        self.patched = []
+        if self.layer is None or self.layer.get_size() != screen.get_size() or self.layer_offset != camera.offset:
+            self.rebuild_layer()
+            return True
+
+        drawn = self.drawn
+        current = set(sim.algae_list)
+        removed = [algae for algae in drawn if algae not in current]
+        changed = [algae for algae in sim.algae_list if drawn.get(algae, (None,))[0] != algae.version]
+        if not removed and not changed:
+            return False
+        if len(removed) + len(changed) > self.patch_limit:
+            self.rebuild_layer()
+            return True
+
+        cleared = [drawn.pop(algae)[1] for algae in removed]
+        cleared += [drawn[algae][1] for algae in changed if algae in drawn]
+        background = sim.background
+        for rect in cleared:
+            self.layer.blit(background, rect, rect.move(0, camera.y))
+        # Plants crossing a cleared area lost some pixels there, so they are drawn again as well
+        redraw = set(changed)
+        redraw.update(algae for algae, (_, rect) in drawn.items() if rect.collidelist(cleared) != -1)
+        offset = camera.offset
+        for algae in sim.algae_list:
+            if algae in redraw:
+                rect = algae.draw(self.layer, offset) or EMPTY
+                drawn[algae] = (algae.version, rect)
+                if algae in changed:
+                    cleared.append(rect)
+        self.patched = cleared
+        return False
+
+    def rebuild_layer(self):
+        sim = self.simulation
+        screen, camera = sim.screen, sim.camera
+        if self.layer is None or self.layer.get_size() != screen.get_size():
+            self.layer = screen.copy()
+        self.layer.blit(sim.background, (0, 0), (0, camera.y, *screen.get_size()))
+        offset = camera.offset
+        self.drawn = {algae: (algae.version, algae.draw(self.layer, offset) or EMPTY) for algae in sim.algae_list}
+        self.layer_offset = offset
+
+    def add(self, rect):
+        if rect is not None:
+            self.rects.append(rect)
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + self.patched + self.rects)
+        self.previous = self.rects
+        self.frames += 1
@@ -0,0 +1,38 @@
+import heapq
+import itertools
+
+
+class TimingWheel:
+    def __init__(self, slots=1024):
+        self.size = slots
+        self.slots = [[] for _ in range(slots)]
+        self.overflow = []
+        self.counter = itertools.count()
+        self.now = 0
+
+    def schedule(self, delay, kind, entity):
+        return self.schedule_at(self.now + max(1, int(delay)), kind, entity)
+
+    def schedule_at(self, tick, kind, entity):
+        tick = max(tick, self.now + 1)
+        if tick - self.now < self.size:
+            self.slots[tick % self.size].append((kind, entity))
+        else:
+            # Events beyond one turn of the wheel wait in a heap until they come into range
+            heapq.heappush(self.overflow, (tick, next(self.counter), kind, entity))
+        return tick
+
+    def advance(self):
+        self.now += 1
+        overflow = self.overflow
+        while overflow and overflow[0][0] - self.now < self.size:
+            tick, _, kind, entity = heapq.heappop(overflow)
+            self.slots[tick % self.size].append((kind, entity))
+
+        index = self.now % self.size
+        due = self.slots[index]
+        self.slots[index] = []
+        return due
+
+    def __len__(self):
+        return sum(len(slot) for slot in self.slots) + len(self.overflow)
@@ -13,6 +13,59 @@ IDLE_MOVEMENT_FACTOR = 0.2
 
 PROFILING = False
 MOUSE_CLICK = True
+CREATIVE_BRUSH_RADIUS = 40  # Creative brush size in pixels, changed with the mouse wheel
+CREATIVE_BRUSH_COUNT = 20  # Entities a brush stroke spawns per mouse event
+CREATIVE_AREA_COUNT = 500  # Entities a Shift+click spawns over the whole brush area
+STARTUP_IMPORT_BUDGET_MS = 400  # Checked by python -m core.startup
+
+DIRTY_RENDERING = True  # Repaint only the areas sprites moved through instead of the whole window
+DIRTY_REFRESH_EVERY = 250  # Frames between full repaints in dirty mode
+DIRTY_ALGAE_PATCH_LIMIT = 40  # Changed plants in one frame above which the algae layer is redrawn whole
+
+TICK_TIMER_WINDOW = 50  # Ticks averaged by the timings overlay
+TICK_TIMER_CSV = None  # e.g. "tick_timings.csv" to stream per-tick phase timings
+
+TELEMETRY_DIR = None  # e.g. "telemetry" to write per-tick population data in the background
+TELEMETRY_CHUNK_ROWS = 5000
+TELEMETRY_QUEUE_SIZE = 1024
+TELEMETRY_FISH_SAMPLE_EVERY = 0  # Ticks between per-fish trait samples, 0 disables them
+
+LINEAGE_PATH = None  # e.g. "lineage.bin" to log every fish with its parents, genome and death
+
+METRICS_PORT = None  # e.g. 8765 to serve /metrics, /snapshot and /control/* while the window runs
+METRICS_HOST = "127.0.0.1"
+CHECKPOINT_DIR = "checkpoints"  # Where the checkpoint control command writes population dumps
+MAX_SPEED = 64  # Highest speed multiplier /control/speed accepts, larger values are clamped to it
+
+RECORD_DIR = None  # e.g. "recordings" to save frames of the run, windowed or headless
+RECORD_EVERY = 1  # Ticks between recorded frames
+RECORD_FORMAT = "raw"  # "raw" zlib chunks (convert with python -m core.recorder) or "png"
+RECORD_QUEUE_SIZE = 64  # Frames waiting for the encoders before new ones are dropped
+RECORD_WORKERS = 2
+RECORD_CHUNK_FRAMES = 250
+
+HISTORY_RECENT = 2000  # Newest ticks the plot history keeps at full resolution
+HISTORY_FACTOR = 10  # Samples (or buckets) folded into one bucket of the next coarser tier
+HISTORY_TIER_SIZE = 1000  # Buckets per tier before the oldest move on
+HISTORY_TIERS = 3
+
+CACHE_DIR = ".cache"  # Precomputed tables reused between runs, None disables the cache
+NOISE_TABLE_STEP = 4  # Ticks between cached samples of the current noise
+LAYER_INDEX_TOLERANCE = 2.0  # Pixels a current layer boundary may drift before the layer index is rebuilt
+
+SPATIAL_BACKEND = "auto"  # "grid", "kdtree" (needs scipy) or "auto" to time both on the live world
+SPATIAL_CELL_SIZE = 50
+SPATIAL_MARGIN = 20  # Pixels a fish may move between index rebuilds and still be found
+SPATIAL_AUTO_INTERVAL = 500  # Ticks between backend re-checks in auto mode
+
+RANDOM_BLOCK_SIZE = 4096  # Values drawn at once by the shared block random source
+SCHEDULER_SLOTS = 1024  # Timing wheel size in ticks; later events wait in an overflow heap
+
+WORLD_SIZE = None  # (width, height) of the ocean, None makes it the size of the window
+WORLD_CHUNK_SIZE = 500  # Pixels per side of the chunks sparse environment fields are allocated in
+CAMERA_SPEED = 20  # Pixels per frame the arrow keys scroll a world larger than the window
+
+PARTITION_HALO = 200  # Pixels of neighbouring strips visible to a strip worker (covers max mate vision)
 
 # Fish
 PREY_PREGNANCY_DUR = (DAY_LENGTH * 5, DAY_LENGTH * 8)
@@ -26,6 +79,9 @@ DEGISTION_EFECT = 0.5
 REPRODUCTION_EFECT = 0.2
 METABOLISM_EFECT = 0.9
 
+LOD_ENABLED = True  # Idle fish with nothing in vision skip full decisions
+LOD_MAX_INTERVAL = 8  # Longest run of coasting ticks between full decisions
+
 OVERLAP_THRESHOLD = 0.1
 APT = 0.002 # Age per tick
 EAT_SIZE = 2.5
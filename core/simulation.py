@@ -1,13 +1,32 @@
+import copy
+import itertools
+import json
 import math
+import os
 import random
+from time import perf_counter
 
+import numpy as np
 import pygame
 
-from core.environment import CurrentGrid
+from core.environment import AlgaeDensityRaster, CurrentGrid
 from core.event_handler import EventHandler
+from core.mate_registry import MateRegistry
+from core.population_stats import PopulationStats
+from core.lineage import LineageLog
+from core.metrics import MetricsServer
 from core.mode_manager import ModeManager
-from entities.algae import Algae
-from entities.fish import Fish
+from core.particles import ParticleSystem
+from core.random_source import BlockRandom
+from core.recorder import FrameRecorder
+from core.rendering import DirtyRenderer
+from core.scheduler import TimingWheel
+from core.spatial import SpatialIndex
+from core.telemetry import TelemetryWriter
+from core.tick_timer import TickTimer
+from core.world import Camera, ChunkedField, World
+from entities.algae import Algae, DeadAlgaePart
+from entities.fish import Egg, Fish
 from entities.simple_organisms import Crustacean, Plankton
 from plots.plot import Plot
 from ui.ui import UI
@@ -15,33 +34,76 @@ from core.settings import *
 
 
 class Simulation:
-    def __init__(self, screen, clock):
+    def __init__(self, screen, clock, world=None):
         # Environment parameters
         self.screen = screen
         self.clock = clock
 
+        # The world can be larger than the window, which shows it through the camera
+        self.world = world or World(*(WORLD_SIZE or screen.get_size()), WORLD_CHUNK_SIZE)
+        self.camera = Camera(self.world, *screen.get_size())
+
         # Core managers and UI
         self.event_handler = EventHandler(self)
         self.ui = UI(self, screen, clock)
         self.modes = ModeManager()
         self.plot = Plot(self)
+        self.renderer = DirtyRenderer(self)
+        self.timer = TickTimer(TICK_TIMER_WINDOW, TICK_TIMER_CSV)
+        self.telemetry = TelemetryWriter(TELEMETRY_DIR, TELEMETRY_CHUNK_ROWS, TELEMETRY_QUEUE_SIZE,
+                                         TELEMETRY_FISH_SAMPLE_EVERY) if TELEMETRY_DIR else None
+        self.lineage = LineageLog(LINEAGE_PATH) if LINEAGE_PATH else None
+        # Started by run(), so headless harnesses that only call step() never bind the port
+        self.metrics = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+        self.recorder = FrameRecorder(RECORD_DIR, RECORD_EVERY, RECORD_FORMAT, RECORD_QUEUE_SIZE, RECORD_WORKERS,
+                                      RECORD_CHUNK_FRAMES) if RECORD_DIR else None
+        # Set by core/headless.py; headless runs have no run loop, so step() composes recorded frames itself
+        self.headless = False
+
+        # Shared random source for hot paths, seeded from the random module so runs stay reproducible
+        self.rng = BlockRandom(RANDOM_BLOCK_SIZE)
+
+        # Lifetimes, incubation and pregnancies are kept as due ticks instead of per-tick countdowns
+        self.scheduler = TimingWheel(SCHEDULER_SLOTS)
+        self.particles = ParticleSystem(self)
 
         # Game objects
+        self.fish_ids = itertools.count()
+        # Filled by start_generation; empty here so harnesses that build a world by hand can add_fish
+        self.fish_population = []
         self.dead_algae_parts = []
         self.egg_list = []
 
+        # World partitioning (narrowed by core/partitioned.py workers that own one strip)
+        self.spawn_x_range = (0, self.world.width)
+        self.area_share = 1.0
+        self.stop_on_extinction = True
+        self.halo_fish = []
+        self.halo_food = []
+        self.halo_segments = []  # Algae segments of neighbouring strips, they only feed the oxygen grid
+        self.visible_fish = []
+
+        # Neighbour queries for fish perception. The versions are bumped on every change to an indexed
+        # list, so an index is rebuilt even when a removal and an append in one tick keep its length
+        self.spatial = SpatialIndex(self)
+        self.entity_versions = dict.fromkeys(("plankton", "crustacean", "dead_part", "egg", "fish"), 0)
+        self.mates = MateRegistry()
+        self.stats = PopulationStats()
+
         # Game state
         self.running = True
         self.paused = False
+        self.speed = 1.0
+        self.last_checkpoint = None
         self.show_stats = True
         self.show_fps = False
 
         # Background and grids
-        self.background = self.create_background(WIDTH, HEIGHT)
+        self.background = self.create_background(screen.get_width(), self.world.height)
         self.grid_size = 10
         self.grid_cell_size = 50
-        self.oxygen_grid = {}
-        self.temperature_grid = {}
+        self.oxygen_grid = ChunkedField(self.world, self.grid_size, MIN_OXYGEN)
+        self.temperature_grid = ChunkedField(self.world, self.grid_size, MIN_TEMP)
         self.algae_grid = {}
 
         # Time and seasons
@@ -65,7 +127,10 @@ class Simulation:
 
         self.current_change_timer = 0
         self.current_change_interval = DAY_LENGTH * 3.5
-        self.current_grid = CurrentGrid(self, WIDTH, HEIGHT, 50, layers=5)
+        self.current_grid = CurrentGrid(self, self.world.width, self.world.height, 50, layers=5)
+        grid = self.current_grid
+        self.algae_density = AlgaeDensityRaster(grid.cols * grid.grid_size, grid.rows * grid.grid_size,
+                                                self.grid_size, self.world.chunk_size)
 
         # Generation logic
         self.is_generating = False
@@ -74,16 +139,14 @@ class Simulation:
         self.generation_objects = []
         self.algae_to_grow = []
 
-        # Randomness and frame tracking
-        self.random_buffer = [random.random() for _ in range(1000)]
-        self.random_index = 0
+        # Coarse occupancy used to wake up coasting fish (see Fish.coast)
+        self.activity_grid = {}
+
+        # Frame tracking
         self.frame_counter = 0
 
     def get_random(self):
-        self.random_index = (self.random_index + 1) % len(self.random_buffer)
-        if self.random_index == 0:
-            self.random_buffer = [random.random() for _ in range(1000)]
-        return self.random_buffer[self.random_index]
+        return self.rng.random()
     
     def add_segment_to_grid(self, seg_x, seg_y, algae):
         grid_x = int(seg_x // self.grid_cell_size)
@@ -92,14 +155,20 @@ class Simulation:
         if key not in self.algae_grid:
             self.algae_grid[key] = []
         self.algae_grid[key].append((seg_x, seg_y, algae))
+        self.algae_density.add(seg_x, seg_y)
+        self.spatial.segment_added(algae, seg_x, seg_y)
 
     def remove_segment_from_grid(self, seg_x, seg_y, algae):
         grid_x = int(seg_x // self.grid_cell_size)
         grid_y = int(seg_y // self.grid_cell_size)
         key = (grid_x, grid_y)
         if key in self.algae_grid:
-            self.algae_grid[key] = [seg for seg in self.algae_grid[key]
+            segments = self.algae_grid[key]
+            self.algae_grid[key] = [seg for seg in segments
                                     if not (seg[0] == seg_x and seg[1] == seg_y and seg[2] == algae)]
+            for _ in range(len(segments) - len(self.algae_grid[key])):
+                self.algae_density.remove(seg_x, seg_y)
+                self.spatial.segment_removed(algae, seg_x, seg_y)
             if not self.algae_grid[key]:
                 del self.algae_grid[key]
 
@@ -114,17 +183,221 @@ class Simulation:
                     nearby_segments.extend(self.algae_grid[key])
         return nearby_segments
 
+    def entities_changed(self, kind):
+        self.entity_versions[kind] += 1
+
+    def add_plankton(self, plankton):
+        self.plankton_list.append(plankton)
+        self.entities_changed("plankton")
+        self.schedule_expiry(plankton)
+
+    def add_crustacean(self, crustacean):
+        self.crustacean_list.append(crustacean)
+        self.entities_changed("crustacean")
+        self.schedule_expiry(crustacean)
+
+    def add_dead_part(self, dead_part):
+        self.dead_algae_parts.append(dead_part)
+        self.entities_changed("dead_part")
+        self.schedule_expiry(dead_part)
+
+    def add_egg(self, egg):
+        self.egg_list.append(egg)
+        self.entities_changed("egg")
+        self.schedule_expiry(egg)
+
+    def add_fish(self, fish):
+        self.fish_population.append(fish)
+        self.entities_changed("fish")
+        self.stats.add(fish)
+        if self.lineage is not None:
+            fish.lineage_row = self.lineage.record_birth(fish, self.scheduler.now)
+
+    def on_fish_died(self, fish, cause):
+        self.stats.discard(fish)
+        if self.lineage is not None and fish.lineage_row is not None:
+            self.lineage.record_death(fish.lineage_row, self.scheduler.now, cause)
+
+    def remove_fish(self, *fish, cause="removed"):
+        # Fish still alive die of cause on the way out; dead ones were reported when they died
+        for f in fish:
+            if not f.is_dead:
+                self.on_fish_died(f, cause)
+            f.removed = True
+            self.mates.discard(f)
+        if len(fish) == 1:
+            self.fish_population.remove(fish[0])
+        else:
+            gone = set(fish)
+            self.fish_population[:] = [f for f in self.fish_population if f not in gone]
+        self.entities_changed("fish")
+
+    def spawn_many(self, kind, positions, **params):
+        # Bulk creation for stress tests and the creative brushes. positions is an (n, 2) array;
+        # plankton and crustacean parameters are drawn as arrays in one go, and any of them can be
+        # fixed with a keyword, either one value for all or one per position. Returns the new entities.
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        count = len(positions)
+        world = self.world
+        xs = np.clip(positions[:, 0], 0, world.width).tolist()
+        ys = np.clip(positions[:, 1], 0, world.height).tolist()
+        generator = self.rng.generator
+
+        def values(name, draw):
+            value = params.pop(name, None)
+            return np.broadcast_to(draw() if value is None else value, count).tolist()
+
+        if kind == "plankton":
+            energy = values("energy_value", lambda: generator.integers(3, 8, count))
+            lifetime = values("lifetime", lambda: np.round(generator.uniform(*PLANKTON_LIFETIME, count)).astype(int))
+            entities = [Plankton(*args) for args in zip(xs, ys, energy, lifetime)]
+            target = self.plankton_list
+        elif kind == "crustacean":
+            energy = values("energy_value", lambda: generator.integers(25, 41, count))
+            speed = values("speed", lambda: generator.uniform(0.5, 1.0, count))
+            direction = values("direction", lambda: generator.uniform(0, 2 * math.pi, count))
+            lifetime = values("lifetime", lambda: np.round(generator.uniform(*CRUSTACEAN_LIFETIME, count)).astype(int))
+            entities = [Crustacean(*args) for args in zip(xs, ys, energy, speed, direction, lifetime)]
+            target = self.crustacean_list
+        elif kind == "fish":
+            # Fish build their genome and traits one by one, so only the energy is drawn in bulk
+            energy = values("energy", lambda: generator.integers(40, 61, count))
+            genome = params.pop("genome", None)
+            entities = [Fish(x, y, self, e, copy.deepcopy(genome) if genome is not None else None)
+                        for x, y, e in zip(xs, ys, energy)]
+        else:
+            raise ValueError(f"Cannot spawn {kind!r}, use plankton, crustacean or fish")
+        if params:
+            raise TypeError(f"Unknown {kind} parameters: {', '.join(params)}")
+
+        if kind == "fish":
+            for fish in entities:
+                self.add_fish(fish)
+        else:
+            target.extend(entities)
+            self.entities_changed(kind)
+            for entity in entities:
+                self.schedule_expiry(entity)
+        return entities
+
+    def delete_within(self, kind, x, y, radius):
+        # Removes every entity of a spatial index kind inside the circle and returns how many.
+        # Lists are filtered in place once, so clearing thousands costs no more than a few.
+        population = set(self.fish_population) if kind == "fish" else None
+        doomed = set()
+        for entity in self.spatial.moving_within(kind, x, y, radius):
+            if (entity.x - x) ** 2 + (entity.y - y) ** 2 > radius * radius:
+                continue
+            if population is not None and entity not in population:
+                continue  # Halo copies of fish from a neighbouring strip
+            doomed.add(entity)
+        if not doomed:
+            return 0
+
+        if kind == "fish":
+            self.remove_fish(*doomed)
+            return len(doomed)
+        entities = self.spatial.items(kind)
+        entities[:] = [e for e in entities if e not in doomed]
+        self.entities_changed(kind)
+        return len(doomed)
+
+    def schedule_expiry(self, entity):
+        if entity.expires_at is None:
+            entity.expires_at = self.scheduler.now + entity.lifetime_ticks()
+        # Due ticks in the past are moved to the next tick, and the entity has to agree or the event looks stale
+        kind = "hatch" if isinstance(entity, Egg) else "expire"
+        entity.expires_at = self.scheduler.schedule_at(entity.expires_at, kind, entity)
+
+    def schedule_birth(self, fish):
+        if fish.birth_at is None:
+            fish.birth_at = self.scheduler.now + fish.pregnancy_duration + 1
+        fish.birth_at = self.scheduler.schedule_at(fish.birth_at, "birth", fish)
+
+    def run_scheduled(self):
+        due = self.scheduler.advance()
+        now = self.scheduler.now
+        born = []
+        for kind, entity in due:
+            if kind == "birth":
+                # Stale if the mother died, was eaten or moved to another strip
+                if entity.birth_at != now or entity not in self.fish_population:
+                    continue
+                kids = entity.give_birth()
+                if kids:
+                    born.extend(kids)
+                continue
+
+            # Entities eaten or handed to another strip before their time leave stale events behind
+            if entity.expires_at != now:
+                continue
+            if kind == "hatch":
+                if entity not in self.egg_list:
+                    continue
+                hatched_fish = entity.hatch()
+                if hatched_fish:
+                    born.append(hatched_fish)
+                    self.egg_list.remove(entity)
+                    self.entities_changed("egg")
+                else:
+                    # A failed hatch is retried on the next update, as before
+                    entity.expires_at = now + 2
+                    self.scheduler.schedule_at(entity.expires_at, "hatch", entity)
+            else:
+                kind = ("plankton" if isinstance(entity, Plankton) else
+                        "crustacean" if isinstance(entity, Crustacean) else "dead_part")
+                entities = self.spatial.items(kind)
+                try:
+                    entities.remove(entity)
+                    self.entities_changed(kind)
+                except ValueError:
+                    pass
+        return born
+
+    def build_activity_grid(self):
+        size = self.grid_cell_size
+        grid = dict.fromkeys(self.algae_grid, 1)
+        for fish in self.fish_population:
+            key = fish.lod_cell = (int(fish.x // size), int(fish.y // size))
+            grid[key] = grid.get(key, 0) + 1
+        for entities in (self.plankton_list, self.crustacean_list, self.dead_algae_parts,
+                         self.egg_list, self.halo_fish, self.halo_food):
+            for entity in entities:
+                key = (int(entity.x // size), int(entity.y // size))
+                grid[key] = grid.get(key, 0) + 1
+        self.activity_grid = grid
+
+    def activity_near(self, fish):
+        size = self.grid_cell_size
+        grid = self.activity_grid
+        gx0, gx1 = int((fish.x - fish.vision) // size), int((fish.x + fish.vision) // size)
+        gy0, gy1 = int((fish.y - fish.vision) // size), int((fish.y + fish.vision) // size)
+        total = 0
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                total += grid.get((gx, gy), 0)
+        # Cells are counted with positions from the start of the tick, fish itself included
+        if total > 1:
+            return True
+        own_x, own_y = fish.lod_cell
+        return total == 1 and not (gx0 <= own_x <= gx1 and gy0 <= own_y <= gy1)
+
     def start_generation(self):
         self.is_generating = True
         self.generation_step = 0
         self.paused = True
 
-        self.algae_list = [Algae(random.randint(0, WIDTH), HEIGHT, self) for _ in range(INITIAL_ALGAE)]
+        world = self.world
+        self.algae_list = [Algae(random.randint(0, world.width), world.height, self) for _ in range(INITIAL_ALGAE)]
         for algae in self.algae_list:
             self.add_segment_to_grid(algae.segments[0][0], algae.segments[0][1], algae)
         self.plankton_list = [] 
         self.crustacean_list = []  
         self.fish_population = []  
+        for kind in self.entity_versions:
+            self.entities_changed(kind)
+        self.mates.clear()
+        self.stats.clear()
 
     def update_generation(self):
         if not self.is_generating or self.generation_step >= self.max_generation_steps:
@@ -140,32 +413,34 @@ class Simulation:
                 self.running = False
                 self.is_generating = False
 
-        self.random_buffer.append(random.random())
         for algae in self.algae_list:
             if algae.is_alive and self.get_random() < 0.2:
                 algae.grow()
                 algae.growth_timer = min(algae.growth_timer, round(random.uniform(*ALGAE_GROW)/10))
 
+        world = self.world
         if len(self.plankton_list) < INITIAL_PLANKTON and self.get_random() < 0.05: 
-            self.plankton_list.append(Plankton(random.randint(0, WIDTH), random.randint(0, int(HEIGHT/1.5))))
+            self.add_plankton(Plankton(random.randint(0, world.width), random.randint(0, int(world.height/1.5))))
 
         if len(self.crustacean_list) < INITIAL_CRUSTACEANS and self.get_random() < 0.02:  
-            self.crustacean_list.append(Crustacean(random.randint(0, WIDTH), random.randint(int(HEIGHT / 3), HEIGHT)))
+            self.add_crustacean(Crustacean(random.randint(0, world.width),
+                                           random.randint(int(world.height / 3), world.height)))
 
         if len(self.fish_population) < NUM_FISH and self.get_random() < 0.1:  
-            self.fish_population.append(Fish(random.randint(0, WIDTH), random.randint(0, LINE_LEVEL - random.randint(0, 20)),
-                                            self, random.randint(40, 60)))
+            self.add_fish(Fish(random.randint(0, world.width),
+                               random.randint(0, world.line_level - random.randint(0, 20)),
+                               self, random.randint(40, 60)))
 
         self.generation_step += 1
 
     @staticmethod
     def create_background(width, height):
+        # Vertical gradient, one colour per row, written in a single surfarray blit
+        depth = np.arange(height) / height
+        rows = np.stack((50 - depth * 50, 150 - depth * 150, 255 - depth * 205), axis=1)
+        rows = np.maximum(0, np.trunc(rows)).astype(np.uint8)
         background = pygame.Surface((width, height))
-        for y in range(height):
-            blue = max(0, int(255 - (y / height) * 205))
-            green = max(0, int(150 - (y / height) * 150))
-            red = max(0, int(50 - (y / height) * 50))
-            pygame.draw.line(background, (red, green, blue), (0, y), (width, y))
+        pygame.surfarray.blit_array(background, np.broadcast_to(rows, (width, height, 3)))
         return background
 
     def update_time(self):
@@ -176,7 +451,9 @@ class Simulation:
         season_progress = (self.time % self.season_length) / self.season_length
         self.current_season_index = int((self.time // self.season_length) % 4)
         
+        start = perf_counter()
         self.current_grid.update(self)
+        self.timer.add("currents", perf_counter() - start)
 
         target_season_modifier = {"Spring": 1.0, "Summer": 1.1, "Autumn": 0.9, "Winter": 0.8}[self.seasons[self.current_season_index]]
         transition_duration = self.season_length * 0.1 
@@ -201,16 +478,10 @@ class Simulation:
             self.current_season_modifier = 1.0
 
     def update_temperature_grid(self):
-        self.temperature_grid.clear()
-        grid_width = WIDTH // self.grid_size 
-        grid_height = HEIGHT // self.grid_size
-
-        for gy in range(grid_height):
-            y = gy * self.grid_size
-            depth_factor = 1 - (y / HEIGHT)
-            base_temp = MIN_TEMP + (MAX_TEMP - MIN_TEMP) * depth_factor
-            for gx in range(grid_width):
-                self.temperature_grid[(gx, gy)] = base_temp
+        # Temperature only depends on depth, so the field is a single row profile
+        grid = self.temperature_grid
+        depth_factor = 1 - grid.row_depths() / self.world.height
+        base_temp = MIN_TEMP + (MAX_TEMP - MIN_TEMP) * depth_factor
 
         day_progress = (self.time % self.day_length) / self.day_length
         day_night_modifier = 0.95 + 0.05 * math.sin(day_progress * 2 * math.pi)
@@ -218,26 +489,15 @@ class Simulation:
         season = self.seasons[self.current_season_index]
         season_modifier = {"Spring": 1.0, "Summer": 1.1, "Autumn": 0.9, "Winter": 0.8}[season]
 
-        for (gx, gy), temp in self.temperature_grid.items():
-            self.temperature_grid[(gx, gy)] = temp * day_night_modifier * season_modifier
+        grid.reset(base_temp * day_night_modifier * season_modifier)
 
     def get_temperature(self, x, y):
-        gx = int(x // self.grid_size)
-        gy = int(y // self.grid_size)
-        
-        return self.temperature_grid.get((gx, gy), MIN_TEMP)
+        return self.temperature_grid.get(x, y)
 
     def update_oxygen_grid(self):
-        self.oxygen_grid.clear()
-        grid_width = WIDTH // self.grid_size
-        grid_height = HEIGHT // self.grid_size 
-
-        for gy in range(grid_height):
-            y = gy * self.grid_size
-            depth_factor = y / HEIGHT
-            base_oxygen = MAX_OXYGEN - (MAX_OXYGEN - MIN_OXYGEN) * depth_factor
-            for gx in range(grid_width):
-                self.oxygen_grid[(gx, gy)] = base_oxygen
+        grid = self.oxygen_grid
+        depth_factor = grid.row_depths() / self.world.height
+        grid.reset(MAX_OXYGEN - (MAX_OXYGEN - MIN_OXYGEN) * depth_factor)
 
         day_progress = (self.time % self.day_length) / self.day_length
         day_night_factor = 0.5 + 0.5 * math.sin(day_progress * 2 * math.pi - math.pi / 2)
@@ -245,139 +505,251 @@ class Simulation:
         season = self.seasons[self.current_season_index]
         season_modifier = {"Spring": 1.0, "Summer": 1.2, "Autumn": 0.9, "Winter": 0.7}[season]
 
-        for algae in self.algae_list:
-            for seg_x, seg_y in algae.segments:
-                gx = int(seg_x // self.grid_size)
-                gy = int(seg_y // self.grid_size)
-                for dx in range(-1, 2):
-                    for dy in range(-1, 2):
-                        grid_x = gx + dx
-                        grid_y = gy + dy
-                        if (grid_x, grid_y) in self.oxygen_grid:
-                            center_x = grid_x * self.grid_size + self.grid_size / 2
-                            center_y = grid_y * self.grid_size + self.grid_size / 2
-                            distance = math.hypot(center_x - seg_x, center_y - seg_y)
-                            if distance < OXYGEN_BOOST_RADIUS:
-                                boost = OXYGEN_BOOST * (1 - distance / OXYGEN_BOOST_RADIUS) * day_night_factor * season_modifier
-                                self.oxygen_grid[(grid_x, grid_y)] = min(
-                                    MAX_OXYGEN, self.oxygen_grid[(grid_x, grid_y)] + boost
-                                )
+        segments = [segment for algae in self.algae_list for segment in algae.segments] + self.halo_segments
+        if not segments:
+            return
+        # Every segment boosts the 3x3 cells around it; only chunks near algae get allocated
+        seg_x, seg_y = np.array(segments, dtype=float).T
+        size = self.grid_size
+        gx, gy = seg_x // size, seg_y // size
+        cells_x, cells_y, boosts = [], [], []
+        for dx in range(-1, 2):
+            for dy in range(-1, 2):
+                grid_x, grid_y = gx + dx, gy + dy
+                distance = np.hypot(grid_x * size + size / 2 - seg_x, grid_y * size + size / 2 - seg_y)
+                near = distance < OXYGEN_BOOST_RADIUS
+                cells_x.append(grid_x[near])
+                cells_y.append(grid_y[near])
+                boosts.append(OXYGEN_BOOST * (1 - distance[near] / OXYGEN_BOOST_RADIUS) * day_night_factor *
+                              season_modifier)
+        grid.boost(np.concatenate(cells_x).astype(np.intp), np.concatenate(cells_y).astype(np.intp),
+                   np.concatenate(boosts), MAX_OXYGEN)
 
     def get_oxygen(self, x, y, algae_list):
-        gx = int(x // self.grid_size)
-        gy = int(y // self.grid_size)
-        
-        return self.oxygen_grid.get((gx, gy), MIN_OXYGEN)
+        return self.oxygen_grid.get(x, y)
+
+    def step(self):
+        timer = self.timer
+        timer.start_tick()
+
+        self.update_time()
+
+        start = perf_counter()
+        self.plot.update()
+        if self.telemetry is not None:
+            self.telemetry.record(self)
+        timer.add("plot", perf_counter() - start)
+
+        start = perf_counter()
+        self.update_temperature_grid()
+        timer.add("temperature", perf_counter() - start)
+
+        start = perf_counter()
+        self.update_oxygen_grid()
+        timer.add("oxygen", perf_counter() - start)
+
+        # TODO: change
+        if self.stop_on_extinction and len([f for f in self.fish_population if not f.is_dead]) < 1:
+            return False
+
+        start = perf_counter()
+        world = self.world
+        season = self.seasons[self.current_season_index]
+        spawn_rate_modifier = {"Spring": 1.1, "Summer": 1.2, "Autumn": 0.9, "Winter": 0.7}[season]
+
+        if self.get_random() < 0.3 * spawn_rate_modifier * self.area_share:
+            if self.get_random() < 0.0035 and len(self.algae_list) < MAX_ALGAE * self.area_share:
+                new_x = random.randint(*self.spawn_x_range)
+                new_algae = Algae(new_x, world.height, self)
+                self.algae_list.append(new_algae)
+                self.add_segment_to_grid(new_x, world.height, new_algae)
+            elif self.get_random() < 0.15:
+                self.add_plankton(Plankton(random.randint(*self.spawn_x_range), random.randint(0, int(world.height/1.5))))
+            elif self.get_random() < 0.05:
+                self.add_crustacean(Crustacean(random.randint(*self.spawn_x_range),
+                                               random.randint(int(world.height / 3), world.height)))
+        timer.add("spawning", perf_counter() - start)
+
+        if LOD_ENABLED:
+            self.build_activity_grid()
+
+        # Halo fish are read-only copies of fish owned by a neighbouring strip
+        visible_fish = self.fish_population + self.halo_fish if self.halo_fish else self.fish_population
+        self.visible_fish = visible_fish
+
+        # Dead fish only drift, so they are moved in one batch with the other passive particles
+        start = perf_counter()
+        dead_fish = [f for f in self.fish_population if f.is_dead]
+        if dead_fish:
+            surfaced = self.particles.update_dead_fish(dead_fish)
+            if surfaced:
+                self.remove_fish(*surfaced)
+        timer.add("movement", perf_counter() - start)
+
+        new_fish = []
+        for fish in self.fish_population[:]:
+            if fish.is_dead:
+                continue
+            start = perf_counter()
+            fish.check_mating_readiness()
+            mating_time = perf_counter() - start
+
+            predators = [f for f in visible_fish if f.is_predator and not f.is_dead] 
+
+            # Perception is timed inside Fish.move and taken out of the movement share
+            perception_before = timer.current["perception"]
+            start = perf_counter()
+            fish.move(predators, visible_fish)
+            end = perf_counter()
+            timer.add("movement", end - start - (timer.current["perception"] - perception_before))
+
+            fish.eat(self.fish_population)
+            start = perf_counter()
+            timer.add("eating", start - end)
+
+            if fish.ready_to_mate and fish.nearest_mate and not fish.nearest_mate.is_halo:
+                fish.mate(fish.nearest_mate)
+            timer.add("mating", mating_time + perf_counter() - start)
+            
+            if fish.energy <= 0 and not fish.is_dead:
+                fish.die("starved")
+                fish.energy = random.randint(5, 15) + fish.size * 0.5
+
+        start = perf_counter()
+        new_fish.extend(self.run_scheduled())
+        timer.add("mating", perf_counter() - start)
+        for fish in new_fish:
+            self.add_fish(fish)
+
+        if self.frame_counter % 2 == 0:
+            start = perf_counter()
+            for algae in self.algae_list[:]:
+                algae.update(self.algae_list)
+                if not algae.segments:
+                    self.algae_list.remove(algae)
+
+            end = perf_counter()
+            timer.add("algae", end - start)
+
+            self.particles.update()
+            timer.add("particles", perf_counter() - end)
+
+        self.frame_counter += 1
+        if self.headless and self.recorder is not None and self.recorder.due(self.scheduler.now):
+            self.renderer.invalidate()
+            self.render_frame()
+            self.recorder.capture(self.screen, self.scheduler.now)
+        return True
+
+    def render_frame(self):
+        self.renderer.begin()
+        self.draw()
+
+    def draw(self):
+        start = perf_counter()
+        camera = self.camera
+        offset = camera.offset
+        # Every drawn area is handed to the renderer, which repaints only those in dirty mode
+        add = self.renderer.add
+        # In dirty mode algae are part of the renderer's layer under everything else
+        if not self.renderer.enabled:
+            for algae in self.algae_list:
+                add(algae.draw(self.screen, offset))
+        # Only what the camera sees is drawn, the margin covers the largest sprites
+        for entities in (self.crustacean_list, self.plankton_list, self.dead_algae_parts, self.egg_list):
+            for entity in entities:
+                if camera.sees(entity.x, entity.y, 5):
+                    add(entity.draw(self.screen, offset))
+
+        show_vision, show_targets = self.modes.show_vision, self.modes.show_targets
+        for fish in self.fish_population:
+            if show_vision or show_targets or camera.sees(fish.x, fish.y, fish.size * 2):
+                add(fish.draw(self.screen, show_vision, show_targets, offset))
+
+        for rect in self.ui.draw():
+            add(rect)
+        self.timer.add("drawing", perf_counter() - start)
+
+    def step_frame(self):
+        # Speeds above 1 run several ticks per frame, below 1 the frame rate drops instead
+        for _ in range(max(1, round(self.speed))):
+            if not self.step():
+                return False
+        return True
+
+    def serve_metrics(self):
+        for command, value in self.metrics.pending_commands():
+            if command == "pause":
+                self.paused = True
+            elif command == "resume" and not self.is_generating:
+                self.paused = False
+            elif command == "speed":
+                self.speed = value
+            elif command == "checkpoint":
+                self.last_checkpoint = self.write_checkpoint()
+        self.metrics.publish(self)
+
+    def write_checkpoint(self, directory=CHECKPOINT_DIR):
+        # Population dump at the current tick; lineage and telemetry already on disk are flushed with it
+        if self.lineage is not None:
+            self.lineage.flush()
+        state = {
+            "tick": self.scheduler.now,
+            "time": self.time,
+            "season": self.seasons[self.current_season_index],
+            "world": [self.world.width, self.world.height],
+            "fish": [{"id": f.id, "parents": list(f.parents), "x": f.x, "y": f.y, "energy": f.energy,
+                      "age": f.age, "size": f.size, "is_dead": f.is_dead, "is_pregnant": f.is_pregnant,
+                      "genome": f.genome} for f in self.fish_population],
+            "entities": {"algae": len(self.algae_list), "plankton": len(self.plankton_list),
+                         "crustaceans": len(self.crustacean_list), "dead_parts": len(self.dead_algae_parts),
+                         "eggs": len(self.egg_list)},
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"checkpoint-{self.scheduler.now:09d}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+        return path
 
     def run(self):
+        if self.metrics is not None:
+            self.metrics.start()
         while self.running:
-            self.screen.blit(self.background, (0, 0))
             if not self.is_generating:
                 self.event_handler.handle_events()
 
             if self.is_generating:
                 self.update_generation()
                 self.ui.draw_generation_progress()
+                self.renderer.invalidate()
+            if self.metrics is not None:
+                self.serve_metrics()
             if not self.paused:
-                self.update_time()
-                self.plot.update()
-                self.update_temperature_grid()
-                self.update_oxygen_grid()
-                
-                # TODO: change
-                if len([f for f in self.fish_population if not f.is_dead]) < 1:
+                if not self.step_frame():
                     self.plot.show()
                     self.running = False
                     continue
 
-                season = self.seasons[self.current_season_index]
-                spawn_rate_modifier = {"Spring": 1.1, "Summer": 1.2, "Autumn": 0.9, "Winter": 0.7}[season]
-
-                if self.get_random() < 0.3 * spawn_rate_modifier:
-                    if self.get_random() < 0.0035 and len(self.algae_list) < MAX_ALGAE:
-                        new_x = random.randint(0, WIDTH)
-                        new_algae = Algae(new_x, HEIGHT, self)
-                        self.algae_list.append(new_algae)
-                        self.add_segment_to_grid(new_x, HEIGHT, new_algae)
-                    elif self.get_random() < 0.15:
-                        self.plankton_list.append(Plankton(random.randint(0, WIDTH), random.randint(0, int(HEIGHT/1.5))))
-                    elif self.get_random() < 0.05:
-                        self.crustacean_list.append(Crustacean(random.randint(0, WIDTH), random.randint(int(HEIGHT / 3), HEIGHT)))
-
-                new_fish = []
-                for fish in self.fish_population[:]:
-                    fish.check_mating_readiness()
-
-                    predators = [f for f in self.fish_population if f.is_predator and not f.is_dead] 
-
-                    fish.move(predators, self.fish_population)
-                    fish.eat(self.fish_population)
-                    kids = fish.give_birth()
-
-                    if kids:
-                        for kid in kids:
-                            new_fish.append(kid)
-
-                    if fish.ready_to_mate and fish.nearest_mate:
-                        fish.mate(fish.nearest_mate)
-                    
-                    if fish.energy <= 0 and not fish.is_dead:
-                        fish.is_dead = True
-                        fish.energy = random.randint(5, 15) + fish.size * 0.5
-                    
-                    if fish.is_dead and fish.y <= 0:
-                        self.fish_population.remove(fish)
-
-                self.fish_population.extend(new_fish)
-
-                if self.frame_counter % 2 == 0:
-                    for algae in self.algae_list[:]:
-                        algae.update(self.algae_list, self.dead_algae_parts)
-                        if not algae.segments:
-                            self.algae_list.remove(algae)
-
-                    for plankton in self.plankton_list[:]:
-                        plankton.update()
-                        if plankton.lifetime <= 0:
-                            self.plankton_list.remove(plankton)
-
-                    for dead_part in self.dead_algae_parts[:]:
-                        dead_part.update()
-                        if dead_part.lifetime <= 0 or dead_part.y <= 0:
-                            self.dead_algae_parts.remove(dead_part)
-                    
-                    for crust in self.crustacean_list[:]:
-                        crust.update()
-                        if crust.lifetime <= 0:
-                            self.crustacean_list.remove(crust)
-
-                    for egg in self.egg_list[:]:
-                        if not egg.update():
-                            self.egg_list.remove(egg)
-                        else:
-                            hatched_fish = egg.hatch()
-                            if hatched_fish:
-                                self.fish_population.append(hatched_fish)
-                                self.egg_list.remove(egg)
-
-                self.frame_counter += 1
-
             if not self.is_generating:
-                for algae in self.algae_list:
-                    algae.draw(self.screen)
-                for crust in self.crustacean_list:
-                    crust.draw(self.screen)
-                for plankton in self.plankton_list:
-                    plankton.draw(self.screen)
-                for dead_part in self.dead_algae_parts:
-                    dead_part.draw(self.screen)
-                for egg in self.egg_list:
-                    egg.draw(self.screen)
-
-                for fish in self.fish_population:
-                    fish.draw(self.screen, self.modes.show_vision, self.modes.show_targets)
-
-                self.ui.draw()
-
-            pygame.display.flip()
-            self.clock.tick(25)
\ No newline at end of file
+                self.render_frame()
+                if self.recorder is not None:
+                    self.recorder.capture(self.screen, self.scheduler.now)
+
+            start = perf_counter()
+            self.renderer.present()
+            self.timer.add("drawing", perf_counter() - start)
+            self.clock.tick(25 * min(1.0, self.speed))
+
+        self.close()
+
+    def close(self):
+        self.timer.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.lineage is not None:
+            self.lineage.close()
@@ -0,0 +1,328 @@
+"""Neighbour queries behind fish perception, with interchangeable backends.
+
+    python -m core.spatial --points 500 5000 50000 [--clustered]
+
+times both backends on uniform or clustered points and prints which one wins.
+"""
+import argparse
+import math
+import random
+from time import perf_counter
+
+import numpy as np
+
+from core.settings import SPATIAL_AUTO_INTERVAL, SPATIAL_BACKEND, SPATIAL_CELL_SIZE, SPATIAL_MARGIN
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional, the grid backend covers everything
+    cKDTree = None
+
+
+class GridIndex:
+    name = "grid"
+
+    def __init__(self, xs, ys, cell_size=SPATIAL_CELL_SIZE):
+        self.xs = list(xs)
+        self.ys = list(ys)
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.removed = 0
+        for i, (x, y) in enumerate(zip(self.xs, self.ys)):
+            self.buckets.setdefault((int(x // cell_size), int(y // cell_size)), []).append(i)
+
+    def __len__(self):
+        return len(self.xs) - self.removed
+
+    def add(self, x, y):
+        i = len(self.xs)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.buckets.setdefault((int(x // self.cell_size), int(y // self.cell_size)), []).append(i)
+        return i
+
+    def remove(self, i):
+        # The slot stays as a point infinitely far away, which no query can match
+        self.xs[i] = self.ys[i] = math.inf
+        self.removed += 1
+
+    def nearest(self, x, y, max_dist_sq):
+        # Rings of cells around the query, stopping once a ring cannot hold anything closer
+        size = self.cell_size
+        buckets, xs, ys = self.buckets, self.xs, self.ys
+        gx, gy = int(x // size), int(y // size)
+        best, best_dist_sq = None, max_dist_sq
+        for ring in range(int(math.sqrt(max_dist_sq) // size) + 2):
+            if ring > 1 and ((ring - 1) * size) ** 2 >= best_dist_sq:
+                break
+            for cell in self.ring_cells(gx, gy, ring):
+                for i in buckets.get(cell, ()):
+                    dist_sq = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                    if dist_sq < best_dist_sq:
+                        best, best_dist_sq = i, dist_sq
+        return best, best_dist_sq
+
+    @staticmethod
+    def ring_cells(gx, gy, ring):
+        if ring == 0:
+            return ((gx, gy),)
+        cells = [(gx + dx, gy + dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)]
+        cells += [(gx + dx, gy + dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)]
+        return cells
+
+    def within(self, x, y, radius):
+        size = self.cell_size
+        buckets, xs, ys = self.buckets, self.xs, self.ys
+        radius_sq = radius * radius
+        found = []
+        for gx in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for gy in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                for i in buckets.get((gx, gy), ()):
+                    if (xs[i] - x) ** 2 + (ys[i] - y) ** 2 < radius_sq:
+                        found.append(i)
+        return found
+
+    def knn(self, xs, ys, k, max_distance=math.inf):
+        distances = np.full((len(xs), k), np.inf)
+        indices = np.full((len(xs), k), len(self), dtype=np.intp)
+        for row, (x, y) in enumerate(zip(xs, ys)):
+            # Widen the search until k points are found or the limit is reached
+            radius = self.cell_size
+            while True:
+                found = self.within(x, y, min(radius, max_distance))
+                if len(found) >= k or radius >= max_distance or len(found) == len(self):
+                    break
+                radius *= 2
+            found.sort(key=lambda i: (self.xs[i] - x) ** 2 + (self.ys[i] - y) ** 2)
+            for column, i in enumerate(found[:k]):
+                distances[row, column] = math.hypot(self.xs[i] - x, self.ys[i] - y)
+                indices[row, column] = i
+        return distances, indices
+
+    def within_many(self, xs, ys, radius):
+        return [self.within(x, y, radius) for x, y in zip(xs, ys)]
+
+
+class KDTreeIndex:
+    name = "kdtree"
+
+    def __init__(self, xs, ys):
+        self.points = np.column_stack((np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)))
+        self.tree = cKDTree(self.points) if len(self.points) else None
+        # A tree cannot change in place: removed points are filtered out of results and added
+        # ones are kept in a small grid, numbered after the tree's points
+        self.deleted = set()
+        self.added = GridIndex([], [])
+
+    @property
+    def removed(self):
+        return len(self.deleted) + self.added.removed
+
+    def __len__(self):
+        return len(self.points) - len(self.deleted) + len(self.added)
+
+    def add(self, x, y):
+        return len(self.points) + self.added.add(x, y)
+
+    def remove(self, i):
+        if i < len(self.points):
+            self.deleted.add(i)
+        else:
+            self.added.remove(i - len(self.points))
+
+    def nearest(self, x, y, max_dist_sq):
+        best, best_dist_sq = None, max_dist_sq
+        if self.tree is not None and not self.deleted:
+            distance, i = self.tree.query((x, y), k=1, distance_upper_bound=math.sqrt(max_dist_sq))
+            if i != len(self.points) and distance * distance < max_dist_sq:
+                best, best_dist_sq = int(i), distance * distance
+        elif self.tree is not None:
+            for i in self.within_tree(x, y, math.sqrt(max_dist_sq)):
+                dist_sq = (self.points[i, 0] - x) ** 2 + (self.points[i, 1] - y) ** 2
+                if dist_sq < best_dist_sq:
+                    best, best_dist_sq = i, float(dist_sq)
+        i, dist_sq = self.added.nearest(x, y, best_dist_sq)
+        if i is not None:
+            return len(self.points) + i, dist_sq
+        return best, best_dist_sq
+
+    def within_tree(self, x, y, radius):
+        if self.tree is None:
+            return []
+        found = self.tree.query_ball_point((x, y), radius)
+        return [i for i in found if i not in self.deleted] if self.deleted else found
+
+    def within(self, x, y, radius):
+        found = self.within_tree(x, y, radius)
+        if len(self.added):
+            found = found + [len(self.points) + i for i in self.added.within(x, y, radius)]
+        return found
+
+    def knn(self, xs, ys, k, max_distance=math.inf):
+        if self.tree is None:
+            return np.full((len(xs), k), np.inf), np.zeros((len(xs), k), dtype=np.intp)
+        distances, indices = self.tree.query(np.column_stack((xs, ys)), k=k, distance_upper_bound=max_distance)
+        return distances.reshape(len(xs), k), indices.reshape(len(xs), k)
+
+    def within_many(self, xs, ys, radius):
+        if self.tree is None:
+            return [[] for _ in xs]
+        return self.tree.query_ball_point(np.column_stack((xs, ys)), radius)
+
+
+BACKENDS = {"grid": GridIndex}
+if cKDTree is not None:
+    BACKENDS["kdtree"] = KDTreeIndex
+
+
+def time_backend(backend, xs, ys, queries, radius):
+    start = perf_counter()
+    index = backend(xs, ys)
+    for x, y in queries:
+        index.nearest(x, y, radius * radius)
+        index.within(x, y, radius)
+    return perf_counter() - start
+
+
+def pick_backend(xs, ys, queries, radius):
+    # One build plus the queries of a tick, on the real data, decides the backend
+    if len(BACKENDS) == 1:
+        return GridIndex
+    timings = {name: time_backend(backend, xs, ys, queries, radius) for name, backend in BACKENDS.items()}
+    return BACKENDS[min(timings, key=timings.get)]
+
+
+class SpatialIndex:
+    # Per-kind indexes over the simulation's entities, rebuilt lazily when their source changes.
+    # Algae segments only change when algae grow, die or are eaten, and the simulation reports
+    # each of those, so the algae index is patched in place and only rebuilt once half of it is
+    # removed slots or the auto backend is due for a re-check. Everything else is rebuilt
+    # once per tick and again whenever the simulation reports a change to their list (see
+    # Simulation.entities_changed), so an entity eaten and another spawned in the same tick are seen.
+    def __init__(self, simulation, backend=SPATIAL_BACKEND):
+        self.simulation = simulation
+        self.auto = backend == "auto"
+        if self.auto:
+            self.backend = GridIndex
+        elif backend in BACKENDS:
+            self.backend = BACKENDS[backend]
+        else:
+            # kdtree requested without scipy installed
+            self.backend = GridIndex
+        self.indexes = {}
+        self.next_pick = 0
+        self.algae_slots = {}  # (algae, x, y) -> slots of that segment in the algae index
+
+    def items(self, kind):
+        sim = self.simulation
+        return {"plankton": sim.plankton_list, "crustacean": sim.crustacean_list,
+                "dead_part": sim.dead_algae_parts, "egg": sim.egg_list, "fish": sim.visible_fish}[kind]
+
+    def key(self, kind):
+        if kind == "algae":
+            return id(self.simulation.algae_grid)
+        items = self.items(kind)
+        return self.simulation.scheduler.now, id(items), len(items), self.simulation.entity_versions[kind]
+
+    def get(self, kind):
+        key = self.key(kind)
+        cached = self.indexes.get(kind)
+        if cached is not None and cached[0] == key and not (kind == "algae" and self.algae_stale(cached[1])):
+            return cached[1], cached[2]
+
+        if kind == "algae":
+            items = [(algae, (seg_x, seg_y)) for cell in self.simulation.algae_grid.values()
+                     for seg_x, seg_y, algae in cell]
+            xs = [item[1][0] for item in items]
+            ys = [item[1][1] for item in items]
+        else:
+            items = list(self.items(kind))
+            xs = [e.x for e in items]
+            ys = [e.y for e in items]
+        if self.auto and kind == "algae" and self.simulation.scheduler.now >= self.next_pick and items:
+            queries = [(f.x, f.y) for f in self.simulation.fish_population]
+            self.backend = pick_backend(xs, ys, queries, SPATIAL_CELL_SIZE * 2)
+            self.next_pick = self.simulation.scheduler.now + SPATIAL_AUTO_INTERVAL
+        index = self.backend(xs, ys)
+        self.indexes[kind] = (key, index, items)
+        if kind == "algae":
+            self.algae_slots = {}
+            for i, (algae, (seg_x, seg_y)) in enumerate(items):
+                self.algae_slots.setdefault((algae, seg_x, seg_y), []).append(i)
+        return index, items
+
+    def algae_stale(self, index):
+        if self.auto and self.simulation.scheduler.now >= self.next_pick:
+            return True
+        return index.removed > max(64, len(index))
+
+    def segment_added(self, algae, seg_x, seg_y):
+        cached = self.indexes.get("algae")
+        if cached is None:
+            return
+        _, index, items = cached
+        i = index.add(seg_x, seg_y)
+        items.append((algae, (seg_x, seg_y)))
+        self.algae_slots.setdefault((algae, seg_x, seg_y), []).append(i)
+
+    def segment_removed(self, algae, seg_x, seg_y):
+        cached = self.indexes.get("algae")
+        slots = self.algae_slots.get((algae, seg_x, seg_y))
+        if cached is None or not slots:
+            return
+        cached[1].remove(slots.pop())
+
+    def nearest(self, kind, x, y, max_dist_sq):
+        index, items = self.get(kind)
+        i, dist_sq = index.nearest(x, y, max_dist_sq)
+        return (None, max_dist_sq) if i is None else (items[i], dist_sq)
+
+    def within(self, kind, x, y, radius):
+        index, items = self.get(kind)
+        return [items[i] for i in index.within(x, y, radius)]
+
+    def any_within(self, kind, x, y, radius):
+        index, _ = self.get(kind)
+        return index.nearest(x, y, radius * radius)[0] is not None
+
+    def moving_within(self, kind, x, y, radius):
+        # Fish keep moving after the index is built, so candidates are gathered with a margin
+        # and the caller measures the exact distance
+        return self.within(kind, x, y, radius + SPATIAL_MARGIN)
+
+
+def make_points(count, clustered):
+    if not clustered:
+        return [random.uniform(0, 1100) for _ in range(count)], [random.uniform(0, 650) for _ in range(count)]
+    centres = [(random.uniform(0, 1100), random.uniform(450, 650)) for _ in range(max(1, count // 200))]
+    xs, ys = [], []
+    for _ in range(count):
+        cx, cy = random.choice(centres)
+        xs.append(random.gauss(cx, 15))
+        ys.append(random.gauss(cy, 15))
+    return xs, ys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the spatial index backends at several densities")
+    parser.add_argument("--points", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius", type=float, default=100.0)
+    parser.add_argument("--clustered", action="store_true", help="pack points into clumps near the floor")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if cKDTree is None:
+        print("scipy is not installed, only the grid backend is available")
+    for count in args.points:
+        xs, ys = make_points(count, args.clustered)
+        qx, qy = make_points(args.queries, args.clustered)
+        queries = list(zip(qx, qy))
+        timings = {name: time_backend(backend, xs, ys, queries, args.radius) for name, backend in BACKENDS.items()}
+        report = "  ".join(f"{name} {seconds * 1000:9.2f} ms" for name, seconds in timings.items())
+        print(f"{count:>7} points: {report}  -> {min(timings, key=timings.get)}")
+
+
+if __name__ == "__main__":
+    main()
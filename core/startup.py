@@ -0,0 +1,88 @@
+"""Startup time: phase timings for main.py and an import-time budget check.
+
+    python -m core.startup [--budget MS] [--runs N] [--top N]
+
+imports core.simulation in fresh interpreters with -X importtime, prints the slowest modules
+and exits with code 1 when the median import time is over the budget, or when a module that
+is meant to load lazily (matplotlib, tkinter) was imported at startup.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from core.settings import STARTUP_IMPORT_BUDGET_MS
+
+# Set when this module is first imported; main.py imports it first so its own imports are counted
+STARTED = perf_counter()
+LAZY_MODULES = ("matplotlib", "tkinter")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTimer:
+    def __init__(self, started=STARTED):
+        self.started = started
+        self.last = started
+        self.phases = []
+
+    def mark(self, name):
+        now = perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        lines = [f"{name:<12} {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':<12} {(self.last - self.started) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+def measure_imports(module="core.simulation"):
+    # One fresh interpreter: (total ms, {module: cumulative ms}, lazy modules that got imported)
+    script = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    cumulative = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(us) / 1000
+        if not name.startswith("  "):
+            total += int(us) / 1000
+    eager = [m for m in result.stdout.strip().split(",") if m]
+    return total, cumulative, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the simulation against a budget")
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET_MS, help="milliseconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [measure_imports() for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals)
+    _, cumulative, eager = runs[totals.index(min(totals))]
+
+    print(f"import core.simulation: median {median:.1f} ms, min {min(totals):.1f} ms over {args.runs} runs "
+          f"(budget {args.budget:.0f} ms)")
+    for name, ms in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup, should load lazily: {', '.join(eager)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: over the import budget by {median - args.budget:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Headless parameter sweeps over core/settings.py.
+
+    python -m core.sweep sweep.json --out sweep_results.csv [--workers N]
+
+The spec is a JSON object:
+    {
+        "ticks": 20000,
+        "sample_every": 100,
+        "seeds": 3,
+        "base_seed": 0,
+        "grid": {"MUTATION_RATE": [0.1, 0.15, 0.2], "EAT_SIZE": [2.0, 2.5]},
+        "random": {"samples": 10, "params": {"OXYGEN_BOOST": [2, 4],
+                                             "PLANKTON_LIFETIME": {"choices": [[360, 720], [720, 1440]]}}}
+    }
+
+Every grid point (crossed with every random sample) is run once per seed. Results
+are appended to the CSV as runs finish; rerunning the same command skips run ids
+already present in the file, so an interrupted sweep resumes where it stopped.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+TRAITS = ("speed", "max_size", "vision", "metabolism", "digestion", "defense", "reproduction_rate")
+
+COLUMNS = (
+    ["run_id", "seed", "overrides", "ticks_run", "extinct", "extinction_tick",
+     "final_fish", "final_predators", "final_prey", "peak_fish", "predator_fraction"]
+    + [f"mean_{trait}" for trait in TRAITS]
+    + ["population_curve", "wall_time"]
+)
+
+
+def sample_random_params(params, samples, rng):
+    configs = []
+    for _ in range(samples):
+        config = {}
+        for name, spec in params.items():
+            if isinstance(spec, dict):
+                config[name] = rng.choice(spec["choices"])
+            elif all(isinstance(v, int) for v in spec):
+                config[name] = rng.randint(spec[0], spec[1])
+            else:
+                config[name] = rng.uniform(spec[0], spec[1])
+        configs.append(config)
+    return configs
+
+
+def build_runs(spec):
+    rng = random.Random(spec.get("base_seed", 0))
+
+    grid = spec.get("grid", {})
+    names = sorted(grid)
+    grid_configs = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+    if "random" in spec:
+        random_configs = sample_random_params(spec["random"]["params"], spec["random"].get("samples", 1), rng)
+    else:
+        random_configs = [{}]
+
+    seeds = spec.get("seeds", 1)
+    if isinstance(seeds, int):
+        seeds = [spec.get("base_seed", 0) + i for i in range(seeds)]
+
+    runs = []
+    for grid_config, random_config in itertools.product(grid_configs, random_configs):
+        overrides = {**grid_config, **random_config}
+        for seed in seeds:
+            key = json.dumps({"overrides": overrides, "seed": seed}, sort_keys=True)
+            run_id = hashlib.sha1(key.encode()).hexdigest()[:12]
+            runs.append((run_id, overrides, seed))
+    return runs
+
+
+def summarize(sim, run_id, overrides, seed, ticks_run, extinction_tick, peak_fish, curve, wall_time):
+    alive = [f for f in sim.fish_population if not f.is_dead]
+    predators = [f for f in alive if f.is_predator]
+
+    row = {
+        "run_id": run_id,
+        "seed": seed,
+        "overrides": json.dumps(overrides, sort_keys=True),
+        "ticks_run": ticks_run,
+        "extinct": extinction_tick is not None,
+        "extinction_tick": extinction_tick if extinction_tick is not None else "",
+        "final_fish": len(alive),
+        "final_predators": len(predators),
+        "final_prey": len(alive) - len(predators),
+        "peak_fish": peak_fish,
+        "predator_fraction": round(len(predators) / len(alive), 4) if alive else "",
+        "population_curve": json.dumps(curve),
+        "wall_time": round(wall_time, 2),
+    }
+    for trait in TRAITS:
+        row[f"mean_{trait}"] = round(sum(getattr(f, trait) for f in alive) / len(alive), 4) if alive else ""
+    return row
+
+
+def run_single(run_id, overrides, seed, ticks, sample_every):
+    from core.headless import apply_settings_overrides, create_headless_simulation
+
+    started = time.perf_counter()
+    # Pool workers are reused, so the stock settings are put back after every run
+    previous = apply_settings_overrides(overrides)
+    try:
+        sim = create_headless_simulation(seed=seed)
+
+        curve = {"tick": [], "fish": [], "predators": [], "prey": []}
+        extinction_tick = None
+        peak_fish = 0
+        tick = 0
+        while tick < ticks:
+            if not sim.step():
+                extinction_tick = tick
+                break
+            tick += 1
+            if tick % sample_every == 0:
+                alive = [f for f in sim.fish_population if not f.is_dead]
+                predators = sum(1 for f in alive if f.is_predator)
+                curve["tick"].append(tick)
+                curve["fish"].append(len(alive))
+                curve["predators"].append(predators)
+                curve["prey"].append(len(alive) - predators)
+                peak_fish = max(peak_fish, len(alive))
+        sim.close()
+
+        return summarize(sim, run_id, overrides, seed, tick, extinction_tick, peak_fish, curve,
+                         time.perf_counter() - started)
+    finally:
+        apply_settings_overrides(previous)
+
+
+def load_finished(path):
+    if not os.path.exists(path):
+        return set()
+
+    # A run killed mid-write can leave a partial last line behind
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    with open(path, newline="") as f:
+        return {row["run_id"] for row in csv.DictReader(f) if row.get("wall_time")}
+
+
+def sweep(spec, out_path, workers=None):
+    runs = build_runs(spec)
+    finished = load_finished(out_path)
+    pending = [run for run in runs if run[0] not in finished]
+    print(f"{len(runs)} runs in sweep, {len(runs) - len(pending)} already done, {len(pending)} to go")
+    if not pending:
+        return
+
+    ticks = spec.get("ticks", 20000)
+    sample_every = spec.get("sample_every", 100)
+    new_file = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+
+    with open(out_path, "a", newline="") as f, ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new_file:
+            writer.writeheader()
+            f.flush()
+
+        futures = {pool.submit(run_single, run_id, overrides, seed, ticks, sample_every): run_id
+                   for run_id, overrides, seed in pending}
+        done = 0
+        try:
+            for future in as_completed(futures):
+                row = future.result()
+                writer.writerow(row)
+                f.flush()
+                done += 1
+                status = f"extinct at {row['extinction_tick']}" if row["extinct"] else f"{row['final_fish']} fish"
+                print(f"[{done}/{len(pending)}] {row['run_id']} seed={row['seed']} {row['overrides']} -> {status}")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print("Interrupted, rerun the same command to resume")
+            raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless parameter sweeps")
+    parser.add_argument("spec", help="JSON sweep specification")
+    parser.add_argument("--out", default="sweep_results.csv", help="CSV results table (appended, used for resume)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    sweep(spec, args.out, args.workers)
+
+
+if __name__ == "__main__":
+    main()
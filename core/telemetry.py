@@ -0,0 +1,127 @@
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+TICK_COLUMNS = ("tick", "time", "fish", "predators", "prey", "avg_energy_predators", "avg_energy_prey",
+                "avg_size_predators", "avg_size_prey", "plankton", "crustaceans", "dead_parts",
+                "algae_parts", "eggs")
+FISH_COLUMNS = ("tick", "fish_id", "x", "y", "is_predator", "is_male", "is_dead", "is_pregnant",
+                "energy", "size", "age", "speed", "vision", "metabolism", "digestion", "defense",
+                "reproduction_rate", "preferred_depth")
+
+STOP = object()
+
+
+class TelemetryWriter:
+    def __init__(self, directory, chunk_rows=5000, queue_size=1024, fish_sample_every=0, flush_seconds=10.0):
+        self.directory = os.path.join(directory, time.strftime("run-%Y%m%d-%H%M%S"))
+        os.makedirs(self.directory, exist_ok=True)
+        self.chunk_rows = chunk_rows
+        self.fish_sample_every = fish_sample_every
+        self.flush_seconds = flush_seconds
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.tick = 0
+
+        self.streams = {"ticks": TICK_COLUMNS, "fish": FISH_COLUMNS}
+        self.buffers = {name: [] for name in self.streams}
+        self.chunk_index = dict.fromkeys(self.streams, 0)
+        self.chunks = {name: [] for name in self.streams}
+        self.write_manifest()
+
+        self.thread = threading.Thread(target=self.run, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, simulation):
+        latest = simulation.plot.latest
+        row = (self.tick, simulation.time, latest["fish"], latest["predators"], latest["prey"],
+               latest["avg_energy_predators"], latest["avg_energy_prey"],
+               latest["avg_size_predators"], latest["avg_size_prey"], latest["plankton"],
+               latest["crustaceans"], latest["dead_parts"], latest["algae_parts"], len(simulation.egg_list))
+        self.put(("ticks", [row]))
+
+        if self.fish_sample_every and self.tick % self.fish_sample_every == 0:
+            rows = [(self.tick, f.id, round(f.x, 2), round(f.y, 2), int(f.is_predator), int(f.is_male),
+                     int(f.is_dead), int(f.is_pregnant), round(f.energy, 3), round(f.size, 3), round(f.age, 3),
+                     round(f.speed, 4), round(f.vision, 3), round(f.metabolism, 4), round(f.digestion, 4),
+                     round(f.defense, 4), round(f.reproduction_rate, 4), round(f.preferred_depth, 2))
+                    for f in simulation.fish_population]
+            self.put(("fish", rows))
+        self.tick += 1
+
+    def put(self, item):
+        # The simulation loop never waits on the writer; rows are dropped when it falls behind
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                item = None
+
+            if item is STOP:
+                break
+            if item is not None:
+                stream, rows = item
+                self.buffers[stream].extend(rows)
+                if len(self.buffers[stream]) >= self.chunk_rows:
+                    self.write_chunk(stream)
+
+            if time.monotonic() - last_flush >= self.flush_seconds:
+                for stream in self.streams:
+                    self.write_chunk(stream)
+                last_flush = time.monotonic()
+
+        for stream in self.streams:
+            self.write_chunk(stream)
+
+    def write_chunk(self, stream):
+        rows = self.buffers[stream]
+        if not rows:
+            return
+        self.buffers[stream] = []
+
+        self.chunk_index[stream] += 1
+        name = f"{stream}-{self.chunk_index[stream]:06d}.csv.gz"
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(self.streams[stream])
+        writer.writerows(rows)
+        # Written under a temporary name so readers never see a half-written chunk
+        path = os.path.join(self.directory, name)
+        with gzip.open(path + ".tmp", "wt", compresslevel=6, newline="") as f:
+            f.write(text.getvalue())
+        os.replace(path + ".tmp", path)
+
+        self.chunks[stream].append({"file": name, "rows": len(rows)})
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest = {
+            "columns": {name: list(columns) for name, columns in self.streams.items()},
+            "chunks": self.chunks,
+            "fish_sample_every": self.fish_sample_every,
+            "dropped_batches": self.dropped,
+        }
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        if not self.thread.is_alive():
+            return
+        self.queue.put(STOP)
+        self.thread.join()
+        self.write_manifest()
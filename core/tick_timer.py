@@ -0,0 +1,65 @@
+import csv
+from collections import deque
+from time import perf_counter
+
+PHASES = ("currents", "temperature", "oxygen", "plot", "spawning", "perception",
+          "movement", "eating", "mating", "algae", "particles", "drawing")
+
+
+class TickTimer:
+    def __init__(self, window=50, csv_path=None):
+        self.window = window
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.history = {phase: deque(maxlen=window) for phase in PHASES}
+        self.rolling = dict.fromkeys(PHASES, 0.0)
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.ticks = 0
+        self.in_tick = False
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["tick"] + [f"{phase}_ms" for phase in PHASES])
+
+    def add(self, phase, seconds):
+        self.current[phase] += seconds
+
+    def start_tick(self):
+        # Closes the previous tick, so drawing done after step() is counted with it
+        if self.in_tick:
+            self.end_tick()
+        self.in_tick = True
+
+    def end_tick(self):
+        for phase, value in self.current.items():
+            history = self.history[phase]
+            if len(history) == self.window:
+                self.rolling[phase] -= history[0]
+            history.append(value)
+            self.rolling[phase] += value
+            self.totals[phase] += value
+
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.ticks] + [round(self.current[p] * 1000, 4) for p in PHASES])
+
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.ticks += 1
+        self.in_tick = False
+
+    def averages_ms(self):
+        return {phase: self.rolling[phase] / len(self.history[phase]) * 1000 if self.history[phase] else 0.0
+                for phase in PHASES}
+
+    def totals_ms(self):
+        return {phase: self.totals[phase] / self.ticks * 1000 if self.ticks else 0.0 for phase in PHASES}
+
+    def close(self):
+        if self.in_tick:
+            self.end_tick()
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
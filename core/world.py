@@ -0,0 +1,126 @@
+import numpy as np
+
+from core.settings import CAMERA_SPEED, HEIGHT, LINE_LEVEL, WIDTH, WORLD_CHUNK_SIZE
+
+
+class World:
+    # Size of the simulated ocean, independent of the window that shows a part of it
+    def __init__(self, width=WIDTH, height=HEIGHT, chunk_size=WORLD_CHUNK_SIZE):
+        self.width = int(width)
+        self.height = int(height)
+        self.chunk_size = chunk_size
+        # The fish spawn line keeps its distance from the floor
+        self.line_level = self.height - (HEIGHT - LINE_LEVEL)
+
+    def window_size(self):
+        return min(WIDTH, self.width), min(HEIGHT, self.height)
+
+    def __repr__(self):
+        return f"World({self.width}x{self.height})"
+
+
+class Camera:
+    # Top-left corner of the window in world coordinates
+    def __init__(self, world, width, height):
+        self.world = world
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    @property
+    def offset(self):
+        return self.x, self.y
+
+    def move(self, dx, dy):
+        self.x = min(max(self.x + dx, 0), max(0, self.world.width - self.width))
+        self.y = min(max(self.y + dy, 0), max(0, self.world.height - self.height))
+
+    def centre_on(self, x, y):
+        self.move(int(x - self.width / 2) - self.x, int(y - self.height / 2) - self.y)
+
+    def pan(self, left, right, up, down):
+        self.move((right - left) * CAMERA_SPEED, (down - up) * CAMERA_SPEED)
+
+    def sees(self, x, y, margin=0):
+        return (self.x - margin <= x <= self.x + self.width + margin and
+                self.y - margin <= y <= self.y + self.height + margin)
+
+    def to_world(self, x, y):
+        return x + self.x, y + self.y
+
+
+class ChunkedField:
+    # Value per grid cell over the whole world. Cells follow a per-row depth profile unless
+    # something wrote a local value there; those cells live in square chunks that are only
+    # allocated on first write, so an empty stretch of ocean costs one profile row each.
+    def __init__(self, world, cell_size, default):
+        self.cell_size = cell_size
+        self.cols = world.width // cell_size
+        self.rows = world.height // cell_size
+        self.chunk = max(1, world.chunk_size // cell_size)
+        self.default = default
+        self.profile = [default] * self.rows
+        self.chunks = {}
+
+    def reset(self, profile):
+        self.profile = np.asarray(profile, dtype=float).tolist()
+        self.chunks = {}
+
+    def row_depths(self):
+        return np.arange(self.rows) * self.cell_size
+
+    def get(self, x, y):
+        gx = int(x // self.cell_size)
+        gy = int(y // self.cell_size)
+        if not (0 <= gx < self.cols and 0 <= gy < self.rows):
+            return self.default
+        if self.chunks:
+            size = self.chunk
+            chunk = self.chunks.get((gx // size, gy // size))
+            if chunk is not None:
+                return chunk[gy % size][gx % size]
+        return self.profile[gy]
+
+    def values_at(self, xs, ys):
+        gx = (np.asarray(xs) // self.cell_size).astype(np.intp)
+        gy = (np.asarray(ys) // self.cell_size).astype(np.intp)
+        inside = (gx >= 0) & (gx < self.cols) & (gy >= 0) & (gy < self.rows)
+        values = np.full(gx.shape, self.default, dtype=float)
+        values[inside] = np.asarray(self.profile, dtype=float)[gy[inside]]
+        size = self.chunk
+        for (cx, cy), chunk in self.chunks.items():
+            mask = inside & (gx // size == cx) & (gy // size == cy)
+            if mask.any():
+                values[mask] = np.asarray(chunk)[gy[mask] % size, gx[mask] % size]
+        return values
+
+    def boost(self, gx, gy, amounts, maximum):
+        # Sets the given cells to their profile value plus the summed amounts, capped at maximum.
+        # Cells outside the world are dropped and every touched chunk is allocated.
+        inside = (gx >= 0) & (gx < self.cols) & (gy >= 0) & (gy < self.rows)
+        if not inside.any():
+            return
+        keys, inverse = np.unique(gy[inside] * self.cols + gx[inside], return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts[inside])
+        cell_x, cell_y = keys % self.cols, keys // self.cols
+
+        size = self.chunk
+        profile = np.append(np.asarray(self.profile, dtype=float), np.full(size, self.default))
+        values = np.minimum(maximum, profile[cell_y] + totals)
+        chunk_x, chunk_y = cell_x // size, cell_y // size
+        chunk_keys = chunk_y * (self.cols // size + 1) + chunk_x
+        for chunk_key in np.unique(chunk_keys).tolist():
+            mask = chunk_keys == chunk_key
+            cx, cy = int(chunk_x[mask][0]), int(chunk_y[mask][0])
+            chunk = self.chunks.get((cx, cy))
+            if chunk is None:
+                rows = profile[cy * size:(cy + 1) * size]
+                chunk = np.repeat(rows[:, None], size, axis=1)
+            else:
+                chunk = np.asarray(chunk)
+            chunk[cell_y[mask] % size, cell_x[mask] % size] = values[mask]
+            self.chunks[(cx, cy)] = chunk.tolist()
+
+    def __len__(self):
+        return len(self.chunks)
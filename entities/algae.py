@@ -6,11 +6,8 @@ import pygame
 
 from core.settings import (
     ALGAE_GROW,
-    CURRENT_MOVEMENT_FACTOR,
     DEAD_ALGAE_LIFETIME,
-    HEIGHT,
     MAX_ALGAE,
-    WIDTH,
 )
 
 if TYPE_CHECKING:
@@ -25,9 +22,26 @@ class Algae:
         self.lowest_y = base_y 
         self.energy_value = 10
         self.growth_timer = round(random.uniform(*ALGAE_GROW))
-        self.max_height = random.randint(int(HEIGHT * 0.3), int(HEIGHT * 0.5))
+        self.max_height = random.randint(int(simulation.world.height * 0.3), int(simulation.world.height * 0.5))
         self.branch_chance = 0.1
         self.is_alive = True
+        # Bumped on every change to the segments, so render geometry is only rebuilt when needed
+        self.version = 0
+        self.render_key = None
+        self.render_points = None
+        self.render_color = None
+
+    def add_segment(self, x, y):
+        self.segments.append((x, y))
+        self.simulation.add_segment_to_grid(x, y, self)
+        if y < self.lowest_y:
+            self.lowest_y = y
+        self.version += 1
+
+    def remove_segment(self, i):
+        seg_x, seg_y = self.segments.pop(i)
+        self.simulation.remove_segment_from_grid(seg_x, seg_y, self)
+        self.version += 1
 
     def grow(self):  
         if not self.is_alive or self.simulation.day_phase == "Night":
@@ -44,63 +58,69 @@ class Algae:
         season = self.simulation.seasons[self.simulation.current_season_index]
         growth_modifier = {"Spring": 1.1, "Summer": 1.2, "Autumn": 0.9, "Winter": 0.7}[season]
 
+        rng = self.simulation.rng
         top_segment = min(self.segments, key=lambda s: s[1])
-        new_x = top_segment[0] + random.uniform(-2, 2)
-        new_y = top_segment[1] - random.uniform(4, 7) * growth_modifier
+        new_x = top_segment[0] + rng.uniform(-2, 2)
+        new_y = top_segment[1] - rng.uniform(4, 7) * growth_modifier
         
-        self.segments.append((new_x, new_y))
-        self.simulation.add_segment_to_grid(new_x, new_y, self)
-        self.energy_value += random.randint(1, 3)
-        if new_y < self.lowest_y:
-            self.lowest_y = new_y 
+        self.add_segment(new_x, new_y)
+        self.energy_value += rng.randint(1, 3)
         
-        if random.random() < self.branch_chance:
-            branch_x = top_segment[0] + random.uniform(-5, 5)
-            branch_y = top_segment[1] - random.uniform(2, 5) * growth_modifier
-            self.segments.append((branch_x, branch_y))
-            self.simulation.add_segment_to_grid(branch_x, branch_y, self)
-            self.energy_value += random.randint(1, 2)
-            if branch_y < self.lowest_y:
-                self.lowest_y = branch_y  
+        if rng.random() < self.branch_chance:
+            branch_x = top_segment[0] + rng.uniform(-5, 5)
+            branch_y = top_segment[1] - rng.uniform(2, 5) * growth_modifier
+            self.add_segment(branch_x, branch_y)
+            self.energy_value += rng.randint(1, 2)
 
-        self.growth_timer = round(random.uniform(*ALGAE_GROW))
+        self.growth_timer = round(rng.uniform(*ALGAE_GROW))
     
     def check_root(self):
         return any(seg[1] >= self.base_y - 4 for seg in self.segments[:5])
 
-    def update(self, algae_list, dead_algae_parts):
+    def update(self, algae_list):
+        rng = self.simulation.rng
         if not self.check_root() and self.is_alive:
             self.is_alive = False
             for seg_x, seg_y in self.segments[:]:
                 if seg_y < self.base_y - 4:
-                    if random.random() < 0.4:
-                        dead_algae_parts.append(DeadAlgaePart(seg_x, seg_y, self.simulation))
+                    if rng.random() < 0.4:
+                        self.simulation.add_dead_part(DeadAlgaePart(seg_x, seg_y, self.simulation))
                 self.simulation.remove_segment_from_grid(seg_x, seg_y, self)
             self.segments.clear()
             self.lowest_y = float('inf')
+            self.version += 1
 
         if self.is_alive:
-            if random.random() < 0.6:
+            if rng.random() < 0.6:
                 self.grow()
-            if len(algae_list) < MAX_ALGAE and random.random() < 0.01:
-                new_x = self.root_x + random.randint(-20, 20)
-                if 0 <= new_x <= WIDTH:
+            if len(algae_list) < MAX_ALGAE * self.simulation.area_share and rng.random() < 0.01:
+                new_x = self.root_x + rng.randint(-20, 20)
+                if 0 <= new_x <= self.simulation.world.width:
                     new_algae = Algae(new_x, self.base_y, self.simulation)
                     algae_list.append(new_algae)
                     self.simulation.add_segment_to_grid(new_x, self.base_y, new_algae)
 
-    def draw(self, screen):
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["simulation"] = None
+        return state
+
+    def draw(self, screen, offset=(0, 0)):
         if not self.segments:
-            return
-        
-        color = (0, 150, 0) if self.is_alive else (0, 125, 0)
-        step = max(1, len(self.segments) // 10) 
-        points = [(int(x), int(y)) for i, (x, y) in enumerate(self.segments) if i % step == 0]
-        
+            return None
+
+        # The polyline only changes with the segments or the camera
+        if self.render_key != (self.version, offset):
+            step = max(1, len(self.segments) // 10)
+            ox, oy = offset
+            self.render_points = [(int(x - ox), int(y - oy)) for x, y in self.segments[::step]]
+            self.render_color = (0, 150, 0) if self.is_alive else (0, 125, 0)
+            self.render_key = (self.version, offset)
+        points, color = self.render_points, self.render_color
+
         if len(points) >= 2:
-            pygame.draw.lines(screen, color, False, points, 2)
-        elif len(points) == 1:
-            pygame.draw.circle(screen, color, points[0], 2)
+            return pygame.draw.lines(screen, color, False, points, 2)
+        return pygame.draw.circle(screen, color, points[0], 2)
 
 
 class DeadAlgaePart:
@@ -111,16 +131,15 @@ class DeadAlgaePart:
         self.energy_value = random.randint(2, 5) 
         self.float_speed = random.uniform(0.2, 0.5)  
         self.lifetime = round(random.uniform(*DEAD_ALGAE_LIFETIME))
+        self.expires_at = None
 
-    def update(self):
-        strength, direction = self.simulation.current_grid.get_current_at(self.x, self.y)
-        current_x = strength * math.cos(direction)
-        current_y = strength * math.sin(direction)
-        
-        self.x += current_x * CURRENT_MOVEMENT_FACTOR
-        self.y += current_y * CURRENT_MOVEMENT_FACTOR - (self.float_speed * 1.2 - 0.02)
-        self.y -= self.float_speed 
-        self.lifetime -= 2
+    def lifetime_ticks(self):
+        return 2 * math.ceil(self.lifetime / 2)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["simulation"] = None
+        return state
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, (0, 125, 0), (int(self.x), int(self.y)), 2)
\ No newline at end of file
+    def draw(self, screen, offset=(0, 0)):
+        return pygame.draw.circle(screen, (0, 125, 0), (int(self.x - offset[0]), int(self.y - offset[1])), 2)
\ No newline at end of file
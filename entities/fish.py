@@ -1,5 +1,6 @@
 import math
 import random
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 import pygame
@@ -11,49 +12,77 @@ if TYPE_CHECKING:
 
 
 class Egg:
-    def __init__(self, x, y, simulation: "Simulation", genome, incubation_time, survival_chance):
+    def __init__(self, x, y, simulation: "Simulation", genome, incubation_time, survival_chance, parents=(-1, -1)):
         self.x = x
         self.y = y
         self.simulation = simulation
         self.genome = genome
+        self.parents = parents
         self.incubation_time = incubation_time  
         self.survival_chance = survival_chance  
         self.energy_value = random.randint(2, 5) 
         self.lifetime = incubation_time
+        self.expires_at = None
         self.float_speed = random.uniform(0.1, 0.3)  
 
-    def update(self):
-        strength, direction = self.simulation.current_grid.get_current_at(self.x, self.y)
-        current_x = strength * math.cos(direction)
-        current_y = strength * math.sin(direction)
-        self.x += current_x * 0.5
-        self.y += current_y * 0.5 - self.float_speed
-
-        self.lifetime -= 3
-
-        if self.y <= 0 or self.y >= HEIGHT:
-            return False
-        
-        if random.random() > self.survival_chance:
-            return False
-        
-        return True
+    def lifetime_ticks(self):
+        return 2 * math.ceil(self.lifetime / 3)
 
     def hatch(self):
-        if self.lifetime <= 0 and random.random() < self.survival_chance:
-            return Fish(self.x, self.y, self.simulation, energy=20, genome=self.genome)
+        if self.simulation.rng.random() < self.survival_chance:
+            return Fish(self.x, self.y, self.simulation, energy=20, genome=self.genome, parents=self.parents)
         return None
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, (244, 54, 5), (int(self.x), int(self.y)), 2)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["simulation"] = None
+        return state
+
+    def draw(self, screen, offset=(0, 0)):
+        return pygame.draw.circle(screen, (244, 54, 5), (int(self.x - offset[0]), int(self.y - offset[1])), 2)
+
+
+class HaloFish:
+    # Read-only stand-in for a fish simulated by a neighbouring strip worker
+    is_halo = True
+
+    def __init__(self, fish, x_shift=0):
+        self.id = fish.id
+        self.x = fish.x + x_shift
+        self.y = fish.y
+        self.size = fish.size
+        self.direction = fish.direction
+        self.is_dead = fish.is_dead
+        self.is_predator = fish.is_predator
+        self.is_male = fish.is_male
+        self.ready_to_mate = fish.ready_to_mate
+        self.in_algae = fish.is_in_algae()
+
+    def is_in_algae(self):
+        return self.in_algae
+
+
+class HaloFood:
+    is_halo = True
+
+    def __init__(self, item, kind, x_shift=0):
+        self.x = item.x + x_shift
+        self.y = item.y
+        self.kind = kind
 
 
 class Fish:
+    is_halo = False
+
     def __init__(self, x, y, simulation: "Simulation", energy, genome=None,
-                 nearest_food=None, nearest_prey=None, nearest_mate=None):
+                 nearest_food=None, nearest_prey=None, nearest_mate=None, parents=(-1, -1)):
         self.x = x
         self.y = y
         self.simulation = simulation
+        self.id = next(simulation.fish_ids)
+        # Mother and father ids, -1 for fish placed in the world; lineage_row is set by Simulation.add_fish
+        self.parents = parents
+        self.lineage_row = None
 
         self.nearest_food = nearest_food
         self.nearest_prey = nearest_prey
@@ -94,7 +123,8 @@ class Fish:
 
         self.energy_threshold = 35 if self.is_predator else 20
         self.mate_vision = self.vision * 1.5 
-        self.ready_to_mate = False
+        self._ready_to_mate = False
+        self.removed = False
         self.is_dead = False
         self.float_speed = 1.5 / (1 + self.size) / 2
         
@@ -135,18 +165,27 @@ class Fish:
         self.vision_sq_a = self.vision ** 2 * VISION_REDUCTION_IN_ALGAE ** 2
 
         self.is_pregnant = False
-        self.pregnancy_timer = 0
+        self.birth_at = None
         self.pregnancy_duration = round(random.uniform(*PREDATOR_PREGNANCY_DUR)) \
             if self.is_predator else round(random.uniform(*PREY_PREGNANCY_DUR))
         self.pregnancy_energy_cost = 0.1 if self.is_predator else 0.05
         self.child_genome = None
-        self.after_birth_period = 0
+        self.child_parents = None
+        self.after_birth_until = 0
         self.after_birth_duration = round(random.uniform(*PREDATOR_AFTER_BIRTH_DUR)) \
             if self.is_predator else round(random.uniform(*PREY_AFTER_BIRTH_DUR))
         self.kids_num = None
 
         self.is_egglayer = self.reproduction_strategy == "egglayer"
 
+        # Level of detail: idle fish coast for a few ticks between full decisions
+        self.coasting = False
+        self.lod_cell = None
+        self.lod_skip = 0
+        self.lod_interval = 0
+        self.lod_speed = 0
+        self.lod_energy_cost = 0
+
     def calculate_traits(self):
         def get_phenotype(trait):
             alleles = self.genome[trait]["alleles"]
@@ -184,7 +223,8 @@ class Fish:
         self.digestion = get_phenotype("digestion")
         self.reproduction_rate = get_phenotype("reproduction") * (0.25 if self.is_predator else 0.45)
         self.defense = get_phenotype("defense")
-        self.preferred_depth = get_phenotype("preferred_depth") * (HEIGHT - 2 * self.max_size) + self.max_size
+        self.preferred_depth = get_phenotype("preferred_depth") * (self.simulation.world.height - 2 * self.max_size) \
+            + self.max_size
         self.turn_speed = 0.1 if not self.is_predator else 0.08
         self.preferred_depth_range = 50
 
@@ -235,52 +275,58 @@ class Fish:
                         (0.5 if self.is_predator else 1)) * (1 - self.size / 20) + metabolism_phenotype * 0.5
     
     def find_nearest_food(self, algae_list, plankton_list, crustacean_list, dead_algae_parts):
+        nearest = self.find_nearest_local_food(algae_list, plankton_list, crustacean_list, dead_algae_parts)
+        if self.simulation.halo_food:
+            nearest = self.find_nearest_halo_food(nearest)
+        return nearest
+
+    def find_nearest_halo_food(self, nearest):
+        kinds = ("crustacean", "egg") if self.is_predator else ("plankton", "dead_part")
+        if nearest is None:
+            min_dist_sq = self.vision_sq_a if self.is_in_algae() else self.vision_sq_o
+        else:
+            target_x, target_y = nearest[1] if isinstance(nearest, tuple) else (nearest.x, nearest.y)
+            min_dist_sq = (target_x - self.x) ** 2 + (target_y - self.y) ** 2
+
+        for food in self.simulation.halo_food:
+            if food.kind in kinds:
+                dist_sq = (food.x - self.x) ** 2 + (food.y - self.y) ** 2
+                if dist_sq < min_dist_sq:
+                    min_dist_sq = dist_sq
+                    nearest = food
+        return nearest
+
+    def find_nearest_local_food(self, algae_list, plankton_list, crustacean_list, dead_algae_parts):
+        spatial = self.simulation.spatial
+        vision_sq = self.vision_sq_a if self.is_in_algae() else self.vision_sq_o
         if self.is_predator:
             if not crustacean_list:
                 return None
-            closest_crust = min(crustacean_list, key=lambda c: (c.x - self.x) ** 2 + (c.y - self.y) ** 2)
-            dist_sq = (closest_crust.x - self.x) ** 2 + (closest_crust.y - self.y) ** 2
-            vision_sq = self.vision_sq_a if self.is_in_algae else self.vision_sq_o
-
-            if self.simulation.egg_list:
-                closest_egg = min(self.simulation.egg_list, key=lambda c: (c.x - self.x) ** 2 + (c.y - self.y) ** 2)
-                dist_sq_egg = (closest_egg.x - self.x) ** 2 + (closest_egg.y - self.y) ** 2
-                if dist_sq_egg < dist_sq:
-                    return closest_egg if dist_sq_egg < vision_sq else None
-
-            return closest_crust if dist_sq < vision_sq else None
+            closest, dist_sq = spatial.nearest("crustacean", self.x, self.y, vision_sq)
+            closest_egg, _ = spatial.nearest("egg", self.x, self.y, dist_sq)
+            return closest_egg or closest
 
         else:
             closest = None
-            min_dist_sq = self.vision_sq_a if self.is_in_algae else self.vision_sq_o
-            
-            for algae in algae_list:
-                for seg_x, seg_y in algae.segments:
-                    dist_sq = (seg_x - self.x) ** 2 + (seg_y - self.y) ** 2
-                    if dist_sq < min_dist_sq:
-                        min_dist_sq = dist_sq
-                        closest = (algae, (seg_x, seg_y))
-            
-            for plankton in plankton_list:
-                dist_sq = (plankton.x - self.x) ** 2 + (plankton.y - self.y) ** 2
-                if dist_sq < min_dist_sq:
-                    min_dist_sq = dist_sq
-                    closest = plankton
-            
-            for dead_part in dead_algae_parts:
-                dist_sq = (dead_part.x - self.x) ** 2 + (dead_part.y - self.y) ** 2
-                if dist_sq < min_dist_sq:
-                    min_dist_sq = dist_sq
-                    closest = dead_part
-            
+            min_dist_sq = vision_sq
+            for kind in ("algae", "plankton", "dead_part"):
+                found, dist_sq = spatial.nearest(kind, self.x, self.y, min_dist_sq)
+                if found is not None:
+                    closest, min_dist_sq = found, dist_sq
             return closest
     
+    def nearby_fish(self, fish_list, radius):
+        sim = self.simulation
+        if fish_list is sim.visible_fish:
+            return sim.spatial.moving_within("fish", self.x, self.y, radius)
+        return fish_list
+
     def find_nearest_prey(self, fish_list):
         if not fish_list:
             return None
         
         effective_vision = self.vision * (VISION_REDUCTION_IN_ALGAE if self.is_in_algae() else 1)
-        potential_prey = [f for f in fish_list if f != self and 
+        potential_prey = [f for f in self.nearby_fish(fish_list, effective_vision) if f != self and 
                         (f.is_dead or
                         (not f.is_predator) or 
                         (f.is_predator and f.size + EAT_SIZE < self.size))]
@@ -307,22 +353,33 @@ class Fish:
         effective_mate_vision = self.mate_vision * (VISION_REDUCTION_IN_ALGAE 
                                                     if self.is_in_algae() else 1)
         
-        potential_mates = [f for f in fish_list if f != self and f.ready_to_mate
-                           and f.is_predator == self.is_predator and f.is_male != self.is_male]
-        
+        sim = self.simulation
+        if fish_list is sim.visible_fish:
+            # Ready partners in the cells around the fish come from the registry; halo fish from
+            # neighbouring strips are few
+            candidates = sim.mates.partners_near(self, effective_mate_vision, sim.scheduler.now)
+            candidates += [f for f in sim.halo_fish if f.ready_to_mate and f.is_predator == self.is_predator
+                           and f.is_male != self.is_male]
+        else:
+            candidates = [f for f in fish_list if f.ready_to_mate
+                          and f.is_predator == self.is_predator and f.is_male != self.is_male]
+
+        # Partners out of range are skipped before the algae check, which only ever shortens the range
+        vision_sq = effective_mate_vision * effective_mate_vision
+        potential_mates = [f for f in candidates if f is not self
+                           and (f.x - self.x) ** 2 + (f.y - self.y) ** 2 < vision_sq]
         if not potential_mates:
             return None
-        
-        def effective_distance(mate):
-            mate_in_algae = mate.is_in_algae()
-            self_in_algae = self.is_in_algae()
-            vision = effective_mate_vision * 0.4 if (mate_in_algae and not self_in_algae) else effective_mate_vision
-            vision_sq_adj = vision * vision
+
+        self_in_algae = self.is_in_algae()
+        nearest_mate, nearest_dist_sq = None, float('inf')
+        for mate in potential_mates:
+            vision = effective_mate_vision * 0.4 \
+                if (not self_in_algae and mate.is_in_algae()) else effective_mate_vision
             dist_sq = (mate.x - self.x) ** 2 + (mate.y - self.y) ** 2
-            return dist_sq if dist_sq < vision_sq_adj else float('inf')
-        
-        nearest_mate = min(potential_mates, key=effective_distance, default=None)
-        return nearest_mate if effective_distance(nearest_mate) != float('inf') else None
+            if dist_sq < vision * vision and dist_sq < nearest_dist_sq:
+                nearest_mate, nearest_dist_sq = mate, dist_sq
+        return nearest_mate
 
     def handle_collision(self, other_fish):
         if self.is_dead or other_fish.is_dead:
@@ -350,36 +407,39 @@ class Fish:
             other_fish.direction = other_fish.direction * 0.5 + math.atan2(-direction_y, -direction_x) * 0.5
 
     def is_in_algae(self):
-        nearby_segments = self.simulation.get_nearby_segments(self.x, self.y)
-        threshold_sq = (self.size + ALGAE_RAD) ** 2
-        for seg_x, seg_y, _ in nearby_segments:
-            dist_sq = (self.x - seg_x) ** 2 + (self.y - seg_y) ** 2
-            if dist_sq < threshold_sq:
-                return True
-        return False
+        if not self.simulation.algae_density.any_within(self.x, self.y, self.size + ALGAE_RAD):
+            return False
+        return self.simulation.spatial.any_within("algae", self.x, self.y, self.size + ALGAE_RAD)
 
     def move(self, predators=None, fish_list=None):
         sim = self.simulation
+        world = sim.world
 
         if self.is_dead:
-            strength, direction = sim.current_grid.get_current_at(self.x, self.y)
-            current_x = strength * math.cos(direction)
-            current_y = strength * math.sin(direction)
-            
+            current_x, current_y = sim.current_grid.velocity_at(self.x, self.y)
             self.x += current_x * CURRENT_MOVEMENT_FACTOR
             self.y += current_y * CURRENT_MOVEMENT_FACTOR - (self.float_speed * 1.2 - self.size * 0.02)
             if self.y <= 0: 
                 return
             return
 
+        if self.lod_skip:
+            if self.ready_to_mate or sim.activity_near(self):
+                self.lod_skip = 0
+            else:
+                self.lod_skip -= 1
+                self.coast()
+                return
+        self.coasting = False
+
+        perception_start = perf_counter()
         self.nearest_food = target_food = self.find_nearest_food(sim.algae_list, sim.plankton_list,
                                                    sim.crustacean_list, sim.dead_algae_parts)
         self.nearest_prey = target_prey = self.find_nearest_prey(fish_list) if self.is_predator else None
         self.nearest_mate = target_mate = self.find_nearest_mate(fish_list)
+        sim.timer.add("perception", perf_counter() - perception_start)
 
-        strength, direction = sim.current_grid.get_current_at(self.x, self.y)
-        current_x = strength * math.cos(direction)
-        current_y = strength * math.sin(direction)
+        current_x, current_y = sim.current_grid.velocity_at(self.x, self.y)
         current_vector = math.hypot(current_x, current_y)  
         current_angle = math.atan2(current_y, current_x)
 
@@ -408,14 +468,15 @@ class Fish:
         self.age += APT
         self.grow()
 
-        food_availability = len(sim.algae_list) / MAX_ALGAE if not self.is_predator else len(sim.crustacean_list) / INITIAL_CRUSTACEANS
+        food_availability = len(sim.algae_list) / (MAX_ALGAE * sim.area_share) if not self.is_predator \
+            else len(sim.crustacean_list) / (INITIAL_CRUSTACEANS * sim.area_share)
         self.update_epigenetics(food_availability)
 
         if self.age >= self.max_age and not self.is_dead:
-            self.is_dead = True
+            self.die("old_age")
             self.energy = max(self.energy, 10)
 
-        current_strength = (HEIGHT - self.y) / HEIGHT * 0.5  
+        current_strength = (world.height - self.y) / world.height * 0.5  
         self.x += current_strength
 
         effective_vision = self.vision * (VISION_REDUCTION_IN_ALGAE if in_algae else 1)
@@ -438,17 +499,19 @@ class Fish:
         if self.is_pregnant:
             effective_speed *= 0.85
 
+        idle = False
+
         # Пріоритети дій:
         # 1. Втеча від хижака
         # 2. Розмноження (якщо готові)
         # 3. Полювання/пошук їжі
         # 4. Випадковий рух у спокої або рух до preferred_depth
 
-        vision_sq = self.vision_sq_a if self.is_in_algae else self.vision_sq_o
+        vision_sq = self.vision_sq_a if self.is_in_algae() else self.vision_sq_o
         if nearest_predator and (nearest_predator.x - self.x) ** 2 + (nearest_predator.y - self.y) ** 2 < vision_sq:
             base_angle = math.atan2(self.y - nearest_predator.y, self.x - nearest_predator.x)
 
-            if self.y > HEIGHT - LINE_LEVEL:
+            if self.y > world.height - world.line_level:
                 possible_angles = [base_angle + math.pi / 3, base_angle - math.pi / 3, base_angle]
                 best_angle = base_angle
                 max_dist = -float('inf')
@@ -544,31 +607,33 @@ class Fish:
                 self.direction = self.direction % (2 * math.pi)
                 idle_speed = effective_speed * 0.4  
             else:
-                if self.y > LINE_LEVEL and not self.is_pregnant:
+                if self.y > world.line_level and not self.is_pregnant:
                     if self.simulation.get_random() < 0.7:  
-                        self.direction = random.uniform(-math.pi / 6, 0)  
+                        self.direction = sim.rng.uniform(-math.pi / 6, 0)  
                     else:  
-                        self.direction += random.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
+                        self.direction += sim.rng.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
 
-                elif self.is_pregnant and self.y < LINE_LEVEL and not in_algae:
+                elif self.is_pregnant and self.y < world.line_level and not in_algae:
                     if self.simulation.get_random() < 0.7:  
-                        self.direction = random.uniform(3 * math.pi / 2, 2 * math.pi)
+                        self.direction = sim.rng.uniform(3 * math.pi / 2, 2 * math.pi)
                     else:  
-                        self.direction += random.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
+                        self.direction += sim.rng.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
 
                 elif self.simulation.get_random() < 0.15: 
 
-                    self.direction += random.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
+                    self.direction += sim.rng.uniform(-self.turn_speed * 0.2, self.turn_speed * 0.2)
 
                 idle_speed = effective_speed * IDLE_MOVEMENT_FACTOR 
+                idle = (not target_food and not target_prey and not target_mate and not self.ready_to_mate
+                        and not self.is_pregnant and not in_algae and self.y <= world.line_level)
 
             self.x += math.cos(self.direction) * idle_speed
             self.y += math.sin(self.direction) * idle_speed
 
         if self.simulation.get_random() < 0.25:
-            self.direction += random.uniform(-self.turn_speed * 0.1, self.turn_speed * 0.1)
+            self.direction += sim.rng.uniform(-self.turn_speed * 0.1, self.turn_speed * 0.1)
         elif in_algae and self.simulation.get_random() < 0.25:
-            self.direction += random.uniform(-self.turn_speed * 0.3, -self.turn_speed * 0.1)
+            self.direction += sim.rng.uniform(-self.turn_speed * 0.3, -self.turn_speed * 0.1)
 
         # Обробка колізій з іншими рибами
         if fish_list:
@@ -576,12 +641,12 @@ class Fish:
                 if other_fish != self:
                     self.handle_collision(other_fish)
 
-        if self.x > WIDTH + self.size:
+        if self.x > world.width + self.size:
             self.x = -self.size
         elif self.x < -self.size:
-            self.x = WIDTH + self.size
+            self.x = world.width + self.size
 
-        self.y = max(self.size, min(HEIGHT - self.size, self.y))
+        self.y = max(self.size, min(world.height - self.size, self.y))
 
         energy_cost = (effective_speed * self.size * 0.005 * effective_metabolism * 
                       (1 - self.defense * 0.4) / oxygen_factor)
@@ -590,9 +655,40 @@ class Fish:
         energy_cost += self.defense_cost
         energy_cost += self.pregnancy_energy_cost if self.is_pregnant else 0
         self.energy -= energy_cost
+
+        if LOD_ENABLED and idle:
+            self.lod_interval = min(LOD_MAX_INTERVAL, self.lod_interval * 2 or 1)
+            self.lod_skip = self.lod_interval
+            self.lod_speed = idle_speed
+            self.lod_energy_cost = energy_cost
+        else:
+            self.lod_interval = 0
+
+    def coast(self):
+        # Cheap kinematic update for idle fish with nothing in vision range
+        self.coasting = True
+        world = self.simulation.world
+        current_x, current_y = self.simulation.current_grid.velocity_at(self.x, self.y)
+        self.x += current_x * 0.5 + math.cos(self.direction) * self.lod_speed
+        self.y += current_y * 0.5 + math.sin(self.direction) * self.lod_speed
+        self.x += (world.height - self.y) / world.height * 0.5
+
+        self.age += APT
+        self.grow()
+        if self.age >= self.max_age:
+            self.die("old_age")
+            self.energy = max(self.energy, 10)
+
+        if self.x > world.width + self.size:
+            self.x = -self.size
+        elif self.x < -self.size:
+            self.x = world.width + self.size
+        self.y = max(self.size, min(world.height - self.size, self.y))
+
+        self.energy -= self.lod_energy_cost
         
     def eat(self, fish_list):
-        if self.is_dead or self.energy >= self.max_energy * 0.95:
+        if self.is_dead or self.coasting or self.energy >= self.max_energy * 0.95:
             return
         
         sim = self.simulation
@@ -605,6 +701,7 @@ class Fish:
                     energy_gain = crust.energy_value * (0.5 + self.digestion * 0.5)
                     self.energy = min(self.max_energy, self.energy + energy_gain)
                     sim.crustacean_list.remove(crust)
+                    sim.entities_changed("crustacean")
             
             for prey in fish_list[:]:
                 if prey != self:
@@ -615,13 +712,13 @@ class Fish:
                             energy_gain = prey.energy * (0.5 + self.digestion * 0.5) * 0.7
                             self.energy = min(self.max_energy, self.energy + energy_gain)
                             prey.energy = -1
-                            fish_list.remove(prey)
+                            sim.remove_fish(prey)
                         elif not prey.is_predator:
                             escape_chance = prey.defense * 0.35
                             if self.simulation.get_random() >= escape_chance:
                                 energy_gain = prey.energy * (0.5 + self.digestion * 0.5)
                                 self.energy = min(self.max_energy, self.energy + energy_gain)
-                                fish_list.remove(prey)
+                                sim.remove_fish(prey, cause="eaten")
                                 if self.simulation.get_random() < prey.defense * 0.2:
                                     # Невдача з можливим ушкодженням хижака
                                     self.energy -= 5
@@ -633,7 +730,7 @@ class Fish:
                             if self.simulation.get_random() >= escape_chance:
                                 energy_gain = prey.energy * (0.5 + self.digestion * 0.5)
                                 self.energy = min(self.max_energy, self.energy + energy_gain)
-                                fish_list.remove(prey)
+                                sim.remove_fish(prey, cause="eaten")
                                 if self.simulation.get_random() < prey.defense * 0.2:
                                     # Невдача з можливим ушкодженням хижака
                                     self.energy -= 5
@@ -646,6 +743,7 @@ class Fish:
                     energy_gain = egg.energy_value * (0.5 + self.digestion * 0.5)
                     self.energy = min(self.max_energy, self.energy + energy_gain)
                     sim.egg_list.remove(egg)
+                    sim.entities_changed("egg")
         else:
             for algae in sim.algae_list[:]:
                 for i, (seg_x, seg_y) in enumerate(algae.segments[:]):
@@ -653,8 +751,7 @@ class Fish:
                     if dist_sq < threshold_sq:
                         energy_gain = 3 * (0.5 + self.digestion * 0.5)
                         self.energy = min(self.max_energy, self.energy + energy_gain)
-                        algae.segments.pop(i)
-                        sim.remove_segment_from_grid(seg_x, seg_y, algae)
+                        algae.remove_segment(i)
                         algae.energy_value = max(0, algae.energy_value - 3)
                         if not algae.segments:
                             sim.algae_list.remove(algae)
@@ -666,6 +763,7 @@ class Fish:
                     energy_gain = plankton.energy_value * (0.5 + self.digestion * 0.5)
                     self.energy = min(self.max_energy, self.energy + energy_gain)
                     sim.plankton_list.remove(plankton)
+                    sim.entities_changed("plankton")
             
             for dead_part in sim.dead_algae_parts[:]:
                 distance = math.hypot(self.x - dead_part.x, self.y - dead_part.y)
@@ -673,10 +771,36 @@ class Fish:
                     energy_gain = dead_part.energy_value * (0.5 + self.digestion * 0.5)
                     self.energy = min(self.max_energy, self.energy + energy_gain)
                     sim.dead_algae_parts.remove(dead_part)
+                    sim.entities_changed("dead_part")
     
+    @property
+    def ready_to_mate(self):
+        return self._ready_to_mate
+
+    @ready_to_mate.setter
+    def ready_to_mate(self, value):
+        if value != self._ready_to_mate:
+            self._ready_to_mate = value
+            # Fish eaten earlier in the tick are still walked by the fish loop but must not return
+            if not self.removed:
+                self.simulation.mates.update(self)
+
+    @property
+    def pregnancy_timer(self):
+        if not self.is_pregnant or self.birth_at is None:
+            return 0
+        return max(0, self.pregnancy_duration + 1 - (self.birth_at - self.simulation.scheduler.now))
+
+    @property
+    def after_birth_period(self):
+        return max(0, self.after_birth_until - self.simulation.scheduler.now)
+
+    @after_birth_period.setter
+    def after_birth_period(self, value):
+        self.after_birth_until = self.simulation.scheduler.now + math.ceil(value)
+
     def check_mating_readiness(self):
         if self.after_birth_period > 0:
-            self.after_birth_period -= 1
             return None
         
         if not self.is_dead and not self.is_pregnant:
@@ -696,16 +820,19 @@ class Fish:
         if dist_sq > threshold_sq or self.energy < self.max_energy * 0.2 or partner.energy < partner.max_energy * 0.2:
             return None
 
+        rng = self.simulation.rng
+        mother, father = (partner, self) if self.is_male else (self, partner)
+        parents = (mother.id, father.id)
         if not self.is_male:
             if self.is_egglayer:
-                kids_num = self.kids_num = random.randint(10, 15) if self.is_predator else random.randint(15, 25)
+                kids_num = self.kids_num = rng.randint(10, 15) if self.is_predator else rng.randint(15, 25)
             else:
-                kids_num = self.kids_num = random.randint(1, 2) if self.is_predator else random.randint(1, 3)
+                kids_num = self.kids_num = rng.randint(1, 2) if self.is_predator else rng.randint(1, 3)
         else:
             if partner.is_egglayer:
-                kids_num = partner.kids_num = random.randint(10, 15) if partner.is_predator else random.randint(15, 25)
+                kids_num = partner.kids_num = rng.randint(10, 15) if partner.is_predator else rng.randint(15, 25)
             else:
-                kids_num = partner.kids_num = random.randint(1, 2) if partner.is_predator else random.randint(1, 3)
+                kids_num = partner.kids_num = rng.randint(1, 2) if partner.is_predator else rng.randint(1, 3)
 
         kid_genomes = []
         for _ in range(kids_num):
@@ -718,19 +845,19 @@ class Fish:
                 if self.simulation.get_random() < 0.7:
                     self_allele = self_alleles[self_dom]
                 else:
-                    self_allele = random.choice(self_alleles)
+                    self_allele = rng.choice(self_alleles)
                 if self.simulation.get_random() < 0.7:
                     partner_allele = partner_alleles[partner_dom]
                 else:
-                    partner_allele = random.choice(partner_alleles)
+                    partner_allele = rng.choice(partner_alleles)
                 mutation_range = 0.15
                 if self.simulation.get_random() < MUTATION_RATE and key != "predator":
-                    self_allele = max(0, min(1, self_allele + random.uniform(-mutation_range, mutation_range)))
+                    self_allele = max(0, min(1, self_allele + rng.uniform(-mutation_range, mutation_range)))
                 if self.simulation.get_random() < MUTATION_RATE and key != "predator":
-                    partner_allele = max(0, min(1, partner_allele + random.uniform(-mutation_range, mutation_range)))
+                    partner_allele = max(0, min(1, partner_allele + rng.uniform(-mutation_range, mutation_range)))
                 child_genome[key] = {
                     "alleles": [self_allele, partner_allele],
-                    "dominance": random.choice([0, 1])
+                    "dominance": rng.choice([0, 1])
                 }
             kid_genomes.append(child_genome)
 
@@ -740,25 +867,31 @@ class Fish:
         if not self.is_male:
             if self.is_egglayer:
                 for genome in kid_genomes:
-                    incubation_time = random.randint(100, 150) if self.is_predator else random.randint(80, 110)
+                    incubation_time = rng.randint(100, 150) if self.is_predator else rng.randint(80, 110)
                     survival_chance = 0.88 if not self.is_predator else 0.73
-                    egg = Egg(self.x + random.uniform(-2, 2), self.y + random.uniform(-2, 2), self.simulation, genome, incubation_time, survival_chance)
-                    self.simulation.egg_list.append(egg)
+                    egg = Egg(self.x + rng.uniform(-2, 2), self.y + rng.uniform(-2, 2), self.simulation, genome,
+                              incubation_time, survival_chance, parents)
+                    self.simulation.add_egg(egg)
                 self.after_birth_period = self.after_birth_duration / 4.5
             else:
                 self.is_pregnant = True
                 self.child_genome = kid_genomes
+                self.child_parents = parents
+                self.simulation.schedule_birth(self)
         else:
             if partner.is_egglayer:
                 for genome in kid_genomes:
-                    incubation_time = random.randint(100, 150) if partner.is_predator else random.randint(80, 110)
+                    incubation_time = rng.randint(100, 150) if partner.is_predator else rng.randint(80, 110)
                     survival_chance = 0.88 if not partner.is_predator else 0.73
-                    egg = Egg(partner.x + random.uniform(-2, 2), partner.y + random.uniform(-2, 2), self.simulation, genome, incubation_time, survival_chance)
-                    self.simulation.egg_list.append(egg)
+                    egg = Egg(partner.x + rng.uniform(-2, 2), partner.y + rng.uniform(-2, 2), self.simulation, genome,
+                              incubation_time, survival_chance, parents)
+                    self.simulation.add_egg(egg)
                 partner.after_birth_period = self.after_birth_duration / 4.5
             else:
                 partner.is_pregnant = True
                 partner.child_genome = kid_genomes
+                partner.child_parents = parents
+                self.simulation.schedule_birth(partner)
 
         self.energy -= energy_cost if not (not self.is_male and self.is_egglayer) else energy_cost * 0.55
         partner.energy -= energy_cost if not (not partner.is_male and partner.is_egglayer) else energy_cost * 0.55
@@ -766,26 +899,37 @@ class Fish:
         partner.ready_to_mate = False
         return None
 
+    def die(self, cause):
+        self.is_dead = True
+        self.simulation.on_fish_died(self, cause)
+
     def give_birth(self):
         if self.is_dead or not self.is_pregnant or self.is_egglayer:
             return None
 
-        if self.pregnancy_timer < self.pregnancy_duration:
-            self.pregnancy_timer += 1
-            return None
-
         self.is_pregnant = False
-        self.pregnancy_timer = 0
+        self.birth_at = None
         kids = []
         for i in range(self.kids_num):
-            kids.append(Fish(self.x, self.y, self.simulation, 20, self.child_genome[i]))
+            kids.append(Fish(self.x, self.y, self.simulation, 20, self.child_genome[i], parents=self.child_parents))
         self.child_genome = None
+        self.child_parents = None
         self.kids_num = None
         self.energy -= 5 * (1 + self.metabolism * 0.25)
         self.after_birth_period = self.after_birth_duration
         return kids
 
-    def draw(self, screen, show_vision, show_targets):
+    def __getstate__(self):
+        # Targets point into the sending worker's world, so they are dropped on hand-off
+        state = self.__dict__.copy()
+        state["simulation"] = None
+        state["nearest_food"] = state["nearest_prey"] = state["nearest_mate"] = None
+        return state
+
+    def draw(self, screen, show_vision, show_targets, offset=(0, 0)):
+        ox, oy = offset
+        x, y = int(self.x - ox), int(self.y - oy)
+        world_width = self.simulation.world.width
         # Відображення зони видимості
         if show_vision:
             vision_surface = pygame.Surface((self.vision * 2, self.vision * 2), pygame.SRCALPHA)
@@ -796,46 +940,49 @@ class Fish:
 
             base_x = int(self.x - self.vision)
             base_y = int(self.y - self.vision)
-            screen.blit(vision_surface, (base_x, base_y))
+            screen.blit(vision_surface, (base_x - ox, base_y - oy))
 
             if base_x < 0:
-                screen.blit(vision_surface, (base_x + WIDTH, base_y))
-            elif base_x + self.vision * 2 > WIDTH:  
-                screen.blit(vision_surface, (base_x - WIDTH, base_y))
+                screen.blit(vision_surface, (base_x + world_width - ox, base_y - oy))
+            elif base_x + self.vision * 2 > world_width:  
+                screen.blit(vision_surface, (base_x - world_width - ox, base_y - oy))
         
         # Відображення ліній до цілей
         if show_targets and not self.is_dead and self.energy < self.max_energy * 0.95:
             if self.is_predator and self.nearest_prey and math.hypot(self.nearest_prey.x - self.x, self.nearest_prey.y - self.y) < self.vision:
-                pygame.draw.line(screen, (255, 0, 0), (int(self.x), int(self.y)), (int(self.nearest_prey.x), int(self.nearest_prey.y)))
+                pygame.draw.line(screen, (255, 0, 0), (x, y), (int(self.nearest_prey.x - ox), int(self.nearest_prey.y - oy)))
             elif self.is_predator and self.nearest_food and math.hypot(self.nearest_food.x - self.x, self.nearest_food.y - self.y) < self.vision:
-                pygame.draw.line(screen, (255, 0, 0), (int(self.x), int(self.y)), (int(self.nearest_food.x), int(self.nearest_food.y)))
+                pygame.draw.line(screen, (255, 0, 0), (x, y), (int(self.nearest_food.x - ox), int(self.nearest_food.y - oy)))
             elif not self.is_predator and self.nearest_food:
                 if isinstance(self.nearest_food, tuple):
                     _, (target_x, target_y) = self.nearest_food
                 else: 
                     target_x, target_y = self.nearest_food.x, self.nearest_food.y
                 if math.hypot(target_x - self.x, target_y - self.y) < self.vision:
-                    pygame.draw.line(screen, (0, 255, 0), (int(self.x), int(self.y)), (int(target_x), int(target_y)))
+                    pygame.draw.line(screen, (0, 255, 0), (x, y), (int(target_x - ox), int(target_y - oy)))
             elif self.nearest_mate and self.ready_to_mate and math.hypot(self.nearest_mate.x - self.x, self.nearest_mate.y - self.y) < self.mate_vision:
-                pygame.draw.line(screen, (255, 255, 0), (int(self.x), int(self.y)), (int(self.nearest_mate.x), int(self.nearest_mate.y)))
+                pygame.draw.line(screen, (255, 255, 0), (x, y), (int(self.nearest_mate.x - ox), int(self.nearest_mate.y - oy)))
 
         # Відображення риби
         if self.is_dead:
-            pygame.draw.circle(screen, (100, 100, 100), (int(self.x), int(self.y)), int(self.size))
+            pygame.draw.circle(screen, (100, 100, 100), (x, y), int(self.size))
         else:
             if self.is_predator:
-                pygame.draw.circle(screen, (255, 0, 0), (int(self.x), int(self.y)), int(self.size) + 2, 1)
+                pygame.draw.circle(screen, (255, 0, 0), (x, y), int(self.size) + 2, 1)
             if self.ready_to_mate:
-                pygame.draw.circle(screen, (255, 255, 0), (int(self.x), int(self.y)), int(self.size) + 3, 1)
+                pygame.draw.circle(screen, (255, 255, 0), (x, y), int(self.size) + 3, 1)
             if self.is_pregnant:
-                pygame.draw.circle(screen, (255, 255, 255), (int(self.x), int(self.y)), int(self.size) + 4, 1)
+                pygame.draw.circle(screen, (255, 255, 255), (x, y), int(self.size) + 4, 1)
             if self.is_male:
-                pygame.draw.circle(screen, (0, 0, 255), (int(self.x), int(self.y)), int(self.size) + 1, 2)
+                pygame.draw.circle(screen, (0, 0, 255), (x, y), int(self.size) + 1, 2)
             else:
-                pygame.draw.circle(screen, (0, 255, 0), (int(self.x), int(self.y)), int(self.size) + 1, 2)
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
+                pygame.draw.circle(screen, (0, 255, 0), (x, y), int(self.size) + 1, 2)
+            pygame.draw.circle(screen, self.color, (x, y), int(self.size))
         self.tail_angle += self.tail_speed * self.speed if not self.is_dead else 0
         tail_offset = math.sin(self.tail_angle) * self.size * 0.3
         tail_x = self.x - math.cos(self.direction) * self.size * 1.5
         tail_y = self.y - math.sin(self.direction) * self.size * 0.5 + tail_offset
-        pygame.draw.line(screen, (255, 255, 255), (int(self.x), int(self.y)), (int(tail_x), int(tail_y)), 2)
\ No newline at end of file
+        tail = pygame.draw.line(screen, (255, 255, 255), (x, y), (int(tail_x - ox), int(tail_y - oy)), 2)
+        # Area covered by the body and its outermost ring, for dirty-rect rendering
+        radius = int(self.size) + 5
+        return tail.union((x - radius, y - radius, 2 * radius + 1, 2 * radius + 1))
\ No newline at end of file
@@ -3,51 +3,39 @@ import random
 
 import pygame
 
-from core.settings import CRUSTACEAN_LIFETIME, HEIGHT, PLANKTON_LIFETIME, WIDTH
+from core.settings import CRUSTACEAN_LIFETIME, PLANKTON_LIFETIME
 
 
 class Crustacean:
-    def __init__(self, x, y):
+    def __init__(self, x, y, energy_value=None, speed=None, direction=None, lifetime=None):
+        # Values left out are drawn here; Simulation.spawn_many passes them in, drawn in bulk
         self.x = x
         self.y = y
-        self.energy_value = random.randint(25, 40)
-        self.speed = random.uniform(0.5, 1.0)
-        self.direction = random.uniform(0, 2 * math.pi)
-        self.lifetime = round(random.uniform(*CRUSTACEAN_LIFETIME))
+        self.energy_value = random.randint(25, 40) if energy_value is None else energy_value
+        self.speed = random.uniform(0.5, 1.0) if speed is None else speed
+        self.direction = random.uniform(0, 2 * math.pi) if direction is None else direction
+        self.lifetime = round(random.uniform(*CRUSTACEAN_LIFETIME)) if lifetime is None else lifetime
+        self.expires_at = None
 
-    def update(self):
-        if self.y < HEIGHT // 3:
-            self.y += self.speed / 2
-            random_x = random.uniform(-self.speed, self.speed)
-            self.x += random_x
-            
-        else:
-            self.x += math.cos(self.direction) * self.speed
-            self.y += math.sin(self.direction) * self.speed
+    def lifetime_ticks(self):
+        # Used to lose 2 lifetime on every other tick
+        return 2 * math.ceil(self.lifetime / 2)
 
-        self.lifetime -= 2
-
-        if self.x < 0 or self.x > WIDTH:
-            self.direction = math.pi - self.direction
-
-        if self.y < HEIGHT // 3:
-            self.direction = math.atan2(math.sin(self.direction) * -1, math.cos(self.direction))
-        elif self.y > HEIGHT - 10:
-            self.direction = math.atan2(math.sin(self.direction) * -1, math.cos(self.direction))
-
-    def draw(self, screen):
-        pygame.draw.circle(screen, (150, 75, 0), (int(self.x), int(self.y)), 4)  
+    def draw(self, screen, offset=(0, 0)):
+        return pygame.draw.circle(screen, (150, 75, 0), (int(self.x - offset[0]), int(self.y - offset[1])), 4)  
 
 
 class Plankton:
-    def __init__(self, x, y):
+    def __init__(self, x, y, energy_value=None, lifetime=None):
         self.x = x
         self.y = y
-        self.energy_value = random.randint(3, 7)  
-        self.lifetime = round(random.uniform(*PLANKTON_LIFETIME))
+        self.energy_value = random.randint(3, 7) if energy_value is None else energy_value
+        self.lifetime = round(random.uniform(*PLANKTON_LIFETIME)) if lifetime is None else lifetime
+        self.expires_at = None
 
-    def update(self):
-        self.lifetime -= 3
+    def lifetime_ticks(self):
+        # Used to lose 3 lifetime on every other tick
+        return 2 * math.ceil(self.lifetime / 3)
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, (0, 200, 200), (int(self.x), int(self.y)), 2)
+    def draw(self, screen, offset=(0, 0)):
+        return pygame.draw.circle(screen, (0, 200, 200), (int(self.x - offset[0]), int(self.y - offset[1])), 2)
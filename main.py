@@ -1,14 +1,30 @@
+"""Run the simulation in a window.
+
+    python main.py [--world WIDTH HEIGHT] [--chunk-size PIXELS] [--startup-report]
+
+Worlds larger than the window are scrolled with the arrow keys.
+"""
+# First, so the import time of everything below is part of the startup report
+from core.startup import StartupTimer
+
+import argparse
 import cProfile
 import pygame
 
 from core.profiling import profile
-from core.settings import HEIGHT, PROFILING, WIDTH
+from core.settings import HEIGHT, PROFILING, WIDTH, WORLD_CHUNK_SIZE, WORLD_SIZE
 from core.simulation import Simulation
+from core.world import World
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Fish Simulation")
-clock = pygame.time.Clock()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fish Simulation")
+    parser.add_argument("--world", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        help=f"world size in pixels (default: {WIDTH} {HEIGHT}, the window size)")
+    parser.add_argument("--chunk-size", type=int, default=WORLD_CHUNK_SIZE,
+                        help="side of the chunks environment fields are allocated in")
+    parser.add_argument("--startup-report", action="store_true", help="print how long each startup phase took")
+    return parser.parse_args()
 
 def main():
     sim.start_generation()
@@ -20,5 +36,19 @@ def main():
     pygame.quit()
 
 if __name__ == "__main__":
-    sim = Simulation(screen, clock)
-    main()
\ No newline at end of file
+    startup = StartupTimer()
+    startup.mark("imports")
+    args = parse_args()
+    world = World(*(args.world or WORLD_SIZE or (WIDTH, HEIGHT)), args.chunk_size)
+
+    pygame.init()
+    screen = pygame.display.set_mode(world.window_size())
+    pygame.display.set_caption("Fish Simulation")
+    clock = pygame.time.Clock()
+    startup.mark("pygame")
+
+    sim = Simulation(screen, clock, world)
+    startup.mark("simulation")
+    if args.startup_report:
+        print(startup.report())
+    main()
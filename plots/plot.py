@@ -1,9 +1,8 @@
-import tkinter as tk
 from threading import Thread
 from typing import TYPE_CHECKING
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from core.history import TieredSeries
+from core.lineage import GENES
 
 if TYPE_CHECKING:
     from core.simulation import Simulation
@@ -11,21 +10,29 @@ if TYPE_CHECKING:
 class Plot:
     def __init__(self, simulation: 'Simulation') -> None:
         self.simulation = simulation
-        self.fish_info = [] 
-        self.energy_info = [] 
-        self.size_info = []  
-        self.food_info = []
-        self.algae_info = []
+        # Bounded history: full resolution for recent ticks, min/mean/max buckets for older ones
+        self.fish_info = TieredSeries(("fish", "predators", "prey"))
+        self.energy_info = TieredSeries(("predators", "prey"))
+        self.size_info = TieredSeries(("predators", "prey"))
+        self.food_info = TieredSeries(("plankton", "crustaceans", "dead_parts"))
+        self.algae_info = TieredSeries(("algae_parts",))
+        # Read from the simulation's running population stats, no per-tick walk over the genomes
+        self.allele_info = TieredSeries(GENES)
+        self.variance_info = TieredSeries(GENES)
+        self.composition_info = TieredSeries(("predators", "egglayers", "males"))
         self.global_time = 0
         self.window = None
         self.canvas = None
         self.figure = None
         self.current_plot_type = "population"
+        self.latest = {}
 
     def update(self):
-        fishes_population = len([f for f in self.simulation.fish_population if not f.is_dead])
-        predators = len([f for f in self.simulation.fish_population if f.is_predator and not f.is_dead])
-        prey = len([f for f in self.simulation.fish_population if not f.is_predator and not f.is_dead])
+        stats = self.simulation.stats
+        fishes_population = stats.alive
+        predators = stats.predators
+        prey = stats.prey
+        fractions = stats.fractions()
 
         predator_fish = [f for f in self.simulation.fish_population if f.is_predator and not f.is_dead]
         prey_fish = [f for f in self.simulation.fish_population if not f.is_predator and not f.is_dead]
@@ -39,18 +46,36 @@ class Plot:
         crustaceans = len(self.simulation.crustacean_list)
         dead_parts = len(self.simulation.dead_algae_parts)
 
-        self.fish_info.append((self.global_time, fishes_population, predators, prey))
-        self.energy_info.append((self.global_time, avg_energy_predators, avg_energy_prey))
-        self.size_info.append((self.global_time, avg_size_predators, avg_size_prey))
-        self.food_info.append((self.global_time, planktons, crustaceans, dead_parts))
-        self.algae_info.append((self.global_time, algaes_parts))
+        self.fish_info.append(self.global_time, (fishes_population, predators, prey))
+        self.energy_info.append(self.global_time, (avg_energy_predators, avg_energy_prey))
+        self.size_info.append(self.global_time, (avg_size_predators, avg_size_prey))
+        self.food_info.append(self.global_time, (planktons, crustaceans, dead_parts))
+        self.algae_info.append(self.global_time, (algaes_parts,))
+        self.allele_info.append(self.global_time, stats.means())
+        self.variance_info.append(self.global_time, stats.variances())
+        self.composition_info.append(self.global_time, fractions)
         self.global_time += 1
 
+        self.latest = {
+            "fish": fishes_population, "predators": predators, "prey": prey,
+            "avg_energy_predators": avg_energy_predators, "avg_energy_prey": avg_energy_prey,
+            "avg_size_predators": avg_size_predators, "avg_size_prey": avg_size_prey,
+            "plankton": planktons, "crustaceans": crustaceans, "dead_parts": dead_parts,
+            "algae_parts": algaes_parts,
+            "predator_fraction": fractions[0], "egglayer_fraction": fractions[1], "male_fraction": fractions[2],
+        }
+
         if self.window is not None:
             self.update_plot()
 
     def create_window(self):
         def open_window():
+            # Matplotlib and Tk take most of the startup time, so they wait until the window is opened
+            import tkinter as tk
+
+            import matplotlib.pyplot as plt
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
             self.simulation.paused = True
             self.window = tk.Tk()
             self.window.title("Simulation Graphs")
@@ -78,6 +103,15 @@ class Plot:
             tk.Button(right_frame, text="Algae", font=("Arial", 12), bg='#333333',
                       fg='#5E9F61', highlightbackground='#424242',
                       command=lambda: self.switch_plot("algae")).pack(pady=5, fill=tk.X)
+            tk.Button(right_frame, text="Alleles", font=("Arial", 12), bg='#333333',
+                      fg='#5E9F61', highlightbackground='#424242',
+                      command=lambda: self.switch_plot("alleles")).pack(pady=5, fill=tk.X)
+            tk.Button(right_frame, text="Variance", font=("Arial", 12), bg='#333333',
+                      fg='#5E9F61', highlightbackground='#424242',
+                      command=lambda: self.switch_plot("variance")).pack(pady=5, fill=tk.X)
+            tk.Button(right_frame, text="Composition", font=("Arial", 12), bg='#333333',
+                      fg='#5E9F61', highlightbackground='#424242',
+                      command=lambda: self.switch_plot("composition")).pack(pady=5, fill=tk.X)
                     
             self.figure, self.ax = plt.subplots(figsize=(6, 4))
 
@@ -113,66 +147,68 @@ class Plot:
             self.ax.set_title("Fish Population Over Time")
             self.ax.set_xlabel("Time")
             self.ax.set_ylabel("Population")
-            max_y = max([info[1] for info in self.fish_info] + [1]) * 1.2
-            self.ax.set_ylim(0, max_y)
-            self.ax.plot([info[0] for info in self.fish_info],
-                            [info[1] for info in self.fish_info], label="Total Fish")
-            self.ax.plot([info[0] for info in self.fish_info],
-                            [info[2] for info in self.fish_info], label="Predators")
-            self.ax.plot([info[0] for info in self.fish_info],
-                            [info[3] for info in self.fish_info], label="Prey")
-            self.ax.legend()
+            self.plot_series(self.fish_info, ("Total Fish", "Predators", "Prey"), 1.2)
 
         elif self.current_plot_type == "energy":
             self.ax.set_title("Average Energy Over Time")
             self.ax.set_xlabel("Time")
             self.ax.set_ylabel("Average Energy")
-            max_y = max([max(info[1], info[2]) for info in self.energy_info] + [1]) * 1.2
-            self.ax.set_ylim(0, max_y)
-            self.ax.plot([info[0] for info in self.energy_info],
-                            [info[1] for info in self.energy_info], label="Predators")
-            self.ax.plot([info[0] for info in self.energy_info],
-                            [info[2] for info in self.energy_info], label="Prey")
-            self.ax.legend()
+            self.plot_series(self.energy_info, ("Predators", "Prey"), 1.2)
 
         elif self.current_plot_type == "size":
             self.ax.set_title("Average Size Over Time")
             self.ax.set_xlabel("Time")
             self.ax.set_ylabel("Average Size")
-            max_y = max([max(info[1], info[2]) for info in self.size_info] + [1]) * 1.2
-            self.ax.set_ylim(0, max_y)
-            self.ax.plot([info[0] for info in self.size_info],
-                            [info[1] for info in self.size_info], label="Predators")
-            self.ax.plot([info[0] for info in self.size_info],
-                            [info[2] for info in self.size_info], label="Prey")
-            self.ax.legend()
+            self.plot_series(self.size_info, ("Predators", "Prey"), 1.2)
 
         elif self.current_plot_type == "food":
             self.ax.set_title("Food Over Time")
             self.ax.set_xlabel("Time")
             self.ax.set_ylabel("Food")
-            max_y = max([max(info[1], info[2], info[3]) for info in self.food_info] + [1]) * 1.3
-            self.ax.set_ylim(0, max_y)
-            self.ax.plot([info[0] for info in self.food_info],
-                            [info[1] for info in self.food_info], label="Plankton")
-            self.ax.plot([info[0] for info in self.food_info],
-                            [info[2] for info in self.food_info], label="Crustaceans")
-            self.ax.plot([info[0] for info in self.food_info],
-                            [info[3] for info in self.food_info], label="Dead Parts")
-            self.ax.legend()
+            self.plot_series(self.food_info, ("Plankton", "Crustaceans", "Dead Parts"), 1.3)
         
         elif self.current_plot_type == "algae":
             self.ax.set_title("Algae Parts Over Time")
             self.ax.set_xlabel("Time")
             self.ax.set_ylabel("Algae Parts")
-            max_y = max([info[1] for info in self.algae_info] + [1]) * 1.2
-            self.ax.set_ylim(0, max_y)
-            self.ax.plot([info[0] for info in self.algae_info],
-                            [info[1] for info in self.algae_info], label="Algae Parts")
-            self.ax.legend()
+            self.plot_series(self.algae_info, ("Algae Parts",), 1.2)
+
+        elif self.current_plot_type == "alleles":
+            self.ax.set_title("Mean Allele Value Over Time")
+            self.ax.set_xlabel("Time")
+            self.ax.set_ylabel("Mean Allele")
+            self.plot_series(self.allele_info, self.gene_labels(), 1.05, legend_columns=2)
+
+        elif self.current_plot_type == "variance":
+            self.ax.set_title("Allele Variance Over Time")
+            self.ax.set_xlabel("Time")
+            self.ax.set_ylabel("Variance")
+            self.plot_series(self.variance_info, self.gene_labels(), 1.2, legend_columns=2, min_top=0.01)
+
+        elif self.current_plot_type == "composition":
+            self.ax.set_title("Population Composition Over Time")
+            self.ax.set_xlabel("Time")
+            self.ax.set_ylabel("Fraction of Living Fish")
+            self.plot_series(self.composition_info, ("Predators", "Egg-layers", "Males"), 1.05)
 
         self.canvas.draw()
 
+    @staticmethod
+    def gene_labels():
+        return tuple(gene.replace("_", " ").title() for gene in GENES)
+
+    def plot_series(self, series, labels, headroom, legend_columns=1, min_top=1):
+        # Means as lines; where old ticks were downsampled, a band shows the min/max range
+        ticks, columns = series.envelope()
+        max_y = min_top
+        for (mins, means, maxs), label in zip(columns, labels):
+            line, = self.ax.plot(ticks, means, label=label)
+            if series.downsampled:
+                self.ax.fill_between(ticks, mins, maxs, color=line.get_color(), alpha=0.2, linewidth=0)
+            max_y = max([max_y] + maxs)
+        self.ax.set_ylim(0, max_y * headroom)
+        self.ax.legend(ncol=legend_columns, fontsize="small" if legend_columns > 1 else None)
+
     def close_window(self):
         if self.window is not None:
             self.window.destroy()
@@ -0,0 +1,12 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.benchmark import run_scale
+
+
+def test_benchmark_smoke():
+    result = run_scale(num_fish=10, seed=1, ticks=3, warmup=1, max_seconds=60)
+    assert result["fish"] == 10
+    assert result["ticks"] == 3
+    assert result["ticks_per_second"] > 0
@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+def make_grid():
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    return sim.current_grid
+
+
+def test_sampling_wraps_along_x():
+    grid = make_grid()
+    width = grid.width
+    for x, y in ((5, 100), (width - 5, 300), (width / 2, 10)):
+        assert grid.velocity_at(x + width, y) == pytest.approx(grid.velocity_at(x, y))
+        assert grid.velocity_at(x - width, y) == pytest.approx(grid.velocity_at(x, y))
+
+
+def test_vectorised_sampling_matches_velocity_at():
+    grid = make_grid()
+    rng = np.random.default_rng(2)
+    xs = rng.uniform(-grid.width, 2 * grid.width, 200)
+    ys = rng.uniform(-20, grid.height + 20, 200)
+    us, vs = grid.sample(xs, ys)
+    for x, y, u, v in zip(xs, ys, us, vs):
+        assert grid.velocity_at(x, y) == pytest.approx((u, v))
@@ -0,0 +1,27 @@
+import pytest
+
+from core.history import TieredSeries
+
+
+def test_recent_samples_are_kept_as_they_are():
+    series = TieredSeries(["a"], recent=10, factor=2, tier_size=4, tiers=2)
+    for tick in range(10):
+        series.append(tick, [tick])
+    assert not series.downsampled
+    assert len(series) == 10
+
+
+def test_old_samples_fold_into_buckets():
+    series = TieredSeries(["a", "b"], recent=4, factor=2, tier_size=3, tiers=2)
+    for tick in range(200):
+        series.append(tick, [tick, -tick])
+    assert series.downsampled
+    # Memory stays bounded: recent + factor - 1 samples plus tiers * tier_size buckets
+    assert len(series) <= 4 + 1 + 2 * 3
+    # Every bucket still covers its ticks exactly once, so the folded counts add up
+    buckets = [bucket for tier in series.tiers for bucket in tier]
+    assert sum(b.count for b in buckets) + len(series.recent) == 200
+    for bucket in buckets:
+        assert bucket.mins[0] == bucket.start and bucket.maxs[0] == bucket.end
+        assert bucket.sums[0] / bucket.count == pytest.approx((bucket.start + bucket.end) / 2)
+        assert bucket.maxs[1] == -bucket.start
@@ -0,0 +1,80 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from core.lineage import CAUSES, GENES, LineageIndex, LineageLog
+
+
+def fake_fish(fish_id, parents=(-1, -1), seed=0):
+    rng = random.Random(seed)
+    genome = {gene: {"alleles": [rng.random(), rng.random()], "dominance": rng.randint(0, 1)} for gene in GENES}
+    return SimpleNamespace(id=fish_id, parents=parents, genome=genome, is_predator=fish_id % 2 == 0,
+                           is_male=fish_id % 3 == 0)
+
+
+@pytest.fixture
+def family(tmp_path):
+    # 0 + 1 -> 2, 3;  2 + 4 -> 5;  5 + 3 -> 6
+    fish = [fake_fish(0), fake_fish(1), fake_fish(2, (0, 1), 2), fake_fish(3, (0, 1), 3), fake_fish(4),
+            fake_fish(5, (2, 4), 5), fake_fish(6, (5, 3), 6)]
+    path = tmp_path / "lineage.bin"
+    # A tiny growth step makes the log remap its file several times
+    log = LineageLog(str(path), grow_records=2)
+    rows = {f.id: log.record_birth(f, tick=f.id * 10) for f in fish}
+    log.record_death(rows[2], 75, "eaten")
+    log.record_death(rows[0], 90, "old_age")
+    log.close()
+    return str(path), fish
+
+
+def test_round_trip(family):
+    path, fish = family
+    log = LineageLog(path, readonly=True)
+    try:
+        records = log.records()
+        assert log.count == len(fish)
+        for record, original in zip(records, fish):
+            assert record["id"] == original.id
+            assert (record["mother"], record["father"]) == original.parents
+            assert record["born"] == original.id * 10
+            assert bool(record["predator"]) == original.is_predator
+            assert bool(record["male"]) == original.is_male
+            for i, gene in enumerate(GENES):
+                assert record["alleles"][i].tolist() == pytest.approx(original.genome[gene]["alleles"])
+                assert (record["dominance"] >> i) & 1 == original.genome[gene]["dominance"]
+        assert (records["died"][2], CAUSES[records["cause"][2]]) == (75, "eaten")
+        assert (records["died"][0], CAUSES[records["cause"][0]]) == (90, "old_age")
+        assert (records["died"][6], CAUSES[records["cause"][6]]) == (-1, "alive")
+        # Views into the map have to go before it can be closed
+        del records, record
+    finally:
+        log.close()
+
+
+def test_ancestors_and_descendants(family):
+    path, _ = family
+    log = LineageLog(path, readonly=True)
+    try:
+        index = log.get_index()
+        assert sorted(index.ancestors(6)) == [0, 1, 2, 3, 4, 5]
+        assert sorted(index.ancestors(6, depth=1)) == [3, 5]
+        assert index.ancestors(0) == []
+        assert sorted(index.descendants(0)) == [2, 3, 5, 6]
+        assert sorted(index.descendants(4, depth=1)) == [5]
+        assert index.descendants(6) == []
+        assert index.record(99) is None
+        del index
+    finally:
+        log.close()
+
+
+def test_index_of_empty_log(tmp_path):
+    log = LineageLog(str(tmp_path / "empty.bin"))
+    try:
+        index = LineageIndex(log.records())
+        assert index.ancestors(1) == []
+        assert index.descendants(1) == []
+        del index
+    finally:
+        log.close()
@@ -0,0 +1,86 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.mate_registry import MateRegistry
+
+
+class Fish:
+    # Only what the registry reads; hashed by identity like the real fish
+    def __init__(self, is_predator, is_male, ready=True, x=0, y=0):
+        self.x, self.y = x, y
+        self.is_predator = is_predator
+        self.is_male = is_male
+        self.ready_to_mate = ready
+
+
+def test_partners_are_the_ready_fish_of_the_other_sex():
+    registry = MateRegistry()
+    female, male, other_male, predator = Fish(False, False), Fish(False, True), Fish(False, True), Fish(True, True)
+    for f in (female, male, other_male, predator):
+        registry.update(f)
+    assert list(registry.partners_for(female)) == [male, other_male]
+    assert list(registry.partners_for(male)) == [female]
+    assert list(registry.partners_for(Fish(True, False))) == [predator]
+
+
+def test_update_and_discard_remove_fish():
+    registry = MateRegistry()
+    female, male = Fish(False, False), Fish(False, True)
+    registry.update(female)
+    registry.update(male)
+
+    male.ready_to_mate = False
+    registry.update(male)
+    assert list(registry.partners_for(female)) == []
+
+    registry.discard(female)
+    registry.discard(female)  # Discarding twice is harmless
+    assert list(registry.partners_for(male)) == []
+
+
+def test_partners_near_only_looks_at_nearby_cells():
+    registry = MateRegistry(cell_size=50, margin=0)
+    female = Fish(False, False, x=100, y=100)
+    near, edge, far = Fish(False, True, x=130, y=90), Fish(False, True, x=199, y=100), Fish(False, True, x=900, y=100)
+    for f in (female, near, edge, far):
+        registry.update(f)
+    assert registry.partners_near(female, 40, tick=1) == [near]
+    # Cells are whole, so a fish just outside the radius can come back; the caller checks the distance
+    assert set(registry.partners_near(female, 60, tick=1)) == {near, edge}
+    assert set(registry.partners_near(female, 10000, tick=1)) == {near, edge, far}
+
+
+def test_moved_fish_are_refiled_on_the_next_tick():
+    registry = MateRegistry(cell_size=50, margin=0)
+    female, male = Fish(False, False, x=100, y=100), Fish(False, True, x=900, y=100)
+    registry.update(female)
+    registry.update(male)
+    assert registry.partners_near(female, 40, tick=1) == []
+    male.x = 110
+    assert registry.partners_near(female, 40, tick=2) == [male]
+
+    male.ready_to_mate = False
+    registry.update(male)
+    assert registry.partners_near(female, 40, tick=2) == []
+    assert registry.cells[(False, True)] == {}
+
+
+def test_removed_fish_leaves_the_registry():
+    from core.headless import create_headless_simulation
+    from entities.fish import Fish as RealFish
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    for _ in range(6):
+        sim.fish_population.append(RealFish(200, 200, sim, 50))
+    for fish in sim.fish_population:
+        fish.ready_to_mate = True
+    assert sum(len(bucket) for bucket in sim.mates.buckets.values()) == 6
+
+    gone = sim.fish_population[0]
+    sim.remove_fish(gone)
+    assert gone.removed
+    assert all(gone not in bucket for bucket in sim.mates.buckets.values())
+    assert gone not in sim.mates.placed
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+from core.metrics import MetricsServer
+from core.settings import MAX_SPEED
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "0", "-2", "fast"])
+def test_bad_speeds_are_rejected(value):
+    server = MetricsServer()
+    status, _, _ = server.respond("POST", f"/control/speed?value={value}")
+    assert status == 400
+    assert list(server.pending_commands()) == []
+
+
+def test_speed_is_clamped():
+    server = MetricsServer()
+    status, _, body = server.respond("POST", f"/control/speed?value={MAX_SPEED * 1000}")
+    assert status == 202
+    assert json.loads(body)["value"] == MAX_SPEED
+    assert list(server.pending_commands()) == [("speed", MAX_SPEED)]
+
+
+def test_checkpoint_path_is_published(tmp_path, monkeypatch):
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    sim.metrics = MetricsServer()
+    monkeypatch.chdir(tmp_path)
+    sim.metrics.respond("POST", "/control/checkpoint")
+    sim.serve_metrics()
+    status, _, body = sim.metrics.respond("GET", "/snapshot/last_checkpoint")
+    assert status == 200
+    assert os.path.exists(json.loads(body))
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.lineage import GENES
+from core.population_stats import PopulationStats
+
+
+def make_simulation(fish_count):
+    from core.headless import create_headless_simulation
+    from entities.fish import Fish
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    for x in np.linspace(50, 1000, fish_count).tolist():
+        sim.add_fish(Fish(x, 300, sim, 50))
+    return sim
+
+
+def brute_force(fish_list):
+    alive = [f for f in fish_list if not f.is_dead]
+    values = [[v for f in alive for v in f.genome[gene]["alleles"]] for gene in GENES]
+    return len(alive), [np.mean(v) for v in values], [np.var(v) for v in values]
+
+
+def test_stats_follow_births_and_deaths():
+    sim = make_simulation(40)
+    for fish in sim.fish_population[:10]:
+        fish.die("starved")
+    # The creative delete tool reports the fish as a death while taking it out of the population
+    sim.remove_fish(sim.fish_population[10])
+
+    alive, means, variances = brute_force(sim.fish_population)
+    assert sim.stats.alive == alive == 29
+    assert sum(sim.stats.counts.values()) == alive
+    assert sim.stats.means() == pytest.approx(means)
+    assert sim.stats.variances() == pytest.approx(variances, abs=1e-12)
+
+
+def test_adding_and_discarding_twice_counts_once():
+    fish = make_simulation(1).fish_population[0]
+    stats = PopulationStats()
+    stats.add(fish)
+    stats.add(fish)
+    assert stats.alive == 1 and sum(stats.counts.values()) == 1
+    stats.discard(fish)
+    stats.discard(fish)
+    assert stats.alive == 0 and sum(stats.counts.values()) == 0
+    assert stats.means() == [0.0] * len(GENES)
+    assert stats.variances() == [0.0] * len(GENES)
+    assert stats.fractions() == (0, 0, 0)
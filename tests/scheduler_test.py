@@ -0,0 +1,87 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.scheduler import TimingWheel
+from entities.simple_organisms import Plankton
+
+
+def make_simulation():
+    # Algae only: the generation phase is skipped, so the entity lists start empty at tick 0
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    return sim
+
+
+def make_plankton(x, y, lifetime):
+    plankton = Plankton(x, y)
+    plankton.lifetime = lifetime
+    return plankton
+
+
+def test_events_fire_on_their_tick():
+    wheel = TimingWheel(slots=8)
+    wheel.schedule_at(3, "expire", "a")
+    wheel.schedule(1, "expire", "b")
+    fired = {wheel.now + 1: wheel.advance() for _ in range(4)}
+    assert fired == {1: [("expire", "b")], 2: [], 3: [("expire", "a")], 4: []}
+    assert len(wheel) == 0
+
+
+def test_past_ticks_fire_on_the_next_one():
+    wheel = TimingWheel(slots=8)
+    wheel.advance()
+    assert wheel.schedule_at(0, "expire", "late") == 2
+    assert wheel.advance() == [("expire", "late")]
+
+
+def test_events_beyond_one_turn_wait_in_the_overflow():
+    wheel = TimingWheel(slots=4)
+    wheel.schedule_at(10, "expire", "far")
+    wheel.schedule_at(2, "expire", "near")
+    assert len(wheel.overflow) == 1 and len(wheel) == 2
+    fired = [(wheel.now + 1, wheel.advance()) for _ in range(12)]
+    assert [tick for tick, due in fired if due] == [2, 10]
+    assert fired[9][1] == [("expire", "far")]
+
+
+def test_stale_expiry_is_skipped():
+    sim = make_simulation()
+    plankton = make_plankton(100, 100, 3)
+    sim.add_plankton(plankton)
+    due = plankton.expires_at
+
+    # Eaten before its time: the event still fires but must leave the list alone
+    sim.plankton_list.remove(plankton)
+    other = make_plankton(200, 100, 300)
+    sim.add_plankton(other)
+    while sim.scheduler.now < due:
+        sim.run_scheduled()
+    assert sim.plankton_list == [other]
+
+
+def test_rescheduled_entity_ignores_its_old_event():
+    sim = make_simulation()
+    plankton = make_plankton(100, 100, 3)
+    sim.add_plankton(plankton)
+    first = plankton.expires_at
+    plankton.expires_at = first + 5
+    sim.schedule_expiry(plankton)
+
+    while sim.scheduler.now < first:
+        sim.run_scheduled()
+    assert plankton in sim.plankton_list
+    while sim.scheduler.now < first + 5:
+        sim.run_scheduled()
+    assert plankton not in sim.plankton_list
+
+
+def test_zero_lifetime_expires_on_the_next_tick():
+    sim = make_simulation()
+    plankton = sim.spawn_many("plankton", [(100, 100), (200, 100)], lifetime=0)
+    assert [p.expires_at for p in plankton] == [sim.scheduler.now + 1] * 2
+    sim.run_scheduled()
+    assert not any(p in sim.plankton_list for p in plankton)
@@ -0,0 +1,126 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.spatial import BACKENDS, GridIndex
+
+
+def points(count=400, seed=7):
+    rng = random.Random(seed)
+    return [rng.uniform(0, 1000) for _ in range(count)], [rng.uniform(0, 600) for _ in range(count)]
+
+
+def brute_within(xs, ys, x, y, radius):
+    return sorted(i for i in range(len(xs)) if (xs[i] - x) ** 2 + (ys[i] - y) ** 2 < radius * radius)
+
+
+def brute_nearest(xs, ys, x, y, max_dist_sq):
+    best, best_dist_sq = None, max_dist_sq
+    for i in range(len(xs)):
+        dist_sq = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+        if dist_sq < best_dist_sq:
+            best, best_dist_sq = i, dist_sq
+    return best, best_dist_sq
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_backends_match_brute_force(backend):
+    xs, ys = points()
+    index = BACKENDS[backend](xs, ys)
+    queries = [(0, 0), (500, 300), (999, 599), (-40, 250), (310.5, 122.25)]
+    for x, y in queries:
+        for radius in (5, 37, 120):
+            assert sorted(index.within(x, y, radius)) == brute_within(xs, ys, x, y, radius)
+            i, dist_sq = index.nearest(x, y, radius * radius)
+            expected, expected_dist_sq = brute_nearest(xs, ys, x, y, radius * radius)
+            assert i == expected
+            assert dist_sq == pytest.approx(expected_dist_sq)
+
+
+def test_grid_and_kdtree_agree():
+    if "kdtree" not in BACKENDS:
+        pytest.skip("scipy is not installed")
+    xs, ys = points(2000, seed=3)
+    grid, tree = GridIndex(xs, ys), BACKENDS["kdtree"](xs, ys)
+    qx, qy = np.linspace(0, 1000, 25), np.linspace(0, 600, 25)
+    for found_grid, found_tree in zip(grid.within_many(qx, qy, 60), tree.within_many(qx, qy, 60)):
+        assert sorted(found_grid) == sorted(found_tree)
+    grid_distances, _ = grid.knn(qx, qy, 5, 200)
+    tree_distances, _ = tree.knn(qx, qy, 5, 200)
+    assert np.allclose(grid_distances, tree_distances)
+
+
+def test_empty_index():
+    index = GridIndex([], [])
+    assert len(index) == 0
+    assert index.within(10, 10, 50) == []
+    assert index.nearest(10, 10, 100) == (None, 100)
+
+
+def test_index_sees_same_tick_swap():
+    from core.headless import create_headless_simulation
+    from entities.simple_organisms import Plankton
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+
+    eaten = Plankton(100, 100)
+    sim.add_plankton(eaten)
+    assert sim.spatial.within("plankton", 100, 100, 1) == [eaten]
+
+    # Same tick, same list, same length: only the version tells the index to rebuild
+    sim.plankton_list.remove(eaten)
+    sim.entities_changed("plankton")
+    spawned = Plankton(400, 300)
+    sim.add_plankton(spawned)
+    assert sim.spatial.within("plankton", 100, 100, 1) == []
+    assert sim.spatial.within("plankton", 400, 300, 1) == [spawned]
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_patched_index_matches_a_rebuilt_one(backend):
+    rng = random.Random(11)
+    xs, ys = points(300, seed=5)
+    index = BACKENDS[backend](xs, ys)
+    alive = dict(enumerate(zip(xs, ys)))
+    for _ in range(200):
+        if rng.random() < 0.5 and alive:
+            i = rng.choice(sorted(alive))
+            index.remove(i)
+            del alive[i]
+        else:
+            x, y = rng.uniform(0, 1000), rng.uniform(0, 600)
+            alive[index.add(x, y)] = (x, y)
+    assert len(index) == len(alive)
+
+    slots = sorted(alive)
+    rebuilt = GridIndex([alive[i][0] for i in slots], [alive[i][1] for i in slots])
+    for x, y in [(0, 0), (500, 300), (999, 599), (250.5, 410.25)]:
+        assert sorted(index.within(x, y, 90)) == sorted(slots[i] for i in rebuilt.within(x, y, 90))
+        i, dist_sq = index.nearest(x, y, 150 ** 2)
+        j, expected_dist_sq = rebuilt.nearest(x, y, 150 ** 2)
+        assert dist_sq == pytest.approx(expected_dist_sq)
+        assert (i is None) == (j is None)
+
+
+def test_algae_index_follows_growth_and_grazing():
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=2, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    index, _ = sim.spatial.get("algae")
+    algae = sim.algae_list[0]
+    x, y = algae.segments[0]
+
+    algae.add_segment(x + 3, y - 40)
+    assert sim.spatial.get("algae")[0] is index
+    assert any(found is algae for found in (item[0] for item in sim.spatial.within("algae", x + 3, y - 40, 1)))
+    algae.remove_segment(len(algae.segments) - 1)
+    assert sim.spatial.get("algae")[0] is index
+    assert sim.spatial.within("algae", x + 3, y - 40, 1) == []
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+def make_simulation():
+    from core.headless import create_headless_simulation
+
+    sim = create_headless_simulation(seed=1, generate=False)
+    sim.start_generation()
+    sim.is_generating = False
+    return sim
+
+
+def test_spawn_many_with_fixed_and_per_entity_values():
+    sim = make_simulation()
+    positions = [(10, 10), (20, 20), (5000, -50)]
+    plankton = sim.spawn_many("plankton", positions, lifetime=[30, 60, 90])
+    assert plankton == sim.plankton_list[-3:]
+    assert [p.lifetime for p in plankton] == [30, 60, 90]
+    assert all(3 <= p.energy_value <= 7 and isinstance(p.energy_value, int) for p in plankton)
+    # Positions outside the world are clipped onto its edge
+    assert (plankton[2].x, plankton[2].y) == (sim.world.width, 0)
+    assert all(p.expires_at == sim.scheduler.now + p.lifetime_ticks() for p in plankton)
+
+    crustaceans = sim.spawn_many("crustacean", positions, speed=0.75)
+    assert [c.speed for c in crustaceans] == [0.75] * 3
+    fish = sim.spawn_many("fish", positions, energy=45)
+    assert [f.energy for f in fish] == [45] * 3 and sim.stats.alive == 3
+    with pytest.raises(TypeError):
+        sim.spawn_many("plankton", positions, colour=1)
+    with pytest.raises(ValueError):
+        sim.spawn_many("algae", positions)
+
+
+def test_delete_within_matches_brute_force():
+    sim = make_simulation()
+    rng = np.random.default_rng(4)
+    sim.spawn_many("plankton", rng.uniform(0, 600, (3000, 2)))
+    sim.spawn_many("fish", rng.uniform(0, 600, (60, 2)))
+    sim.visible_fish = sim.fish_population
+
+    for kind, entities in (("plankton", sim.plankton_list), ("fish", sim.fish_population)):
+        inside = [e for e in entities if (e.x - 300) ** 2 + (e.y - 300) ** 2 <= 120 ** 2]
+        assert inside
+        assert sim.delete_within(kind, 300, 300, 120) == len(inside)
+        assert not any((e.x - 300) ** 2 + (e.y - 300) ** 2 <= 120 ** 2 for e in entities)
+        assert all(e not in entities for e in inside)
+    assert sim.stats.alive == len(sim.fish_population)
+
+
+def test_remove_fish_reports_only_the_living():
+    sim = make_simulation()
+    fish = sim.spawn_many("fish", [(100, 100), (200, 100), (300, 100)])
+    deaths = []
+    sim.on_fish_died = lambda f, cause: deaths.append((f, cause))
+
+    fish[0].is_dead = True
+    sim.remove_fish(*fish[:2])
+    sim.remove_fish(fish[2], cause="eaten")
+    assert deaths == [(fish[1], "removed"), (fish[2], "eaten")]
+    assert all(f.removed for f in fish) and sim.fish_population == []
@@ -6,7 +6,6 @@ from typing import TYPE_CHECKING
 from entities.fish import Fish
 from core.settings import (
     DEGISTION_EFECT,
-    HEIGHT,
     MAX_ENERGY,
     METABOLISM_EFECT,
     REPRODUCTION_EFECT,
@@ -219,7 +218,7 @@ class FishCreationWindow:
                 ("Digestion", 0.5, 0.1, 1.0),
                 ("Reproduction Rate", 0.5, 0.1, 1.0),
                 ("Defense", 0.5, 0.1, 1.0),
-                ("Preferred Depth", HEIGHT/2, 0.0, HEIGHT),
+                ("Preferred Depth", self.simulation.world.height/2, 0.0, self.simulation.world.height),
                 ("Predator (0-1)", 0.5, 0.0, 1.0)
             ]
 
@@ -321,7 +320,8 @@ class FishCreationWindow:
         fish.digestion = self.validate_float(self.entries["Digestion"][0].get(), 0.1, 1.0)
         fish.reproduction_rate = self.validate_float(self.entries["Reproduction Rate"][0].get(), 0.1, 1.0)
         fish.defense = self.validate_float(self.entries["Defense"][0].get(), 0.1, 1.0)
-        fish.preferred_depth = self.validate_float(self.entries["Preferred Depth"][0].get(), 0.0, HEIGHT)
+        fish.preferred_depth = self.validate_float(self.entries["Preferred Depth"][0].get(), 0.0,
+                                                    self.simulation.world.height)
         fish.is_predator = self.validate_float(self.entries["Predator (0-1)"][0].get(), 0.0, 1.0) > 0.5
         fish.is_male = self.gender_var.get() == "Male"
         fish.reproduction_strategy = self.repro_var.get()
@@ -341,7 +341,7 @@ class FishCreationWindow:
         fish.vision_sq_o = fish.vision ** 2
         fish.vision_sq_a = fish.vision ** 2 * VISION_REDUCTION_IN_ALGAE ** 2
 
-        self.simulation.fish_population.append(fish)
+        self.simulation.add_fish(fish)
         self.close_window()
 
     def close_window(self) -> None:
@@ -1,9 +1,10 @@
 import math
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pygame
 
-from core.settings import HEIGHT, MAX_OXYGEN, MAX_TEMP, MIN_OXYGEN, MIN_TEMP, WIDTH
+from core.settings import MAX_OXYGEN, MAX_TEMP, MIN_OXYGEN, MIN_TEMP
 
 if TYPE_CHECKING:
     from core.simulation import Simulation
@@ -13,51 +14,67 @@ class UI:
     def __init__(self, simulation: 'Simulation', screen, clock) -> None:
         self.simulation = simulation
         self.font = pygame.font.Font(None, 24)
+        self.small_font = pygame.font.Font(None, 20)
         self.screen = screen
         self.clock = clock
+        # Screen areas of the text drawn this frame, for dirty-rect rendering
+        self.rects = []
 
-    def draw_statistic(self):
-        predators = [f for f in self.simulation.fish_population if f.is_predator and not f.is_dead]
-        prey = [f for f in self.simulation.fish_population if not f.is_predator and not f.is_dead]
+    def blit(self, surface, position):
+        self.rects.append(self.screen.blit(surface, position))
 
+    def draw_statistic(self):
         sim = self.simulation
+        counts = sim.stats.counts
 
         if self.simulation.show_stats:
-            stats = self.font.render(f"Fish: {len([f for f in sim.fish_population if not f.is_dead])} "
+            stats = self.font.render(f"Fish: {sim.stats.alive} "
                                 f"Algae: {len(sim.algae_list)} Plankton: {len(sim.plankton_list)} "
                                 f"Crustaceans: {len(sim.crustacean_list)} Dead Parts: {len(sim.dead_algae_parts)} "
                                 f"Pregnants: {len([f for f in sim.fish_population if f.is_pregnant and not f.is_dead])} "
                                 f"Eggs: {len(sim.egg_list)} ",
                                 True, (255, 255, 255))
-            self.screen.blit(stats, (10, 10))
+            self.blit(stats, (10, 10))
 
-            prey_gender_stats = self.font.render(f"Prey ({len(prey)}) - Male: {len([f for f in prey if f.is_male])} "
-                                            f"Female: {len([f for f in prey if not f.is_male])}",
+            prey_gender_stats = self.font.render(f"Prey ({sim.stats.prey}) - Male: {counts[(False, True)]} "
+                                            f"Female: {counts[(False, False)]}",
                                             True, (255, 255, 255))
-            self.screen.blit(prey_gender_stats, (10, 30))
+            self.blit(prey_gender_stats, (10, 30))
 
-            predator_gender_stats = self.font.render(f"Predators ({len(predators)}) - Male: {len([f for f in predators if f.is_male])} "
-                                                f"Female: {len([f for f in predators if not f.is_male])}",
+            predator_gender_stats = self.font.render(f"Predators ({sim.stats.predators}) - Male: {counts[(True, True)]} "
+                                                f"Female: {counts[(True, False)]}",
                                                 True, (255, 255, 255))
-            self.screen.blit(predator_gender_stats, (10, 50))
+            self.blit(predator_gender_stats, (10, 50))
 
             time_info = self.font.render(f"Phase: {sim.day_phase} {sim.time // sim.day_length:.0f} ({sim.time}) "
                                     f"Season: {sim.seasons[sim.current_season_index]}", 
                                     True, (255, 255, 255))
-            self.screen.blit(time_info, (10, 70))
+            self.blit(time_info, (10, 70))
         
+        width, height = self.screen.get_size()
         if self.simulation.paused:
             pause_text = self.font.render("PAUSED", True, (255, 255, 255))
-            self.screen.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - pause_text.get_height()//2))
+            self.blit(pause_text, (width//2 - pause_text.get_width()//2, height//2 - pause_text.get_height()//2))
 
         if self.simulation.show_fps:
             fps = self.font.render(f"FPS: {int(self.clock.get_fps())}", True, (255, 255, 255))
-            self.screen.blit(fps, (10, HEIGHT - 15))
+            self.blit(fps, (10, height - 15))
+            self.draw_timings()
 
         # pygame.draw.line(screen, (255, 255, 255), (0, LINE_LEVEL), (WIDTH, LINE_LEVEL), 1)
     
+    def draw_timings(self):
+        averages = self.simulation.timer.averages_ms()
+        y_pos = self.screen.get_height() - 35
+        total = self.font.render(f"Tick: {sum(averages.values()):.1f} ms", True, (255, 255, 255))
+        self.blit(total, (10, y_pos))
+        for phase, value in sorted(averages.items(), key=lambda item: item[1]):
+            y_pos -= 18
+            text = self.small_font.render(f"{phase}: {value:.2f} ms", True, (255, 255, 255))
+            self.blit(text, (10, y_pos))
+
     def draw_active_modes(self):
-        x_pos = WIDTH - 100 
+        x_pos = self.screen.get_width() - 100 
         y_pos = 10  
 
         for mode in self.simulation.modes.active_modes:
@@ -81,28 +98,34 @@ class UI:
                 mode_text = self.font.render("Fish", True, (255, 255, 255))
             elif mode == 'Deleting':
                 mode_text = self.font.render("Deleting", True, (255, 255, 255))
+            elif mode == 'Brush':
+                mode_text = self.font.render(f"Brush {self.simulation.modes.brush_radius}", True, (255, 255, 255))
             else:
                 continue
 
-            self.screen.blit(mode_text, (x_pos, y_pos))
+            self.blit(mode_text, (x_pos, y_pos))
             y_pos += 20
     
     def draw_maps(self):
-        map_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        width, height = self.screen.get_size()
+        map_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        # Cells stay aligned with the world grid while the camera scrolls
+        camera_x, camera_y = self.simulation.camera.offset
+        shift_x, shift_y = camera_x % 10, camera_y % 10
         
         if self.simulation.modes.show_temp_map:
-            for y in range(0, HEIGHT, 10):
-                for x in range(0, WIDTH, 10):
-                    temp = self.simulation.get_temperature(x, y)
+            for y in range(-shift_y, height, 10):
+                for x in range(-shift_x, width, 10):
+                    temp = self.simulation.get_temperature(x + camera_x, y + camera_y)
                     red = min(255, max(int((temp - MIN_TEMP) / (MAX_TEMP - MIN_TEMP) * 255), 0))
                     blue = min(255, max(int((MAX_TEMP - temp) / (MAX_TEMP - MIN_TEMP) * 255), 0))
                     pygame.draw.rect(map_surface, (red, 0, blue, 100), (x, y, 10, 10))
             self.screen.blit(map_surface, (0, 0))
         
         elif self.simulation.modes.show_oxygen_map:
-            for y in range(0, HEIGHT, 10):
-                for x in range(0, WIDTH, 10):
-                    oxygen = self.simulation.get_oxygen(x, y, self.simulation.algae_list)
+            for y in range(-shift_y, height, 10):
+                for x in range(-shift_x, width, 10):
+                    oxygen = self.simulation.get_oxygen(x + camera_x, y + camera_y, self.simulation.algae_list)
                     green = min(255, int((oxygen - MIN_OXYGEN) / (MAX_OXYGEN - MIN_OXYGEN) * 255))
                     pygame.draw.rect(map_surface, (0, green, 0, 100), (x, y, 10, 10))
             self.screen.blit(map_surface, (0, 0))
@@ -124,20 +147,28 @@ class UI:
             arrow_length = 15
             
             colors = self.generate_colors(grid.layers)
+
+            # Only the cells under the camera
+            camera = self.simulation.camera
+            c0 = max(0, camera.x // grid.grid_size - 1)
+            c1 = min(grid.cols, (camera.x + camera.width) // grid.grid_size + 2)
+            r0 = max(0, camera.y // grid.grid_size - 1)
+            r1 = min(grid.rows, (camera.y + camera.height) // grid.grid_size + 2)
             
             for layer in range(1, grid.layers):
-                boundary = grid.layer_boundaries[layer]
-                points = [(col * grid.grid_size, boundary[col]) for col in range(len(boundary))]
+                boundary = grid.layer_boundaries[layer].tolist()
+                points = [(col * grid.grid_size - camera.x, boundary[col] - camera.y) for col in range(c0, c1)]
                 if len(points) > 1:
                     pygame.draw.lines(self.screen, (255, 255, 255, 50), False, points, 1)
             
-            for (col, row), current in grid.grid.items():
-                strength = current["strength"]
-                direction = current["direction"]
-                x = col * grid.grid_size + grid.grid_size / 2
-                y = row * grid.grid_size + grid.grid_size / 2
-                
-                layer = grid.get_layer_at(x, y)
+            xs, ys = np.meshgrid(np.arange(c0, c1) * grid.grid_size + grid.grid_size / 2,
+                                 np.arange(r0, r1) * grid.grid_size + grid.grid_size / 2)
+            layers = grid.layers_at(xs.ravel(), ys.ravel()).tolist()
+            cells = zip((xs.ravel() - camera.x).tolist(), (ys.ravel() - camera.y).tolist(),
+                        grid.strength[r0:r1, c0:c1].ravel().tolist(), grid.direction[r0:r1, c0:c1].ravel().tolist(),
+                        layers)
+
+            for x, y, strength, direction, layer in cells:
                 color = colors[layer]  
                 
                 end_x = x + arrow_length * math.cos(direction) * strength * 2
@@ -156,25 +187,36 @@ class UI:
                 pygame.draw.line(self.screen, color, (end_x, end_y), (right_wing_x, right_wing_y), 2)
 
     def draw_generation_progress(self):
-        self.screen.blit(self.simulation.background, (0, 0))
+        camera = self.simulation.camera
+        self.screen.blit(self.simulation.background, (0, 0), (0, camera.y, *self.screen.get_size()))
         
         for algae in self.simulation.algae_list:
-            algae.draw(self.screen)
+            algae.draw(self.screen, camera.offset)
         for plankton in self.simulation.plankton_list:
-            plankton.draw(self.screen)
+            plankton.draw(self.screen, camera.offset)
         for crust in self.simulation.crustacean_list:
-            crust.draw(self.screen)
+            crust.draw(self.screen, camera.offset)
         for fish in self.simulation.fish_population:
-            fish.draw(self.screen, False, False)
+            fish.draw(self.screen, False, False, camera.offset)
         
         progress = self.simulation.generation_step / self.simulation.max_generation_steps * 100
         generation_text = self.font.render(f"Water generating: {progress:.1f}%", True, (255, 255, 255))
-        self.screen.blit(generation_text, (WIDTH // 2 - generation_text.get_width() // 2, HEIGHT // 2))
+        self.screen.blit(generation_text, (self.screen.get_width() // 2 - generation_text.get_width() // 2,
+                                           self.screen.get_height() // 2))
 
         pygame.display.flip()
 
+    def draw_brush(self):
+        modes = self.simulation.modes
+        if modes.creative and modes.cre_brush and pygame.mouse.get_focused():
+            colour = (255, 80, 80) if modes.cre_del else (255, 255, 255)
+            self.rects.append(pygame.draw.circle(self.screen, colour, pygame.mouse.get_pos(), modes.brush_radius, 1))
+
     def draw(self):
+        self.rects = []
         self.draw_maps()
         self.draw_current()
+        self.draw_brush()
         self.draw_active_modes()
-        self.draw_statistic()
\ No newline at end of file
+        self.draw_statistic()
+        return self.rects